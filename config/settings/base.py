@@ -415,6 +415,35 @@ INDEXER_ENABLE_AUTO_BLOCK_PROCESS_LIMIT = env.bool(
     "INDEXER_ENABLE_AUTO_BLOCK_PROCESS_LIMIT", default=True
 )  # Enable automatic calculation of block_process_limit
 
+INDEXER_BLOCK_PROCESS_TARGET_SECONDS = env.float(
+    "INDEXER_BLOCK_PROCESS_TARGET_SECONDS", default=5.0
+)  # Expected duration of every request when auto adjusting block_process_limit
+INDEXER_MAX_RESULTS_PER_REQUEST = env.int(
+    "INDEXER_MAX_RESULTS_PER_REQUEST", default=5_000
+)  # Maximum number of events expected in one request when auto adjusting block_process_limit. 0 == no limit.
+
+INDEXER_CONCURRENT_REQUESTS = env.int(
+    "INDEXER_CONCURRENT_REQUESTS", default=1
+)  # Number of consecutive block ranges requested to the node at the same time when searching for events.
+
+INDEXER_BLOCK_RANGE_SPLIT_MAX_DEPTH = env.int(
+    "INDEXER_BLOCK_RANGE_SPLIT_MAX_DEPTH", default=4
+)  # Number of times a block range failing to be retrieved is split in half and retried. 0 == no splitting.
+
+INDEXER_PROCESSED_ELEMENTS_CACHE_BACKEND = env.str(
+    "INDEXER_PROCESSED_ELEMENTS_CACHE_BACKEND", default="memory"
+)  # Cache for already processed events. `memory` (per process) or `redis` (shared between workers)
+INDEXER_PROCESSED_ELEMENTS_CACHE_SIZE = env.int(
+    "INDEXER_PROCESSED_ELEMENTS_CACHE_SIZE", default=100_000
+)  # Number of elements kept in the `memory` processed elements cache, every element takes around 100 bytes.
+INDEXER_PROCESSED_ELEMENTS_CACHE_MAX_BLOCK_AGE = env.int(
+    "INDEXER_PROCESSED_ELEMENTS_CACHE_MAX_BLOCK_AGE", default=50_000
+)  # Number of blocks an element is kept in the `redis` processed elements cache. 0 == forever.
+
+INDEXER_BLOCKS_CACHE_SIZE = env.int(
+    "INDEXER_BLOCKS_CACHE_SIZE", default=10_000
+)  # Number of block headers kept in memory by every process, shared by the indexer and the reorg service.
+
 INDEXER_BLOCKS_BEHIND = env.int(
     "INDEXER_BLOCKS_BEHIND", default=0
 )  # Number of blocks behind last block to avoid a reorg.
@@ -423,6 +452,34 @@ INDEXER_REORG_BLOCKS = env.int("INDEXER_REORG_BLOCKS", default=10)
 
 INDEXER_BLOCK_REORG_BATCH = env.int("INDEXER_BLOCK_REORG_BATCH", default=100)
 
+LOCKING_EVENTS_UNIFIED_TABLE_ENABLED = env.bool(
+    "LOCKING_EVENTS_UNIFIED_TABLE_ENABLED", default=False
+)  # Also store the events on the unified `LockingEvent` table, and read all the events of a holder, the balances and the reorgs from it. Run `backfill_locking_events` when enabling it.
+
+# API
+# ------------------------------------------------------------------------------
+API_RESPONSE_CACHE_ENABLED = env.bool(
+    "API_RESPONSE_CACHE_ENABLED", default=True
+)  # Cache API responses. Versions are bumped by the workers, so it requires a cache shared by all the processes.
+API_RESPONSE_CACHE_TIMEOUT = env.int(
+    "API_RESPONSE_CACHE_TIMEOUT", default=24 * 60 * 60
+)  # Seconds to keep API responses cached. Responses are invalidated when data changes, so it can be long.
+API_RESPONSE_CACHE_MAX_HOLDERS = env.int(
+    "API_RESPONSE_CACHE_MAX_HOLDERS", default=1_000
+)  # Max holders invalidated one by one after an indexed batch. If more holders changed, responses for all the holders are invalidated.
+CHECKSUM_ADDRESS_CACHE_SIZE = env.int(
+    "CHECKSUM_ADDRESS_CACHE_SIZE", default=10_000
+)  # Number of checksummed addresses kept in memory by every process to serialize responses.
+
+# Campaigns
+# ------------------------------------------------------------------------------
+CAMPAIGNS_LEADERBOARD_TABLE_ENABLED = env.bool(
+    "CAMPAIGNS_LEADERBOARD_TABLE_ENABLED", default=False
+)  # Store leaderboards in a table recalculated only for the campaign updated, instead of the materialized view.
+CAMPAIGNS_MEDIA_ROOT_SHARED = env.bool(
+    "CAMPAIGNS_MEDIA_ROOT_SHARED", default=False
+)  # `MEDIA_ROOT` is a volume shared with the workers. Required to upload activities if S3 storage is not configured, as uploaded files are processed by the workers.
+
 # Shell Plus
 # ------------------------------------------------------------------------------
 SHELL_PLUS_PRINT_SQL_TRUNCATE = env.int("SHELL_PLUS_PRINT_SQL_TRUNCATE", default=10_000)
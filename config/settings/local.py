@@ -24,6 +24,9 @@ CACHES = {
     }
 }
 
+# Versions bumped by the workers are not seen by the web process using `LocMemCache`
+API_RESPONSE_CACHE_ENABLED = env.bool("API_RESPONSE_CACHE_ENABLED", default=False)
+
 # django-debug-toolbar
 # ------------------------------------------------------------------------------
 # https://django-debug-toolbar.readthedocs.io/en/latest/installation.html#prerequisites
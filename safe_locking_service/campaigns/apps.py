@@ -5,3 +5,6 @@ class CampaignsConfig(AppConfig):
     name = "safe_locking_service.campaigns"
     verbose_name = "Campaigns"
     default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        from . import signals  # noqa: F401
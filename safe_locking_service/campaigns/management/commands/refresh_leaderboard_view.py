@@ -1,22 +1,69 @@
 import logging
+from typing import Optional, Sequence
 
+from django.conf import settings
 from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import connection
 
-logger = logging.getLogger(__name__)
+from safe_locking_service.utils.cache import (
+    CAMPAIGNS_CACHE_VERSION,
+    bump_cache_version,
+    get_campaign_cache_version_name,
+)
+
+from ...models import MATERIALIZED_VIEW_TABLE_NAME, Campaign, CampaignLeaderBoard
 
+logger = logging.getLogger(__name__)
 
-def update_leaderboard_view():
-    call_command("refresh_leaderboard_view")
 
+def update_leaderboard_view(campaign_id: Optional[int] = None):
+    """
+    Refresh the campaigns leaderboards. It should be called outside the transaction modifying the activities,
+    so readers are not blocked
 
-MATERIALIZED_VIEW_TABLE_NAME = "campaign_leaderboards"
+    :param campaign_id: Campaign with updated activities. Only used by the leaderboard table, the materialized
+        view is always refreshed for all campaigns
+    """
+    if campaign_id is None:
+        call_command("refresh_leaderboard_view")
+    else:
+        call_command("refresh_leaderboard_view", campaign_ids=[campaign_id])
 
 
 class Command(BaseCommand):
     help = "Refresh the leaderboard view for all campaigns"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--campaign-ids",
+            type=int,
+            nargs="+",
+            help="Only recalculate the leaderboard of these campaigns when `CAMPAIGNS_LEADERBOARD_TABLE_ENABLED`",
+        )
+
+    def is_view_populated(self) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT ispopulated FROM pg_matviews WHERE matviewname = %s",
+                [MATERIALIZED_VIEW_TABLE_NAME],
+            )
+            row = cursor.fetchone()
+            return bool(row and row[0])
+
+    def bump_cache_versions(self, campaign_ids: Optional[Sequence[int]]) -> None:
+        """
+        Invalidate the cached responses for the leaderboards refreshed. Only the provided campaigns
+        have changes, if not provided all of them are invalidated
+        """
+        if not campaign_ids:
+            bump_cache_version(CAMPAIGNS_CACHE_VERSION)
+            return
+        for campaign_uuid in Campaign.objects.filter(id__in=campaign_ids).values_list(
+            "uuid", flat=True
+        ):
+            bump_cache_version(get_campaign_cache_version_name(campaign_uuid))
+
     def handle(self, *args, **kwargs):
         """
         Refresh a materialized view which contains the ranking of all addresses for all campaigns.
@@ -24,11 +71,30 @@ class Command(BaseCommand):
         If the view needs to be created first, it is created with no data.
         The main reason for this is to avoid retrieved data and refreshing it right away (incurring in another retrieval).
 
-        Refreshing the view is a step that is always executed.
+        Refreshing the view is a step that is always executed. Once populated, it is refreshed `CONCURRENTLY`
+        (using the `leaderboard_address_position` unique index), so readers are not blocked while refreshing.
         This action is idempotent, so given the same data, the materialized view will always be the same on re-execution.
+
+        If `CAMPAIGNS_LEADERBOARD_TABLE_ENABLED`, the leaderboard table is recalculated instead, only for the
+        `campaign_ids` provided.
         """
+        campaign_ids = kwargs.get("campaign_ids")
+        if settings.CAMPAIGNS_LEADERBOARD_TABLE_ENABLED:
+            number_rows = CampaignLeaderBoard.objects.update_campaigns(campaign_ids)
+            self.bump_cache_versions(campaign_ids)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Successfully updated the table for the campaigns' leaderboards with {number_rows} rows"
+                )
+            )
+            return
+
+        concurrently = "CONCURRENTLY " if self.is_view_populated() else ""
         with connection.cursor() as cursor:
-            cursor.execute(f"REFRESH MATERIALIZED VIEW {MATERIALIZED_VIEW_TABLE_NAME};")
+            cursor.execute(
+                f"REFRESH MATERIALIZED VIEW {concurrently}{MATERIALIZED_VIEW_TABLE_NAME};"
+            )
+        self.bump_cache_versions(campaign_ids)
         self.stdout.write(
             self.style.SUCCESS(
                 "Successfully updated the view for the campaigns' leaderboards"
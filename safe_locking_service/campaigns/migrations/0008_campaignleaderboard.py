@@ -0,0 +1,68 @@
+# Generated by Django 5.0.12 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+import gnosis.eth.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0007_alter_activity_address"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CampaignLeaderBoard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("address", gnosis.eth.django.models.EthereumAddressBinaryField()),
+                ("campaign_uuid", models.UUIDField()),
+                ("total_campaign_points", models.PositiveBigIntegerField()),
+                (
+                    "total_campaign_boosted_points",
+                    models.DecimalField(decimal_places=8, max_digits=40),
+                ),
+                ("position", models.PositiveIntegerField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["campaign_uuid", "position"],
+                        name="campaign_leaderboard_pos_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="campaignleaderboard",
+            constraint=models.UniqueConstraint(
+                fields=("address", "campaign_uuid"),
+                name="unique_campaign_leaderboard_address",
+            ),
+        ),
+        migrations.RunSQL(
+            sql="""
+            INSERT INTO "campaigns_campaignleaderboard" ("address", "campaign_uuid", "total_campaign_points",
+                                                        "total_campaign_boosted_points", "position")
+            SELECT "campaigns_activity"."address",
+                   "campaigns_campaign"."uuid",
+                   SUM("campaigns_activity"."total_points"),
+                   SUM("campaigns_activity"."total_boosted_points"),
+                   RANK() OVER (PARTITION BY "campaigns_campaign"."uuid" ORDER BY SUM("campaigns_activity"."total_boosted_points") DESC)
+            FROM "campaigns_activity"
+                     INNER JOIN "campaigns_period" ON "campaigns_activity"."period_id" = "campaigns_period"."id"
+                     INNER JOIN "campaigns_campaign" ON "campaigns_period"."campaign_id" = "campaigns_campaign"."id"
+            GROUP BY "campaigns_activity"."address", "campaigns_campaign"."uuid";
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
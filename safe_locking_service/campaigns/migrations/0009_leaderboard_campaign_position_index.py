@@ -0,0 +1,18 @@
+from django.db import migrations
+
+from ..management.commands.refresh_leaderboard_view import MATERIALIZED_VIEW_TABLE_NAME
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("campaigns", "0008_campaignleaderboard"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=f"""
+            CREATE INDEX IF NOT EXISTS leaderboard_campaign_position ON {MATERIALIZED_VIEW_TABLE_NAME} (campaign_uuid, position, address);
+            """,
+            reverse_sql="DROP INDEX IF EXISTS leaderboard_campaign_position;",
+        )
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.12 on 2026-10-18 00:28
+
+from django.db import migrations
+
+import safe_locking_service.utils.ethereum
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0009_leaderboard_campaign_position_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="activity",
+            name="address",
+            field=safe_locking_service.utils.ethereum.CachedEthereumAddressBinaryField(),
+        ),
+        migrations.AlterField(
+            model_name="campaignleaderboard",
+            name="address",
+            field=safe_locking_service.utils.ethereum.CachedEthereumAddressBinaryField(),
+        ),
+    ]
@@ -1,19 +1,26 @@
+import csv
+import itertools
 import os
 import uuid
 from decimal import Decimal
-from typing import List, TypedDict
+from io import StringIO
+from typing import Iterable, List, Optional, Sequence, Tuple, TypedDict
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
-from django.db import connection, models
+from django.db import connection, models, transaction
 from django.db.backends.utils import CursorWrapper
 from django.utils.text import slugify
 
 from eth_typing import ChecksumAddress
+from eth_utils import to_normalized_address
 from hexbytes import HexBytes
 
-from gnosis.eth.django.models import EthereumAddressBinaryField
+from safe_locking_service.utils.ethereum import CachedEthereumAddressBinaryField
+
+# Materialized view with the leaderboards of all campaigns
+MATERIALIZED_VIEW_TABLE_NAME = "campaign_leaderboards"
 
 
 def get_campaign_icon_path(instance: "Campaign", filename):
@@ -31,6 +38,16 @@ def get_file_storage():
         return default_storage
 
 
+def is_file_storage_shared() -> bool:
+    """
+    :return: `True` if files stored using `get_file_storage` can be read by the workers
+    """
+    return (
+        settings.AWS_S3_STORAGE_BACKEND_CONFIGURED
+        or settings.CAMPAIGNS_MEDIA_ROOT_SHARED
+    )
+
+
 class LeaderBoardCampaignRow(TypedDict):
     address: ChecksumAddress
     total_campaign_points: int
@@ -125,11 +142,81 @@ class Period(models.Model):
         return f"{self.campaign} – Period {self.slug}"
 
 
+# address, total_points, boost, total_boosted_points
+ActivityRow = Tuple[str, int | str, Decimal | str, Decimal | str]
+
+
+class ActivityQuerySet(models.QuerySet):
+    def replace_period_activities(
+        self, period_id: int, rows: Iterable[ActivityRow], batch_size: int = 10_000
+    ) -> int:
+        """
+        Replace all the activities of a period. Rows are streamed using `COPY FROM STDIN` into a temporary
+        staging table in batches of `batch_size` (so memory usage is bounded) and then the activities
+        of the period are swapped with the staging ones, so `campaigns_activity` rows are only locked
+        at the end. It must be called inside a database transaction
+
+        :param period_id:
+        :param rows: Activities for the period
+        :param batch_size: Number of rows sent on every `COPY`
+        :return: Number of activities inserted
+        :raises ValueError: If an address is not valid
+        """
+        rows = iter(rows)
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS "campaigns_activity_staging"')
+            cursor.execute(
+                """
+                CREATE TEMPORARY TABLE "campaigns_activity_staging" (
+                    "address" bytea NOT NULL,
+                    "total_points" bigint NOT NULL,
+                    "boost" numeric(15, 8) NOT NULL,
+                    "total_boosted_points" numeric(15, 8) NOT NULL
+                ) ON COMMIT DROP
+                """
+            )
+            while batch := list(itertools.islice(rows, batch_size)):
+                buffer = StringIO()
+                writer = csv.writer(buffer)
+                for address, total_points, boost, total_boosted_points in batch:
+                    writer.writerow(
+                        (
+                            # Hex format for bytea, without the `0x` prefix
+                            "\\x" + to_normalized_address(address)[2:],
+                            total_points,
+                            boost,
+                            total_boosted_points,
+                        )
+                    )
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY "campaigns_activity_staging" FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+
+            cursor.execute(
+                'DELETE FROM "campaigns_activity" WHERE "period_id" = %s', [period_id]
+            )
+            cursor.execute(
+                """
+                INSERT INTO "campaigns_activity" ("period_id", "address", "total_points", "boost",
+                                                  "total_boosted_points")
+                SELECT %s, "address", "total_points", "boost", "total_boosted_points"
+                FROM "campaigns_activity_staging"
+                """,
+                [period_id],
+            )
+            number_inserted = cursor.rowcount
+            cursor.execute('DROP TABLE "campaigns_activity_staging"')
+            return number_inserted
+
+
 class Activity(models.Model):
+    objects = ActivityQuerySet.as_manager()
     period = models.ForeignKey(
         Period, on_delete=models.CASCADE, related_name="activities"
     )
-    address = EthereumAddressBinaryField()
+    address = CachedEthereumAddressBinaryField()
     total_points = models.PositiveBigIntegerField()
     boost = models.DecimalField(max_digits=15, decimal_places=8)
     total_boosted_points = models.DecimalField(max_digits=15, decimal_places=8)
@@ -157,6 +244,119 @@ class ActivityMetadata(models.Model):
     max_points = models.PositiveBigIntegerField()
 
 
+class CampaignLeaderBoardQuerySet(models.QuerySet):
+    def update_campaigns(self, campaign_ids: Optional[Sequence[int]] = None) -> int:
+        """
+        Recalculate the leaderboards of the provided campaigns from their activities, in one database
+        transaction, so readers keep getting the previous leaderboard until it is committed
+
+        :param campaign_ids: Campaigns to recalculate, all of them if not provided
+        :return: Number of leaderboard rows inserted
+        """
+        campaign_filter = (
+            'WHERE "campaigns_period"."campaign_id" = ANY(%s)' if campaign_ids else ""
+        )
+        delete_filter = (
+            'WHERE "campaign_uuid" IN (SELECT "uuid" FROM "campaigns_campaign" WHERE "id" = ANY(%s))'
+            if campaign_ids
+            else ""
+        )
+        params = [list(campaign_ids)] if campaign_ids else []
+        query = f"""
+                INSERT INTO "campaigns_campaignleaderboard" ("address", "campaign_uuid", "total_campaign_points",
+                                                            "total_campaign_boosted_points", "position")
+                SELECT "campaigns_activity"."address",
+                       "campaigns_campaign"."uuid",
+                       SUM("campaigns_activity"."total_points"),
+                       SUM("campaigns_activity"."total_boosted_points"),
+                       RANK() OVER (PARTITION BY "campaigns_campaign"."uuid" ORDER BY SUM("campaigns_activity"."total_boosted_points") DESC)
+                FROM "campaigns_activity"
+                         INNER JOIN "campaigns_period" ON "campaigns_activity"."period_id" = "campaigns_period"."id"
+                         INNER JOIN "campaigns_campaign" ON "campaigns_period"."campaign_id" = "campaigns_campaign"."id"
+                {campaign_filter}
+                GROUP BY "campaigns_activity"."address", "campaigns_campaign"."uuid"
+                """
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM "campaigns_campaignleaderboard" {delete_filter}', params
+            )
+            cursor.execute(query, params)
+            return cursor.rowcount
+
+
+class CampaignLeaderBoard(models.Model):
+    """
+    Leaderboards of the campaigns, with the same columns as the `campaign_leaderboards` materialized view.
+    Used instead of the view if `CAMPAIGNS_LEADERBOARD_TABLE_ENABLED`, so uploading the activities of
+    a period only recalculates the leaderboard of its campaign
+    """
+
+    objects = CampaignLeaderBoardQuerySet.as_manager()
+    address = CachedEthereumAddressBinaryField()
+    campaign_uuid = models.UUIDField()
+    total_campaign_points = models.PositiveBigIntegerField()
+    total_campaign_boosted_points = models.DecimalField(max_digits=40, decimal_places=8)
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["address", "campaign_uuid"],
+                name="unique_campaign_leaderboard_address",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["campaign_uuid", "position"],
+                name="campaign_leaderboard_pos_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"Campaign {self.campaign_uuid} leaderboard {self.address} position={self.position}"
+
+
+def get_leader_board_table_name() -> str:
+    """
+    :return: Name of the table or materialized view storing the leaderboards of the campaigns
+    """
+    if settings.CAMPAIGNS_LEADERBOARD_TABLE_ENABLED:
+        return CampaignLeaderBoard._meta.db_table
+    return MATERIALIZED_VIEW_TABLE_NAME
+
+
+def get_campaign_leader_board(
+    uuid: str, limit: int, offset: int
+) -> List[LeaderBoardCampaignRow]:
+    """
+    :return: a page of the campaign leaderboard as a List of `LeaderBoardCampaignRow`, sorted by
+        position and address. Pagination is done by the database
+    """
+    query = f"""
+    SELECT "address", "campaign_uuid", "total_campaign_points", "total_campaign_boosted_points", "position"
+    FROM "{get_leader_board_table_name()}" WHERE campaign_uuid=%s
+    ORDER BY "position", "address"
+    LIMIT %s OFFSET %s
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, [uuid, limit, offset])
+        return fetch_all_from_cursor(cursor)
+
+
+def get_campaign_leader_board_count(uuid: str) -> int:
+    """
+    :return: number of addresses in the campaign leaderboard
+    """
+    query = f"""
+    SELECT COUNT(*) FROM "{get_leader_board_table_name()}" WHERE campaign_uuid=%s
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(query, [uuid])
+        return cursor.fetchone()[0]
+
+
 def get_campaign_leader_board_position(
     uuid: str, address: ChecksumAddress
 ) -> LeaderBoardCampaignRow:
@@ -165,8 +365,9 @@ def get_campaign_leader_board_position(
     :return: a Dict of LeaderBoardCampaignRow
     """
 
-    query = """
-    SELECT * FROM campaign_leaderboards WHERE campaign_uuid=%s AND address=%s
+    query = f"""
+    SELECT "address", "campaign_uuid", "total_campaign_points", "total_campaign_boosted_points", "position"
+    FROM "{get_leader_board_table_name()}" WHERE campaign_uuid=%s AND address=%s
     """
 
     with connection.cursor() as cursor:
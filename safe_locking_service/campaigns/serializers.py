@@ -3,9 +3,9 @@ from typing import Dict, Optional
 from rest_framework import serializers
 
 from gnosis.eth.django.serializers import EthereumAddressField
-from gnosis.eth.utils import fast_to_checksum_address
 
 from safe_locking_service.campaigns.models import Campaign
+from safe_locking_service.utils.ethereum import to_checksum_address
 
 
 class ActivityMetadataSerializer(serializers.Serializer):
@@ -54,7 +54,7 @@ class CampaignLeaderBoardSerializer(serializers.Serializer):
     def get_holder(self, obj: Dict):
         if isinstance(obj["address"], str):
             return obj["address"]
-        return fast_to_checksum_address(bytes(obj["address"]))
+        return to_checksum_address(obj["address"])
 
     def get_total_boosted_points(self, obj: Dict):
         return obj["total_campaign_boosted_points"]
@@ -71,8 +71,12 @@ class CampaignLeaderBoardSerializer(serializers.Serializer):
 
 
 class PeriodAddressSerializer(serializers.Serializer):
-    start_date = serializers.DateField(source="period.start_date")
-    end_date = serializers.DateField(source="period.end_date")
+    """
+    Serializes the `Activity.objects.values()` dictionaries with the `start_date` and `end_date` of the period
+    """
+
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
     holder = EthereumAddressField(source="address")
     boost = serializers.CharField()
     total_points = serializers.CharField()
@@ -0,0 +1,32 @@
+import logging
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from safe_locking_service.utils.cache import (
+    CAMPAIGNS_CACHE_VERSION,
+    bump_cache_version_on_commit,
+)
+
+from .models import Activity, ActivityMetadata, Campaign, Period
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Campaign, dispatch_uid="campaign_saved")
+@receiver(post_delete, sender=Campaign, dispatch_uid="campaign_deleted")
+@receiver(post_save, sender=Period, dispatch_uid="period_saved")
+@receiver(post_delete, sender=Period, dispatch_uid="period_deleted")
+@receiver(post_save, sender=ActivityMetadata, dispatch_uid="activity_metadata_saved")
+@receiver(
+    post_delete, sender=ActivityMetadata, dispatch_uid="activity_metadata_deleted"
+)
+# Activities are bulk loaded without signals, this handles the edits and deletions from the admin
+@receiver(post_save, sender=Activity, dispatch_uid="activity_saved")
+@receiver(post_delete, sender=Activity, dispatch_uid="activity_deleted")
+def invalidate_campaigns_cache(sender, **kwargs) -> None:
+    """
+    Invalidate the cached responses of all the campaigns when they are modified using the admin
+    """
+    logger.debug("%s modified, invalidating campaigns cache", sender.__name__)
+    bump_cache_version_on_commit(CAMPAIGNS_CACHE_VERSION)
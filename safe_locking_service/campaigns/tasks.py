@@ -1,73 +1,110 @@
+import csv
 import datetime
-from typing import Any
+from io import TextIOWrapper
+from typing import Any, Iterable, Iterator
 
 from django.db import transaction
 
 from celery import shared_task
 from celery.utils.log import get_task_logger
 
+from safe_locking_service.utils.cache import (
+    bump_cache_version,
+    get_campaign_cache_version_name,
+)
+
 from .management.commands.refresh_leaderboard_view import update_leaderboard_view
-from .models import Activity, Period
+from .models import Activity, ActivityRow, Period, get_file_storage
 
-BATCH_SIZE = 1000
+BATCH_SIZE = 10_000
 
 logger = get_task_logger(__name__)
 
 
-@shared_task()
-def process_csv_task(period_id: int, activities_list: list[dict[str, Any]]) -> None:
+def get_activity_rows(
+    period: Period, rows: Iterable[dict[str, Any]]
+) -> Iterator[ActivityRow]:
+    """
+    :param period:
+    :param rows: Activities as dictionaries, like the rows of the uploaded CSV
+    :return: Generator of the activity rows for `period`, skipping the activities out of the period dates
     """
-    Process a list of activities and store them in the database for a given Period.
+    for input_activity in rows:
+        address = input_activity["safe_address"]
+        input_activity_start_date = datetime.date.fromisoformat(
+            input_activity["period_start"]
+        )
+        if input_activity_start_date < period.start_date:
+            logger.warning(
+                f"Start Date for activity for {address}, {input_activity_start_date} out of range for given period: {period.start_date}. Skipping."
+            )
+            continue
+        input_activity_end_date = datetime.date.fromisoformat(
+            input_activity["period_end"]
+        )
+        if input_activity_end_date > period.end_date:
+            logger.warning(
+                f"End Date for activity for {address}, {input_activity_end_date} out of range for given period: {period.end_date}. Skipping."
+            )
+            continue
 
-    This function is designed to be executed as an asynchronous task. It processes a list
-    of activities, deletes any existing activities for the given period, and then bulk
-    inserts the new activities in batches to the database.
+        yield (
+            address,
+            input_activity["total_points"],
+            input_activity["boost"],
+            input_activity["total_boosted_points"],
+        )
 
 
+@shared_task()
+def process_csv_task(period_id: int, file_name: str, encoding: str = "utf-8") -> None:
+    """
+    Process a CSV file of activities and store them in the database for a given Period.
+
+    This function is designed to be executed as an asynchronous task. The file is read from the file
+    storage as a stream and loaded into the database using `COPY` in batches of `BATCH_SIZE`, so memory
+    usage does not depend on the size of the file. Existing activities for the given period are then
+    replaced by the new ones and, after committing them, the file is removed from the storage and the
+    leaderboard is refreshed. If processing fails the file is kept, so it can be processed again.
+
     @param period_id: The ID of the period for which the activities are to be processed.
-    @param activities_list: A list of dictionaries, where each dictionary represents an activity.
+    @param file_name: Name of the CSV file in the file storage.
+    @param encoding: Encoding of the CSV file.
     """
     logger.info("CSV processing started for period ID: %s", period_id)
+    storage = get_file_storage()
     try:
-        with transaction.atomic():
+        with transaction.atomic(), storage.open(file_name, "rb") as file:
             period = Period.objects.get(id=period_id)
 
-            logger.info("Deleting all activities for period: %s", period.slug)
-            period.activities.all().delete()
-
-            activities = []
-            for input_activity in activities_list:
-                input_activity_start_date = datetime.datetime.strptime(
-                    input_activity["period_start"], "%Y-%m-%d"
-                ).date()
-                input_activity_end_date = datetime.datetime.strptime(
-                    input_activity["period_end"], "%Y-%m-%d"
-                ).date()
-                activity = Activity(
-                    period=period,
-                    address=input_activity["safe_address"],
-                    total_points=input_activity["total_points"],
-                    boost=input_activity["boost"],
-                    total_boosted_points=input_activity["total_boosted_points"],
-                )
-                if input_activity_start_date < period.start_date:
-                    logger.warning(
-                        f"Start Date for activity for {activity.address}, {input_activity_start_date} out of range for given period: {period.start_date}. Skipping."
-                    )
-                    continue
-                if input_activity_end_date > period.end_date:
-                    logger.warning(
-                        f"End Date for activity for {activity.address}, {input_activity_end_date} out of range for given period: {period.end_date}. Skipping."
-                    )
-                    continue
-
-                activities.append(activity)
+            reader = csv.DictReader(TextIOWrapper(file, encoding=encoding, newline=""))
+            logger.info("Replacing all activities for period: %s", period.slug)
+            number_activities = Activity.objects.replace_period_activities(
+                period.id, get_activity_rows(period, reader), batch_size=BATCH_SIZE
+            )
+            logger.info(
+                "%d activities stored for period: %s", number_activities, period.slug
+            )
+    except Exception as e:
+        logger.error(
+            "Failed to process CSV %s for period ID %s: %s",
+            file_name,
+            period_id,
+            str(e),
+        )
+        return
 
-            for start in range(0, len(activities), BATCH_SIZE):
-                Activity.objects.bulk_create(activities[start : start + BATCH_SIZE])
-            logger.info("Updating Leaderboard View")
-            update_leaderboard_view()
-            logger.info("Leaderboard View updated")
-            logger.info("All activities created for period: %s", period.slug)
+    storage.delete(file_name)
+    logger.info("All activities created for period: %s", period.slug)
+    try:
+        # Leaderboard is refreshed after committing the activities, so readers are not blocked by the load.
+        # Cached responses of the campaign are invalidated after refreshing it
+        logger.info("Updating Leaderboard View")
+        update_leaderboard_view(period.campaign_id)
+        logger.info("Leaderboard View updated")
     except Exception as e:
-        logger.error("Failed to process CSV for period ID %s: %s", period_id, str(e))
+        logger.error(
+            "Failed to update leaderboard for period ID %s: %s", period_id, str(e)
+        )
+        # Activities were replaced, so their cached responses are invalidated anyway
+        bump_cache_version(get_campaign_cache_version_name(period.campaign.uuid))
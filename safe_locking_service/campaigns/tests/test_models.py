@@ -1,10 +1,14 @@
+import datetime
+
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.test import TestCase
 
 from faker import Faker
 
+from safe_locking_service.campaigns.models import CampaignLeaderBoard
 from safe_locking_service.campaigns.tests.factories import (
+    ActivityFactory,
     CampaignFactory,
     PeriodFactory,
 )
@@ -105,3 +109,45 @@ class PeriodTestCase(TestCase):
 
         with self.assertRaises(ValidationError):
             period.save()
+
+
+class CampaignLeaderBoardTestCase(TestCase):
+    def test_update_campaigns(self):
+        campaign = CampaignFactory()
+        other_campaign = CampaignFactory()
+        period = PeriodFactory(campaign=campaign)
+        other_period = PeriodFactory(campaign=other_campaign)
+        ActivityFactory(period=period, total_points=10, total_boosted_points=10)
+        top_activity = ActivityFactory(
+            period=period, total_points=20, total_boosted_points=40
+        )
+        ActivityFactory(period=other_period)
+
+        self.assertEqual(CampaignLeaderBoard.objects.update_campaigns(), 3)
+        self.assertEqual(
+            CampaignLeaderBoard.objects.get(address=top_activity.address).position, 1
+        )
+
+        # Only the provided campaign is recalculated
+        ActivityFactory(period=other_period)
+        next_period = PeriodFactory(
+            campaign=campaign,
+            start_date=period.end_date + datetime.timedelta(days=1),
+            end_date=period.end_date + datetime.timedelta(days=7),
+        )
+        ActivityFactory(
+            period=next_period,
+            address=top_activity.address,
+            total_points=5,
+            total_boosted_points=5,
+        )
+        self.assertEqual(CampaignLeaderBoard.objects.update_campaigns([campaign.id]), 2)
+        leader_board = CampaignLeaderBoard.objects.get(address=top_activity.address)
+        self.assertEqual(leader_board.total_campaign_points, 25)
+        self.assertEqual(leader_board.total_campaign_boosted_points, 45)
+        self.assertEqual(
+            CampaignLeaderBoard.objects.filter(
+                campaign_uuid=other_campaign.uuid
+            ).count(),
+            1,
+        )
@@ -1,16 +1,27 @@
+import csv
 import datetime
+from io import StringIO
+from typing import Any
+from unittest import mock
 
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
 
 from eth_account import Account
 from faker import Faker
 
-from ..models import Activity
+from ..models import Activity, get_file_storage
 from ..tasks import process_csv_task
-from .factories import PeriodFactory
+from .csv_factory import CSVFactory
+from .factories import ActivityFactory, PeriodFactory
 
 fake = Faker()
 
+IN_MEMORY_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
 
 def activity_entry(start_date: datetime.date, end_date: datetime.date):
     return {
@@ -25,6 +36,21 @@ def activity_entry(start_date: datetime.date, end_date: datetime.date):
     }
 
 
+def store_activities_file(activities: list[dict[str, Any]]) -> str:
+    """
+    :param activities:
+    :return: Name of the CSV file with the `activities` stored in the file storage
+    """
+    output = StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSVFactory.headers)
+    writer.writeheader()
+    writer.writerows(activities)
+    return get_file_storage().save(
+        "campaigns/activities/test.csv", ContentFile(output.getvalue().encode())
+    )
+
+
+@override_settings(STORAGES=IN_MEMORY_STORAGES)
 class ProcessCSVTestCase(TestCase):
     def setUp(self):
         start_date = fake.date_object()
@@ -39,13 +65,8 @@ class ProcessCSVTestCase(TestCase):
             start_date=self.period.start_date, end_date=self.period.end_date
         )
 
-        process_csv_task(
-            self.period.id,
-            [
-                activity_1,
-                activity_2,
-            ],
-        )
+        file_name = store_activities_file([activity_1, activity_2])
+        process_csv_task(self.period.id, file_name)
 
         self.assertEqual(Activity.objects.filter(period=self.period).count(), 2)
         actual_activity1 = Activity.objects.get(address=activity_1["safe_address"])
@@ -60,6 +81,65 @@ class ProcessCSVTestCase(TestCase):
         self.assertEqual(
             activity_2["total_boosted_points"], actual_activity2.total_boosted_points
         )
+        # File must be removed after processing it
+        self.assertFalse(get_file_storage().exists(file_name))
+
+    @mock.patch("safe_locking_service.campaigns.tasks.update_leaderboard_view")
+    @mock.patch("safe_locking_service.campaigns.tasks.bump_cache_version")
+    def test_process_csv_cache_invalidation(
+        self, bump_cache_version_mock: mock.MagicMock, update_leaderboard_mock
+    ):
+        activities = [
+            activity_entry(
+                start_date=self.period.start_date, end_date=self.period.end_date
+            )
+        ]
+        # Leaderboard refresh invalidates the cached responses after refreshing it
+        process_csv_task(self.period.id, store_activities_file(activities))
+        update_leaderboard_mock.assert_called_once_with(self.period.campaign_id)
+        bump_cache_version_mock.assert_not_called()
+
+        # Activities changed even if the leaderboard refresh failed
+        update_leaderboard_mock.side_effect = ValueError("Refresh failed")
+        process_csv_task(self.period.id, store_activities_file(activities))
+        bump_cache_version_mock.assert_called_once_with(
+            f"campaign:{self.period.campaign.uuid}"
+        )
+
+    def test_process_csv_batches(self):
+        ActivityFactory(period=self.period)
+        activities = [
+            activity_entry(
+                start_date=self.period.start_date, end_date=self.period.end_date
+            )
+            for _ in range(5)
+        ]
+
+        # Rows are sent to the database in several batches
+        with mock.patch("safe_locking_service.campaigns.tasks.BATCH_SIZE", 2):
+            process_csv_task(self.period.id, store_activities_file(activities))
+
+        self.assertEqual(Activity.objects.filter(period=self.period).count(), 5)
+        for activity in activities:
+            self.assertEqual(
+                Activity.objects.get(address=activity["safe_address"]).boost,
+                activity["boost"],
+            )
+
+    def test_process_csv_invalid_address(self):
+        activity = ActivityFactory(period=self.period)
+        invalid_activity = activity_entry(
+            start_date=self.period.start_date, end_date=self.period.end_date
+        )
+        invalid_activity["safe_address"] = "0x1234"
+
+        file_name = store_activities_file([invalid_activity])
+        process_csv_task(self.period.id, file_name)
+
+        # Nothing is stored and previous activities are kept
+        self.assertEqual(list(Activity.objects.filter(period=self.period)), [activity])
+        # File is kept to be processed again
+        self.assertTrue(get_file_storage().exists(file_name))
 
     def test_process_csv_clear_activities(self):
         activity = activity_entry(
@@ -69,8 +149,8 @@ class ProcessCSVTestCase(TestCase):
             start_date=self.period.start_date, end_date=self.period.end_date
         )
 
-        process_csv_task(self.period.id, [activity])
-        process_csv_task(self.period.id, [new_activity])
+        process_csv_task(self.period.id, store_activities_file([activity]))
+        process_csv_task(self.period.id, store_activities_file([new_activity]))
 
         self.assertEqual(Activity.objects.filter(period=self.period).count(), 1)
         actual_new_activity = Activity.objects.get(address=new_activity["safe_address"])
@@ -89,12 +169,7 @@ class ProcessCSVTestCase(TestCase):
             end_date=end_date,
         )
 
-        process_csv_task(
-            self.period.id,
-            [
-                activity,
-            ],
-        )
+        process_csv_task(self.period.id, store_activities_file([activity]))
 
         self.assertEqual(1, Activity.objects.filter(period=self.period).count())
 
@@ -106,12 +181,7 @@ class ProcessCSVTestCase(TestCase):
             end_date=end_date,
         )
 
-        process_csv_task(
-            self.period.id,
-            [
-                activity,
-            ],
-        )
+        process_csv_task(self.period.id, store_activities_file([activity]))
 
         self.assertEqual(0, Activity.objects.filter(period=self.period).count())
 
@@ -123,11 +193,6 @@ class ProcessCSVTestCase(TestCase):
             end_date=end_date,
         )
 
-        process_csv_task(
-            self.period.id,
-            [
-                activity,
-            ],
-        )
+        process_csv_task(self.period.id, store_activities_file([activity]))
 
         self.assertEqual(0, Activity.objects.filter(period=self.period).count())
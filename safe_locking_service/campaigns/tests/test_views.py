@@ -5,7 +5,7 @@ from unittest.mock import patch
 from django.contrib.auth.models import Permission, User
 from django.contrib.contenttypes.models import ContentType
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
@@ -21,9 +21,10 @@ from ...campaigns.tests.factories import (
 from ...utils.timestamp_helper import get_formated_timestamp
 from ..forms import FileUploadForm
 from ..management.commands.refresh_leaderboard_view import update_leaderboard_view
-from ..models import Period
+from ..models import Period, get_file_storage
 from .csv_factory import CSVFactory
 from .factories import PeriodFactory
+from .test_tasks import IN_MEMORY_STORAGES
 
 fake = Faker(0)
 
@@ -264,6 +265,7 @@ class TestCampaignViews(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+@override_settings(STORAGES=IN_MEMORY_STORAGES, CAMPAIGNS_MEDIA_ROOT_SHARED=True)
 class TestActivitiesUploadView(TestCase):
     def setUp(self):
         self.client = Client()
@@ -303,9 +305,34 @@ class TestActivitiesUploadView(TestCase):
         )
 
         task_mock.assert_called_once()
+        # Only the name of the stored file is sent to the task
+        period_id, file_name, encoding = task_mock.call_args.args
+        self.assertEqual(period_id, self.period.id)
+        self.assertEqual(encoding, "utf-8")
+        with get_file_storage().open(file_name) as stored_file:
+            self.assertEqual(stored_file.read().decode(), csv_content)
         self.assertEqual(302, response.status_code)
         self.assertRedirects(response, reverse("admin:index"))
 
+    @override_settings(CAMPAIGNS_MEDIA_ROOT_SHARED=False)
+    @patch("safe_locking_service.campaigns.tasks.process_csv_task.delay")
+    def test_activities_upload_not_shared_storage(self, task_mock):
+        upload = SimpleUploadedFile(
+            "testfile.csv",
+            CSVFactory().create().encode("utf-8"),
+            content_type="text/csv",
+        )
+
+        response = self.client.post(
+            reverse("v1:campaigns:activities_upload"),
+            {"file": upload, "period": self.period.id},
+        )
+
+        # Workers could not read the file
+        task_mock.assert_not_called()
+        self.assertEqual(200, response.status_code)
+        self.assertIn("CAMPAIGNS_MEDIA_ROOT_SHARED", response.context["error_message"])
+
     @patch("safe_locking_service.campaigns.tasks.process_csv_task.delay")
     def test_empty_data_upload(self, task_mock):
         response = self.client.get(reverse("v1:campaigns:activities_upload"), {})
@@ -388,6 +415,8 @@ class TestActivitiesUploadView(TestCase):
             boost=1,
             total_boosted_points=100,
         )
+        # Refresh materialized view
+        update_leaderboard_view()
 
         resource_id = campaign.uuid
         response = self.client.get(
@@ -425,6 +454,7 @@ class TestActivitiesUploadView(TestCase):
             boost=2,
             total_boosted_points=400,
         )
+        update_leaderboard_view()
         response = self.client.get(
             reverse("v1:locking_campaigns:leaderboard-campaign", args=(resource_id,)),
             format="json",
@@ -467,6 +497,8 @@ class TestActivitiesUploadView(TestCase):
             boost=1,
             total_boosted_points=50,
         )
+        # Refresh materialized view
+        update_leaderboard_view()
 
         resource_id = campaign.uuid
         response = self.client.get(
@@ -499,6 +531,22 @@ class TestActivitiesUploadView(TestCase):
         self.assertEqual(position_3["boost"], 1)
         self.assertEqual(position_3["totalBoostedPoints"], 50)
 
+        # Pagination is done by the database
+        response = self.client.get(
+            reverse("v1:locking_campaigns:leaderboard-campaign", args=(resource_id,))
+            + "?limit=1&offset=1",
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response_json = response.json()
+        self.assertEqual(response_json["count"], 3)
+        self.assertEqual(len(response_json["results"]), 1)
+        self.assertEqual(
+            response_json["results"][0]["holder"], safe_address_other_position_1
+        )
+        self.assertIsNotNone(response_json["next"])
+        self.assertIsNotNone(response_json["previous"])
+
     def test_rank_of_leaderboard_hidden_campaign_view(self):
         campaign = CampaignFactory(visible=False)
         period_1 = PeriodFactory(campaign=campaign)
@@ -598,6 +646,36 @@ class TestActivitiesUploadView(TestCase):
         self.assertEqual(position_2["boost"], 1)
         self.assertEqual(position_2["totalBoostedPoints"], 200)
 
+    @override_settings(CAMPAIGNS_LEADERBOARD_TABLE_ENABLED=True)
+    def test_leaderboard_campaign_position_view_table(self):
+        campaign = CampaignFactory()
+        period = PeriodFactory(campaign=campaign)
+        safe_address = Account.create().address
+        ActivityFactory(
+            period=period,
+            address=safe_address,
+            total_points=100,
+            boost=2,
+            total_boosted_points=200,
+        )
+        ActivityFactory(period=period, total_points=100, total_boosted_points=300)
+        update_leaderboard_view(campaign.id)
+
+        response = self.client.get(
+            reverse(
+                "v1:locking_campaigns:leaderboard-campaign-position",
+                args=(campaign.uuid, safe_address),
+            ),
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        position = response.json()
+        self.assertEqual(position["holder"], safe_address)
+        self.assertEqual(position["position"], 2)
+        self.assertEqual(position["totalPoints"], 100)
+        self.assertEqual(position["boost"], 2)
+        self.assertEqual(position["totalBoostedPoints"], 200)
+
     def test_leaderboard_hidden_campaign_position_view(self):
         campaign = CampaignFactory(visible=False)
         previous_day = timezone.now().date() - timedelta(days=1)
@@ -832,6 +910,36 @@ class TestGetAddressPeriodsView(TestCase):
             ],
         )
 
+    def test_periods_pagination(self):
+        campaign = CampaignFactory()
+        period_1 = PeriodFactory(
+            campaign=campaign, start_date="2024-06-11", end_date="2024-06-12"
+        )
+        period_2 = PeriodFactory(
+            campaign=campaign, start_date="2024-06-12", end_date="2024-06-13"
+        )
+        activities = [ActivityFactory(period=period_2) for _ in range(3)]
+        activities += [ActivityFactory(period=period_1) for _ in range(3)]
+
+        url = reverse(
+            "v1:locking_campaigns:get-address-periods",
+            kwargs={"resource_id": campaign.uuid},
+        )
+        # Campaign, count and page are retrieved using one query each
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"limit": 2, "offset": 2}, format="json")
+
+        json_response = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json_response["count"], 6)
+        self.assertEqual(
+            [result["holder"] for result in json_response["results"]],
+            [activity.address for activity in activities[2:4]],
+        )
+        self.assertEqual(
+            json_response["results"][1]["startDate"], str(period_1.start_date)
+        )
+
     def test_periods_for_a_different_campaign_are_not_returned(self):
         holder = Account.create().address
         # Activity for Campaign 1
@@ -1,17 +1,17 @@
 import csv
 import logging
+import uuid
 from io import TextIOWrapper
-from typing import IO, Optional
+from typing import List, Optional
 
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import permission_required
-from django.db.models import F, Max, Sum, Window
-from django.db.models.functions import Rank
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import F, Max
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -19,17 +19,43 @@ from rest_framework import status
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.response import Response
 
-from safe_locking_service.campaigns.models import get_campaign_leader_board_position
+from safe_locking_service.campaigns.models import (
+    get_campaign_leader_board,
+    get_campaign_leader_board_count,
+    get_campaign_leader_board_position,
+)
 from safe_locking_service.campaigns.serializers import (
     CampaignLeaderBoardSerializer,
     CampaignSerializer,
     PeriodAddressSerializer,
 )
-from safe_locking_service.locking_events.pagination import SmallPagination
+from safe_locking_service.locking_events.pagination import (
+    CustomListPagination,
+    SmallPagination,
+)
+from safe_locking_service.utils.cache import (
+    CAMPAIGNS_CACHE_VERSION,
+    cache_response,
+    get_campaign_cache_version_name,
+)
 
 from . import tasks
 from .forms import FileUploadForm
-from .models import Activity, Campaign, Period
+from .models import (
+    Activity,
+    Campaign,
+    Period,
+    get_file_storage,
+    is_file_storage_shared,
+)
+
+
+def get_campaigns_version_names(**kwargs) -> List[str]:
+    return [CAMPAIGNS_CACHE_VERSION]
+
+
+def get_campaign_version_names(resource_id, **kwargs) -> List[str]:
+    return [CAMPAIGNS_CACHE_VERSION, get_campaign_cache_version_name(resource_id)]
 
 
 class CampaignsView(ListAPIView):
@@ -45,15 +71,13 @@ class CampaignsView(ListAPIView):
             Campaign.objects.filter(visible=True)
             .prefetch_related("activity_metadata")
             .annotate(last_updated=Max("periods__end_date"))
-            .order_by("-start_date", "-end_date")
+            .order_by("-start_date", "-end_date", "pk")
         )
 
-    @method_decorator(cache_page(1 * 60))  # 1 minute
+    @cache_response(get_campaigns_version_names)
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        paginated_data = self.paginate_queryset(serializer.data)
-        return self.get_paginated_response(paginated_data)
+        # Only the campaigns of the page are retrieved (and their metadata prefetched) and serialized
+        return super().list(request, *args, **kwargs)
 
 
 class RetrieveCampaignView(RetrieveAPIView):
@@ -70,7 +94,7 @@ class RetrieveCampaignView(RetrieveAPIView):
             .annotate(last_updated=Max("periods__end_date"))
         )
 
-    @method_decorator(cache_page(1 * 60))  # 1 minute
+    @cache_response(get_campaigns_version_names)
     def get(self, request, *args, **kwargs):
         resource_id = kwargs["resource_id"]
         queryset = self.get_queryset(resource_id)
@@ -108,10 +132,9 @@ def upload_activities_view(request: HttpRequest) -> HttpResponse:
         if form.is_valid():
             try:
                 period = form.cleaned_data["period"]
-                file = TextIOWrapper(
-                    request.FILES["file"].file, encoding=request.encoding
+                process_activity_file(
+                    period, request.FILES["file"], encoding=request.encoding
                 )
-                process_activity_file(period, file)
                 return redirect(reverse("admin:index"))
             except Exception as e:
                 logger.warning(e)
@@ -127,17 +150,40 @@ def upload_activities_view(request: HttpRequest) -> HttpResponse:
     return render(request, "activities/upload.html", {"form": form})
 
 
-def process_activity_file(period: Period, file: IO[str]) -> None:
-    reader = csv.DictReader(file)
+def process_activity_file(
+    period: Period, file: UploadedFile, encoding: Optional[str] = None
+) -> None:
+    """
+    Validate the CSV headers and store the file, so only its name is sent to the task processing it
+
+    :param period:
+    :param file: Uploaded CSV file
+    :param encoding: Encoding of the file, `utf-8` if not provided
+    :raises ImproperlyConfigured: If the file storage is not shared with the workers
+    """
+    if not is_file_storage_shared():
+        raise ImproperlyConfigured(
+            "Activities are processed by the workers, configure S3 storage or set "
+            "CAMPAIGNS_MEDIA_ROOT_SHARED if the media folder is shared with them"
+        )
 
-    file_headers = reader.fieldnames
+    encoding = encoding or "utf-8"
+    text_file = TextIOWrapper(file.file, encoding=encoding, newline="")
+    try:
+        file_headers = csv.DictReader(text_file).fieldnames or []
+    finally:
+        # Do not close the uploaded file when the wrapper is garbage collected
+        text_file.detach()
     if not csv_headers.issubset(file_headers):
         raise ValueError(
             f"File does not include one or more of the following headers: {csv_headers}"
         )
 
-    activities_list = [row for row in reader]
-    tasks.process_csv_task.delay(period.id, activities_list)
+    file.seek(0)
+    file_name = get_file_storage().save(
+        f"campaigns/activities/{period.slug}/{uuid.uuid4()}.csv", file
+    )
+    tasks.process_csv_task.delay(period.id, file_name, encoding)
 
 
 class CampaignLeaderBoardView(ListAPIView):
@@ -148,35 +194,21 @@ class CampaignLeaderBoardView(ListAPIView):
     pagination_class = SmallPagination
     serializer_class = CampaignLeaderBoardSerializer
 
-    def get_queryset(self):
+    def get_campaign(self) -> Campaign:
         resource_id = self.kwargs["resource_id"]
-        campaign = get_object_or_404(Campaign, uuid=resource_id, visible=True)
+        return get_object_or_404(Campaign, uuid=resource_id, visible=True)
 
-        return (
-            Activity.objects.select_related("period__campaign")
-            .filter(period__campaign=campaign)
-            .values("address")
-            .annotate(
-                total_campaign_points=Sum("total_points"),
-                total_campaign_boosted_points=Sum("total_boosted_points"),
-                last_boost=F("total_campaign_boosted_points")
-                / F("total_campaign_points"),
-            )
-            .order_by(F("total_campaign_boosted_points").desc())
-            .annotate(
-                position=Window(
-                    expression=Rank(),
-                    order_by=F("total_campaign_boosted_points").desc(),
-                )
-            )
-        )
+    def get_queryset(self, campaign: Campaign, limit: int, offset: int):
+        return get_campaign_leader_board(campaign.uuid, limit, offset)
 
-    @method_decorator(cache_page(1 * 60))  # 1 minute
+    @cache_response(get_campaign_version_names)
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        campaign = self.get_campaign()
+        paginator = CustomListPagination(self.request)
+        queryset = self.get_queryset(campaign, paginator.limit, paginator.offset)
+        paginator.set_count(get_campaign_leader_board_count(campaign.uuid))
         serializer = self.serializer_class(queryset, many=True)
-        paginated_data = self.paginate_queryset(serializer.data)
-        return self.get_paginated_response(paginated_data)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class CampaignLeaderBoardPositionView(RetrieveAPIView):
@@ -192,7 +224,7 @@ class CampaignLeaderBoardPositionView(RetrieveAPIView):
         campaign = get_object_or_404(Campaign, uuid=resource_id, visible=True)
         return get_campaign_leader_board_position(campaign.uuid, address)
 
-    @method_decorator(cache_page(1 * 60))  # 1 minute
+    @cache_response(get_campaign_version_names)
     def get(self, *args, **kwargs):
         queryset = self.get_queryset()
         if not queryset:
@@ -221,7 +253,15 @@ class GetAddressPeriodsView(ListAPIView):
         else:
             queryset = Activity.objects.filter(period__campaign=campaign)
 
-        return queryset.select_related("period").order_by("-period__start_date")
+        # Read only list, model instances are not required
+        return queryset.values(
+            "address",
+            "boost",
+            "total_points",
+            "total_boosted_points",
+            start_date=F("period__start_date"),
+            end_date=F("period__end_date"),
+        ).order_by("-period__start_date", "pk")
 
     @swagger_auto_schema(
         manual_parameters=[
@@ -233,10 +273,7 @@ class GetAddressPeriodsView(ListAPIView):
             )
         ]
     )
-    @method_decorator(cache_page(1 * 60))  # 1 minute
-    def get(self, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-        paginated_data = self.paginate_queryset(serializer.data)
-
-        return self.get_paginated_response(paginated_data)
+    @cache_response(get_campaign_version_names)
+    def get(self, request, *args, **kwargs):
+        # Pagination is done by the database, only the page is serialized
+        return self.list(request, *args, **kwargs)
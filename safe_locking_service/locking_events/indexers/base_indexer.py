@@ -1,5 +1,4 @@
-import time
-from contextlib import contextmanager
+import threading
 from logging import getLogger
 
 from django.conf import settings
@@ -21,72 +20,76 @@ class BaseIndexer:
         block_process_limit_max: int = settings.INDEXER_BLOCK_PROCESS_LIMIT_MAX,
         enable_auto_block_process_limit: bool = settings.INDEXER_ENABLE_AUTO_BLOCK_PROCESS_LIMIT,
         blocks_behind: int = settings.INDEXER_BLOCKS_BEHIND,
+        block_process_target_seconds: float = settings.INDEXER_BLOCK_PROCESS_TARGET_SECONDS,
+        max_results_per_request: int = settings.INDEXER_MAX_RESULTS_PER_REQUEST,
     ):
         self.block_process_limit = block_process_limit
         self.block_process_limit_max = block_process_limit_max
         self.enable_auto_block_process_limit = enable_auto_block_process_limit
         self.blocks_behind = blocks_behind
+        self.block_process_target_seconds = block_process_target_seconds
+        self.max_results_per_request = max_results_per_request
         self.ethereum_client = ethereum_client
+        # Block ranges are requested concurrently and every thread can adjust `block_process_limit`, so
+        # only the first measure of a batch of ranges changes it, as the rest do not match the new limit
+        self._block_process_limit_lock = threading.Lock()
 
-    @contextmanager
-    def auto_adjust_block_limit(self, from_block_number: int, to_block_number: int):
+    def auto_adjust_block_limit(
+        self,
+        from_block_number: int,
+        to_block_number: int,
+        elapsed_seconds: float,
+        number_results: int,
+    ):
         """
         Optimize number of queried blocks every time (block process limit)
-        based on how fast the block interval is retrieved
+        based on how fast the block interval was retrieved and how many results it returned.
+        Block process limit is scaled to get close to `block_process_target_seconds` per request
+        while keeping the results under `max_results_per_request`, growing as much as x2 and
+        shrinking as much as x0.5 every time
+
+        :param from_block_number:
+        :param to_block_number:
+        :param elapsed_seconds: Time spent retrieving the block interval, measured with a monotonic clock
+        :param number_results: Number of elements (logs) returned for the block interval
         """
+        with self._block_process_limit_lock:
+            # Check that we are processing the `block_process_limit`, if not, measures are not valid
+            if not (
+                self.enable_auto_block_process_limit
+                and (1 + to_block_number - from_block_number)
+                == self.block_process_limit
+            ):
+                # Auto adjustment disabled
+                return
 
-        # Check that we are processing the `block_process_limit`, if not, measures are not valid
-        if not (
-            self.enable_auto_block_process_limit
-            and (1 + to_block_number - from_block_number) == self.block_process_limit
-        ):
-            # Auto adjustment disabled
-            yield
-        else:
-            start = int(time.time())
-            yield
-            delta = int(time.time()) - start
-            if delta > 30:
-                self.block_process_limit = max(self.block_process_limit // 2, 1)
-                logger.info(
-                    "%s: block_process_limit halved to %d",
-                    self.__class__.__name__,
-                    self.block_process_limit,
-                )
-            elif delta > 10:
-                new_block_process_limit = max(self.block_process_limit - 20, 1)
-                self.block_process_limit = new_block_process_limit
-                logger.info(
-                    "%s: block_process_limit decreased to %d",
-                    self.__class__.__name__,
-                    self.block_process_limit,
-                )
-            elif delta < 2:
-                self.block_process_limit *= 2
-                logger.info(
-                    "%s: block_process_limit duplicated to %d",
-                    self.__class__.__name__,
-                    self.block_process_limit,
-                )
-            elif delta < 5:
-                self.block_process_limit += 20
-                logger.info(
-                    "%s: block_process_limit increased to %d",
-                    self.__class__.__name__,
-                    self.block_process_limit,
+            factor = self.block_process_target_seconds / max(elapsed_seconds, 1e-3)
+            if self.max_results_per_request:
+                factor = min(
+                    factor, self.max_results_per_request / max(number_results, 1)
                 )
+            factor = min(max(factor, 0.5), 2.0)
+            if 0.8 <= factor <= 1.25:
+                # Close enough to the target, prevent oscillations
+                return
 
+            previous_block_process_limit = self.block_process_limit
+            self.block_process_limit = max(int(self.block_process_limit * factor), 1)
             if (
                 self.block_process_limit_max
                 and self.block_process_limit > self.block_process_limit_max
             ):
+                self.block_process_limit = self.block_process_limit_max
+
+            if self.block_process_limit != previous_block_process_limit:
                 logger.info(
-                    "%s: block_process_limit %d is bigger than block_process_limit_max %d, reducing",
+                    "%s: block_process_limit changed from %d to %d, elapsed=%.3fs results=%d",
                     self.__class__.__name__,
+                    previous_block_process_limit,
                     self.block_process_limit,
-                    self.block_process_limit_max,
+                    elapsed_seconds,
+                    number_results,
                 )
-                self.block_process_limit = self.block_process_limit_max
 
     def get_current_last_block(self) -> int:
         """
@@ -150,4 +153,25 @@ class BaseIndexer:
 
         :return:
         """
-        self.block_process_limit = 1
+        with self._block_process_limit_lock:
+            self.block_process_limit = 1
+
+    def bisect_block_process_limit(self, from_block_number: int, to_block_number: int):
+        """
+        Set block_process_limit to half of a block range that returned too many results for the RPC provider,
+        so next request is likely to be accepted without collapsing the limit to 1. It will never be increased
+
+        :param from_block_number:
+        :param to_block_number:
+        :return:
+        """
+        with self._block_process_limit_lock:
+            self.block_process_limit = min(
+                self.block_process_limit,
+                max((1 + to_block_number - from_block_number) // 2, 1),
+            )
+            logger.info(
+                "%s: block_process_limit bisected to %d",
+                self.__class__.__name__,
+                self.block_process_limit,
+            )
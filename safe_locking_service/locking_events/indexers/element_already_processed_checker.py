@@ -1,16 +1,30 @@
-from logging import getLogger
-from typing import Optional
+import sys
+from logging import DEBUG, getLogger
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from django.conf import settings
 
 from hexbytes import HexBytes
 
+from safe_locking_service.locking_events.redis import get_redis
+
 logger = getLogger(__name__)
 
 
+class ProcessedElement(NamedTuple):
+    tx_hash: HexBytes
+    block_hash: Optional[HexBytes]
+    index: int = 0  # Only for events
+    block_number: int = 0
+
+
 class FixedSizeDict(dict):
     """
-    Fixed size dictionary to be used as an LRU cache
+    Fixed size dictionary to be used as an LRU cache. Accessed keys must be refreshed using `touch`,
+    the least recently used key is removed when `maxlen` is exceeded
 
-    Dictionaries are guaranteed to be insertion sorted from Python 3.7 onwards
+    Dictionaries are guaranteed to be insertion sorted from Python 3.7 onwards, so reinserting a key
+    moves it to the end with `OrderedDict.move_to_end` semantics, using less memory than an `OrderedDict`
     """
 
     def __init__(self, *args, maxlen: Optional[int] = 0, **kwargs):
@@ -23,23 +37,68 @@ class FixedSizeDict(dict):
             if len(self) > self._maxlen:
                 self.pop(next(iter(self)))
 
+    def touch(self, key) -> bool:
+        """
+        Mark `key` as the most recently used
+
+        :param key:
+        :return: ``True`` if key is in the dictionary, ``False`` otherwise
+        """
+        try:
+            dict.__setitem__(self, key, self.pop(key))
+            return True
+        except KeyError:
+            return False
+
 
 class ElementAlreadyProcessedChecker:
     """
     Keeps a cache of already processed transactions and events
     """
 
-    def __init__(self):
-        self._processed_element_cache = FixedSizeDict(maxlen=40_000)  # Around 3MiB
+    def __init__(self, maxlen: int = settings.INDEXER_PROCESSED_ELEMENTS_CACHE_SIZE):
+        """
+        :param maxlen: Number of elements to keep in the cache. Every element takes around 100 bytes
+        """
+        self._processed_element_cache = FixedSizeDict(maxlen=maxlen)
+        self.hits = 0
+        self.misses = 0
 
     def clear(self) -> None:
         return self._processed_element_cache.clear()
 
-    def get_key(self, tx_hash: HexBytes, block_hash: HexBytes, index: int) -> HexBytes:
-        tx_hash = HexBytes(tx_hash)
-        block_hash = HexBytes(block_hash or 0)
-        index = HexBytes(index)
-        return tx_hash + block_hash + index
+    @staticmethod
+    def get_key(tx_hash: bytes, block_hash: Optional[bytes], index: int) -> int:
+        """
+        :param tx_hash:
+        :param block_hash:
+        :param index:
+        :return: Compact 128 bits key, built using the first 8 bytes of the `tx_hash`, the first 4 bytes of
+            the `block_hash` and 4 bytes for the `index`. As hashes are random, collisions are not expected
+        """
+        key = int.from_bytes(tx_hash[:8], "big") << 64 | (index & 0xFFFFFFFF)
+        if block_hash:
+            key |= int.from_bytes(block_hash[:4], "big") << 32
+        return key
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        :return: Dictionary with the number of elements, memory used (estimated) and hit rate of the cache
+        """
+        size = len(self._processed_element_cache)
+        element_size = (
+            sys.getsizeof(next(iter(self._processed_element_cache))) if size else 0
+        )
+        requests = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self._processed_element_cache._maxlen,
+            "memory_bytes": sys.getsizeof(self._processed_element_cache)
+            + size * element_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
 
     def is_processed(
         self, tx_hash: HexBytes, block_hash: Optional[HexBytes], index: int = 0
@@ -51,10 +110,28 @@ class ElementAlreadyProcessedChecker:
         :return: ``True`` if element was processed, ``False`` otherwise
         """
         tx_id = self.get_key(tx_hash, block_hash, index)
-        return tx_id in self._processed_element_cache
+        if self._processed_element_cache.touch(tx_id):
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def are_processed(self, elements: Sequence[ProcessedElement]) -> List[bool]:
+        """
+        :param elements:
+        :return: ``True`` for every element that was processed, ``False`` otherwise
+        """
+        return [
+            self.is_processed(element.tx_hash, element.block_hash, element.index)
+            for element in elements
+        ]
 
     def mark_as_processed(
-        self, tx_hash: HexBytes, block_hash: Optional[HexBytes], index: int = 0
+        self,
+        tx_hash: HexBytes,
+        block_hash: Optional[HexBytes],
+        index: int = 0,
+        block_number: int = 0,
     ) -> bool:
         """
         Mark element as processed if it is not already marked
@@ -62,24 +139,171 @@ class ElementAlreadyProcessedChecker:
         :param tx_hash:
         :param block_hash:
         :param index: Only for events
+        :param block_number: Block of the element, used by backends that expire elements by block age
         :return: ``True`` if element was marked as processed, ``False`` if it was marked already
         """
         tx_id = self.get_key(tx_hash, block_hash, index)
 
-        if tx_id in self._processed_element_cache:
-            logger.debug(
-                "Element with tx-hash=%s on block=%s with index=%d was already processed",
-                tx_hash.hex(),
-                block_hash.hex(),
-                index,
-            )
+        # Hashes are only converted to hex if debug logging is enabled, as it is called for every element
+        if self._processed_element_cache.touch(tx_id):
+            if logger.isEnabledFor(DEBUG):
+                logger.debug(
+                    "Element with tx-hash=%s on block=%s with index=%d was already processed",
+                    tx_hash.hex(),
+                    block_hash.hex() if block_hash else None,
+                    index,
+                )
             return False
         else:
-            logger.debug(
-                "Marking element with tx-hash=%s on block=%s with index=%d as processed",
-                tx_hash.hex(),
-                block_hash.hex(),
-                index,
-            )
+            if logger.isEnabledFor(DEBUG):
+                logger.debug(
+                    "Marking element with tx-hash=%s on block=%s with index=%d as processed",
+                    tx_hash.hex(),
+                    block_hash.hex() if block_hash else None,
+                    index,
+                )
             self._processed_element_cache[tx_id] = None
             return True
+
+    def mark_as_processed_batch(self, elements: Sequence[ProcessedElement]) -> None:
+        """
+        Mark elements as processed
+
+        :param elements:
+        :return:
+        """
+        for element in elements:
+            self.mark_as_processed(*element)
+
+
+class RedisElementAlreadyProcessedChecker(ElementAlreadyProcessedChecker):
+    """
+    Keeps a cache of already processed transactions and events in a Redis sorted set, using the block number
+    as the score. Cache is shared between workers and survives restarts. Elements older than `max_block_age`
+    blocks from the last processed block are removed
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_block_age: int = settings.INDEXER_PROCESSED_ELEMENTS_CACHE_MAX_BLOCK_AGE,
+    ):
+        """
+        :param name: Unique name for the cache, so different indexers don't share it
+        :param max_block_age: 0 == elements are never removed
+        """
+        self.redis = get_redis()
+        self.redis_key = f"indexer:processed-elements:{name}"
+        self.max_block_age = max_block_age
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        self.redis.delete(self.redis_key)
+
+    def get_member(
+        self, tx_hash: bytes, block_hash: Optional[bytes], index: int
+    ) -> bytes:
+        """
+        :return: 16 bytes representation of the key, to be stored in the Redis sorted set
+        """
+        return self.get_key(tx_hash, block_hash, index).to_bytes(16, "big")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        :return: Dictionary with the number of elements, memory used and hit rate of the cache
+        """
+        pipeline = self.redis.pipeline()
+        pipeline.zcard(self.redis_key)
+        pipeline.memory_usage(self.redis_key)
+        size, memory_bytes = pipeline.execute()
+        requests = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": None,
+            "memory_bytes": memory_bytes or 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+    def is_processed(
+        self, tx_hash: HexBytes, block_hash: Optional[HexBytes], index: int = 0
+    ) -> bool:
+        return self.are_processed([ProcessedElement(tx_hash, block_hash, index)])[0]
+
+    def are_processed(self, elements: Sequence[ProcessedElement]) -> List[bool]:
+        """
+        Check all the elements with only one request to Redis
+
+        :param elements:
+        :return: ``True`` for every element that was processed, ``False`` otherwise
+        """
+        if not elements:
+            return []
+
+        scores = self.redis.zmscore(
+            self.redis_key,
+            [
+                self.get_member(element.tx_hash, element.block_hash, element.index)
+                for element in elements
+            ],
+        )
+        processed = [score is not None for score in scores]
+        hits = sum(processed)
+        self.hits += hits
+        self.misses += len(processed) - hits
+        return processed
+
+    def mark_as_processed(
+        self,
+        tx_hash: HexBytes,
+        block_hash: Optional[HexBytes],
+        index: int = 0,
+        block_number: int = 0,
+    ) -> bool:
+        return bool(
+            self.redis.zadd(
+                self.redis_key,
+                {self.get_member(tx_hash, block_hash, index): block_number},
+            )
+        )
+
+    def mark_as_processed_batch(self, elements: Sequence[ProcessedElement]) -> None:
+        """
+        Mark elements as processed and remove the expired ones with only one request to Redis
+
+        :param elements:
+        :return:
+        """
+        if not elements:
+            return
+
+        pipeline = self.redis.pipeline()
+        pipeline.zadd(
+            self.redis_key,
+            {
+                self.get_member(
+                    element.tx_hash, element.block_hash, element.index
+                ): element.block_number
+                for element in elements
+            },
+        )
+        if self.max_block_age:
+            last_block_number = max(element.block_number for element in elements)
+            pipeline.zremrangebyscore(
+                self.redis_key, "-inf", f"({last_block_number - self.max_block_age}"
+            )
+        pipeline.execute()
+
+
+def get_element_already_processed_checker(
+    name: str,
+) -> ElementAlreadyProcessedChecker:
+    """
+    :param name: Unique name for the cache, used by shared backends
+    :return: Processed elements cache using the backend configured in `INDEXER_PROCESSED_ELEMENTS_CACHE_BACKEND`
+    """
+    if settings.INDEXER_PROCESSED_ELEMENTS_CACHE_BACKEND == "redis":
+        return RedisElementAlreadyProcessedChecker(name)
+    return ElementAlreadyProcessedChecker()
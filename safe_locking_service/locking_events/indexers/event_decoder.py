@@ -0,0 +1,119 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from eth_utils import to_checksum_address
+from web3.datastructures import AttributeDict
+from web3.types import ABIEvent, EventData, LogReceipt
+
+WordDecoder = Callable[[bytes], Any]
+EventDecoder = Callable[[LogReceipt], Optional[EventData]]
+
+ZERO_WORD = bytes(32)
+UINT_TYPE_REGEX = re.compile(r"^uint(\d+)$")
+FIXED_BYTES_TYPE_REGEX = re.compile(r"^bytes(\d+)$")
+
+
+def _decode_address(word: bytes) -> Optional[str]:
+    if word[:12] != ZERO_WORD[:12]:
+        return None
+    return to_checksum_address(word[12:])
+
+
+def _get_uint_decoder(bits: int) -> WordDecoder:
+    def decode_uint(word: bytes) -> Optional[int]:
+        value = int.from_bytes(word, "big")
+        return None if value >> bits else value
+
+    return decode_uint
+
+
+def _decode_bool(word: bytes) -> Optional[bool]:
+    value = int.from_bytes(word, "big")
+    return None if value > 1 else bool(value)
+
+
+def _get_fixed_bytes_decoder(size: int) -> WordDecoder:
+    padding = ZERO_WORD[size:]
+
+    def decode_fixed_bytes(word: bytes) -> Optional[bytes]:
+        return None if word[size:] != padding else bytes(word[:size])
+
+    return decode_fixed_bytes
+
+
+def get_word_decoder(abi_type: str) -> Optional[WordDecoder]:
+    """
+    :param abi_type:
+    :return: Function decoding one 32 bytes word of the provided static `abi_type`, returning
+        ``None`` if the word is not valid for the type. ``None`` if `abi_type` is not supported
+    """
+    if abi_type == "address":
+        return _decode_address
+    if abi_type == "bool":
+        return _decode_bool
+    if match := UINT_TYPE_REGEX.match(abi_type):
+        bits = int(match.group(1))
+        return _get_uint_decoder(bits) if 0 < bits <= 256 else None
+    if match := FIXED_BYTES_TYPE_REGEX.match(abi_type):
+        size = int(match.group(1))
+        return _get_fixed_bytes_decoder(size) if 0 < size <= 32 else None
+    return None
+
+
+def build_event_decoder(event_abi: ABIEvent) -> Optional[EventDecoder]:
+    """
+    Precompile a decoder for `event_abi` working directly with the bytes of the log receipt topics
+    and data, skipping the generic ABI decoding done by web3
+
+    :param event_abi:
+    :return: Function returning `EventData` compatible with web3 `ContractEvent.process_log`, or ``None``
+        if the log receipt does not match the expected shape. ``None`` if the event is anonymous or has
+        parameters that are not `address`, `bool`, `uintN` or `bytesN`
+    """
+    if event_abi.get("anonymous"):
+        return None
+
+    event_name = event_abi["name"]
+    topic_decoders: List[Tuple[str, WordDecoder]] = []
+    data_decoders: List[Tuple[str, WordDecoder]] = []
+    for event_input in event_abi["inputs"]:
+        if not (word_decoder := get_word_decoder(event_input["type"])):
+            return None
+        decoders = topic_decoders if event_input.get("indexed") else data_decoders
+        decoders.append((event_input["name"], word_decoder))
+
+    topics_length = len(topic_decoders) + 1  # First topic is the event signature
+    data_length = len(data_decoders) * 32
+
+    def decode_event(log_receipt: LogReceipt) -> Optional[EventData]:
+        topics = log_receipt["topics"]
+        data = log_receipt["data"]
+        if len(topics) != topics_length or len(data) != data_length:
+            return None
+
+        args: Dict[str, Any] = {}
+        for (name, word_decoder), topic in zip(topic_decoders, topics[1:]):
+            if len(topic) != 32 or (value := word_decoder(topic)) is None:
+                return None
+            args[name] = value
+        for position, (name, word_decoder) in enumerate(data_decoders):
+            if (
+                value := word_decoder(data[position * 32 : (position + 1) * 32])
+            ) is None:
+                return None
+            args[name] = value
+
+        return AttributeDict(
+            {
+                "args": AttributeDict(args),
+                "event": event_name,
+                "logIndex": log_receipt["logIndex"],
+                "transactionIndex": log_receipt["transactionIndex"],
+                "transactionHash": log_receipt["transactionHash"],
+                "address": log_receipt["address"],
+                "blockHash": log_receipt["blockHash"],
+                "blockNumber": log_receipt["blockNumber"],
+            }
+        )
+
+    return decode_event
@@ -1,7 +1,11 @@
+import time
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
 from logging import getLogger
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
 
 from eth_abi.exceptions import DecodingError
 from eth_typing import ChecksumAddress
@@ -12,15 +16,55 @@ from web3.exceptions import LogTopicError
 from web3.types import EventData, FilterParams, LogReceipt
 
 from .base_indexer import BaseIndexer
-from .element_already_processed_checker import ElementAlreadyProcessedChecker
+from .element_already_processed_checker import (
+    ElementAlreadyProcessedChecker,
+    ProcessedElement,
+    get_element_already_processed_checker,
+)
+from .event_decoder import EventDecoder, build_event_decoder
 
 logger = getLogger(__name__)
 
 
+# Errors returned by RPC providers when a `getLogs` request matches too many elements
+TOO_MANY_RESULTS_ERRORS = (
+    "query returned more than",
+    "response size exceeded",
+    "response size should not greater than",
+    "log response size exceeded",
+    "too many results",
+    "limit exceeded",
+    "block range is too wide",
+    "exceed maximum block range",
+    "range too large",
+)
+
+
 class FindRelevantEventsException(Exception):
     pass
 
 
+class TooManyResultsException(FindRelevantEventsException):
+    """
+    RPC provider rejected a block range because it contains too many results
+    """
+
+    def __init__(self, message: str, from_block_number: int, to_block_number: int):
+        super().__init__(message)
+        self.from_block_number = from_block_number
+        self.to_block_number = to_block_number
+
+
+def is_too_many_results_error(exception: Exception) -> bool:
+    """
+    :param exception:
+    :return: ``True`` if the provided exception was raised because the RPC provider limits
+        the number of results or the block range of a `getLogs` request, ``False`` otherwise
+    """
+    message = str(exception).lower()
+    return any(error in message for error in TOO_MANY_RESULTS_ERRORS)
+
+
 class EventsContractIndexer(BaseIndexer):
     """
     Index contract events
@@ -28,9 +72,26 @@ class EventsContractIndexer(BaseIndexer):
 
     contract_address: ChecksumAddress
 
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        concurrent_requests: int = settings.INDEXER_CONCURRENT_REQUESTS,
+        block_range_split_max_depth: int = settings.INDEXER_BLOCK_RANGE_SPLIT_MAX_DEPTH,
+        element_already_processed_checker: Optional[
+            ElementAlreadyProcessedChecker
+        ] = None,
+        **kwargs,
+    ):
         # Number of concurrent requests to `getLogs`
-        self.element_already_processed_checker = ElementAlreadyProcessedChecker()
+        self.concurrent_requests = max(concurrent_requests, 1)
+        # Number of times a failing block range can be split in half and retried
+        self.block_range_split_max_depth = block_range_split_max_depth
+        self.element_already_processed_checker = (
+            element_already_processed_checker
+            or get_element_already_processed_checker(
+                f"{self.__class__.__name__}:{self.contract_address}"
+            )
+        )
         super().__init__(*args, **kwargs)
 
     @cached_property
@@ -55,6 +116,22 @@ class EventsContractIndexer(BaseIndexer):
             events_to_listen.setdefault(key, []).append(event)
         return events_to_listen
 
+    @cached_property
+    def event_decoders(self) -> Dict[bytes, List[EventDecoder]]:
+        """
+        Precompiled decoders for the events to listen, so decoding a log receipt does not
+        go through the web3 generic ABI decoding
+
+        :return: Dictionary with `topic` as the key and a list of event decoders. Events not supported
+            by the fast decoders are not included, and they will be decoded using web3
+        """
+        event_decoders = {}
+        for event in self.contract_events:
+            if event_decoder := build_event_decoder(event.abi):
+                key = event_abi_to_log_topic(event.abi)
+                event_decoders.setdefault(key, []).append(event_decoder)
+        return event_decoders
+
     def _fetch_log_events_from_node(
         self,
         from_block_number: int,
@@ -74,43 +151,74 @@ class EventsContractIndexer(BaseIndexer):
             "toBlock": to_block_number,
             "topics": [filter_topics],
         }
-        with self.auto_adjust_block_limit(from_block_number, to_block_number):
-            return self.ethereum_client.slow_w3.eth.get_logs(parameters)
+        start = time.perf_counter()
+        log_receipts = self.ethereum_client.slow_w3.eth.get_logs(parameters)
+        self.auto_adjust_block_limit(
+            from_block_number,
+            to_block_number,
+            time.perf_counter() - start,
+            len(log_receipts),
+        )
+        return log_receipts
 
     def _find_log_events_by_topics(
         self,
         from_block_number: int,
         to_block_number: int,
+        split_depth: int = 0,
     ) -> List[LogReceipt]:
         """
         It will get contract events using filtering by contract_events topics.
+        If the RPC provider rejects the request because of too many results, block range will be split in half
+        and both halves will be retried, up to `block_range_split_max_depth` times. Other errors (connection
+        errors, timeouts...) are raised without splitting the range
 
         :param from_block_number:
         :param to_block_number:
+        :param split_depth: Number of times the original block range was already split
         :return: LogReceipt for matching events
         """
         try:
             return self._fetch_log_events_from_node(from_block_number, to_block_number)
-        except IOError as e:
-            logger.error(
-                "%s: Error retrieving events from-block=%d to-block=%d : %s",
-                self.__class__.__name__,
-                from_block_number,
-                to_block_number,
-                e,
-            )
-            raise FindRelevantEventsException(
-                f"Request error retrieving events "
-                f"from-block={from_block_number} to-block={to_block_number}"
-            ) from e
-        except ValueError as e:
+        except (IOError, ValueError) as e:
+            too_many_results = is_too_many_results_error(e)
+            if (
+                too_many_results
+                and split_depth < self.block_range_split_max_depth
+                and from_block_number < to_block_number
+            ):
+                middle_block_number = (from_block_number + to_block_number) // 2
+                logger.warning(
+                    "%s: Error retrieving events from-block=%d to-block=%d, splitting range on block=%d : %s",
+                    self.__class__.__name__,
+                    from_block_number,
+                    to_block_number,
+                    middle_block_number,
+                    e,
+                )
+                log_receipts = self._find_log_events_by_topics(
+                    from_block_number, middle_block_number, split_depth + 1
+                ) + self._find_log_events_by_topics(
+                    middle_block_number + 1, to_block_number, split_depth + 1
+                )
+                self.bisect_block_process_limit(from_block_number, to_block_number)
+                return log_receipts
+
             logger.error(
-                "%s: Value error retrieving events from-block=%d to-block=%d : %s",
+                "%s: %s retrieving events from-block=%d to-block=%d : %s",
                 self.__class__.__name__,
+                "Value error" if isinstance(e, ValueError) else "Error",
                 from_block_number,
                 to_block_number,
                 e,
             )
+            if too_many_results:
+                raise TooManyResultsException(
+                    f"Too many results retrieving events "
+                    f"from-block={from_block_number} to-block={to_block_number}",
+                    from_block_number,
+                    to_block_number,
+                ) from e
             raise FindRelevantEventsException(
                 f"Request error retrieving events "
                 f"from-block={from_block_number} to-block={to_block_number}"
@@ -151,12 +259,45 @@ class EventsContractIndexer(BaseIndexer):
         )
         return log_receipts
 
+    def find_relevant_log_events_for_block_ranges(
+        self, block_ranges: Sequence[Tuple[int, int]]
+    ) -> Iterator[List[LogReceipt]]:
+        """
+        Search for log receipts for contract events on every block range, performing up to
+        `concurrent_requests` requests to the node at the same time
+
+        :param block_ranges: Consecutive `(from_block_number, to_block_number)` ranges
+        :return: LogReceipt for matching events for every block range, in the same order as `block_ranges`
+        :raises FindRelevantEventsException: when reaching a block range that could not be retrieved,
+            after yielding the results of the previous ones
+        """
+        if len(block_ranges) == 1:
+            yield self.find_relevant_log_events(*block_ranges[0])
+            return
+
+        with ThreadPoolExecutor(max_workers=len(block_ranges)) as executor:
+            futures = [
+                executor.submit(
+                    self.find_relevant_log_events, from_block_number, to_block_number
+                )
+                for from_block_number, to_block_number in block_ranges
+            ]
+
+        for future in futures:
+            yield future.result()
+
     def decode_event(self, log_receipt: LogReceipt) -> Optional[EventData]:
         """
         :param log_receipt:
         :return: Decode `log_receipt` using all the possible ABIs for the topic. Returns `EventData` if successful,
             or `None` if decoding was not possible
         """
+        topic = bytes(log_receipt["topics"][0])
+        for event_decoder in self.event_decoders.get(topic, ()):
+            if decoded_event := event_decoder(log_receipt):
+                return decoded_event
+
+        # Fallback to web3 for the shapes not supported by the event decoders
         for event_to_listen in self.events_to_listen[log_receipt["topics"][0].hex()]:
             # Try to decode using all the existing ABIs
             # One topic can have multiple matching ABIs due to `indexed` elements changing how to decode it
@@ -188,34 +329,45 @@ class EventsContractIndexer(BaseIndexer):
         self, log_receipts: Sequence[LogReceipt]
     ) -> Sequence[LogReceipt]:
         """
-        Get the log_receipts events that were not stored as processed in the memory cache
+        Get the log_receipts events that were not stored as processed in the cache
 
         :param log_receipts:
         :return: unprocessed log_receipts
         """
+        processed = self.element_already_processed_checker.are_processed(
+            [
+                ProcessedElement(
+                    log_receipt["transactionHash"],
+                    log_receipt["blockHash"],
+                    log_receipt["logIndex"],
+                )
+                for log_receipt in log_receipts
+            ]
+        )
         return [
             log_receipt
-            for log_receipt in log_receipts
-            if not self.element_already_processed_checker.is_processed(
-                log_receipt["transactionHash"],
-                log_receipt["blockHash"],
-                log_receipt["logIndex"],
-            )
+            for log_receipt, is_processed in zip(log_receipts, processed)
+            if not is_processed
         ]
 
     def set_processed_events(self, log_receipts: Sequence[LogReceipt]):
         """
-        Set the log_receipts events as processed in the memory cache
+        Set the log_receipts events as processed in the cache
 
         :param log_receipts:
         :return:
         """
-        for log_receipt in log_receipts:
-            self.element_already_processed_checker.mark_as_processed(
-                log_receipt["transactionHash"],
-                log_receipt["blockHash"],
-                log_receipt["logIndex"],
-            )
+        self.element_already_processed_checker.mark_as_processed_batch(
+            [
+                ProcessedElement(
+                    log_receipt["transactionHash"],
+                    log_receipt["blockHash"],
+                    log_receipt["logIndex"],
+                    log_receipt["blockNumber"],
+                )
+                for log_receipt in log_receipts
+            ]
+        )
 
     @abstractmethod
     def process_decoded_events(self, decoded_events: List[EventData]):
@@ -227,6 +379,57 @@ class EventsContractIndexer(BaseIndexer):
         """
         pass
 
+    def get_block_ranges(
+        self, from_block_number: int, last_block: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Get the next `concurrent_requests` consecutive block ranges to index. Every range starts after the
+        previous one, so the indexer progresses even with a `block_process_limit` of 1
+
+        :param from_block_number: First block to index
+        :param last_block:
+        :return: List of `(from_block_number, to_block_number)`
+        """
+        block_ranges = []
+        while (
+            len(block_ranges) < self.concurrent_requests
+            and from_block_number <= last_block - self.blocks_behind
+        ):
+            to_block_number = self.get_to_block_number(from_block_number, last_block)
+            logger.info(
+                "%s: Indexing from-block-number=%d to-block-number=%d pending-blocks=%d",
+                self.__class__.__name__,
+                from_block_number,
+                to_block_number,
+                last_block - to_block_number,
+            )
+            block_ranges.append((from_block_number, to_block_number))
+            from_block_number = to_block_number + 1
+        return block_ranges
+
+    def process_log_receipts(self, log_receipts: Sequence[LogReceipt]):
+        """
+        Decode and store the log receipts not processed yet, and mark them as processed
+
+        :param log_receipts:
+        :return:
+        """
+        if not log_receipts:
+            return
+
+        unprocessed_events = self.get_unprocessed_events(log_receipts)
+        logger.info(
+            "%s: Processing %d events from %d events",
+            self.__class__.__name__,
+            len(unprocessed_events),
+            len(log_receipts),
+        )
+        decoded_events: List[EventData] = self.decode_events(unprocessed_events)
+        # Store events in database
+        self.process_decoded_events(decoded_events)
+        # Mark events as processed
+        self.set_processed_events(unprocessed_events)
+
     def index_until_last_chain_block(
         self,
         from_block_number: Optional[int] = None,
@@ -251,42 +454,37 @@ class EventsContractIndexer(BaseIndexer):
             last_current_block - from_block,
         )
 
-        while from_block < last_current_block - self.blocks_behind:
-            to_block = self.get_to_block_number(from_block, last_current_block)
-            logger.info(
-                "%s: Indexing from-block-number=%d to-block-number=%d pending-blocks=%d",
-                self.__class__.__name__,
-                from_block,
-                to_block,
-                last_current_block - to_block,
-            )
-            try:
-                log_receipts = self.find_relevant_log_events(from_block, to_block)
-            except FindRelevantEventsException:
-                self.reset_block_process_limit()
-                break
-
-            if log_receipts:
-                unprocessed_events = self.get_unprocessed_events(log_receipts)
-                logger.info(
-                    "%s: Processing %d events from %d events",
-                    self.__class__.__name__,
-                    len(unprocessed_events),
-                    len(log_receipts),
-                )
-                decoded_events: List[EventData] = self.decode_events(unprocessed_events)
-                # Store events in database
-                self.process_decoded_events(decoded_events)
-                # Mark events as processed
-                self.set_processed_events(unprocessed_events)
-            # Update from block
-            from_block = to_block
-            if update_last_indexed_block:
-                # Update last block indexed
-                self.set_last_indexed_block(self.contract_address, from_block)
+        last_indexed_block = from_block
+        # The last indexed block is indexed again, as it is the first block to index after a reorg
+        if from_block < last_current_block - self.blocks_behind:
+            while from_block <= last_current_block - self.blocks_behind:
+                block_ranges = self.get_block_ranges(from_block, last_current_block)
+                try:
+                    # Process ranges in block order, so the last indexed block only advances over stored ranges
+                    for (_, to_block), log_receipts in zip(
+                        block_ranges,
+                        self.find_relevant_log_events_for_block_ranges(block_ranges),
+                    ):
+                        self.process_log_receipts(log_receipts)
+                        # Update from block
+                        last_indexed_block = to_block
+                        from_block = to_block + 1
+                        if update_last_indexed_block:
+                            # Update last block indexed
+                            self.set_last_indexed_block(
+                                self.contract_address, last_indexed_block
+                            )
+                except TooManyResultsException as e:
+                    self.bisect_block_process_limit(
+                        e.from_block_number, e.to_block_number
+                    )
+                    break
+                except FindRelevantEventsException:
+                    self.reset_block_process_limit()
+                    break
 
         logger.info(
             "%s: Finalizing indexing cycle with pending-blocks=%d",
             self.__class__.__name__,
-            last_current_block - from_block,
+            last_current_block - last_indexed_block,
         )
@@ -1,9 +1,9 @@
-import datetime
 from functools import cache, cached_property
 from logging import getLogger
-from typing import List
+from typing import Dict, List, Set, Type
 
 from django.conf import settings
+from django.db import transaction
 
 from eth_typing import ChecksumAddress
 from web3.contract.contract import ContractEvent
@@ -18,15 +18,32 @@ from safe_locking_service.locking_events.indexers.events_indexer import (
     EventsContractIndexer,
 )
 from safe_locking_service.locking_events.models import (
+    CommonEvent,
     EthereumTx,
+    HolderBalance,
     LockEvent,
+    LockingEvent,
     UnlockEvent,
     WithdrawnEvent,
 )
+from safe_locking_service.locking_events.services.block_service import (
+    get_block_service,
+)
+from safe_locking_service.utils.cache import (
+    LOCKING_EVENTS_CACHE_VERSION,
+    bump_cache_version_on_commit,
+    bump_holders_cache_versions_on_commit,
+)
 
 logger = getLogger(__name__)
 
 
+class BlockNotFoundException(Exception):
+    """
+    Node did not return a block with indexed events, e.g. a node lagging behind or with the block pruned
+    """
+
+
 @cache
 def get_safe_locking_event_indexer():
     """
@@ -38,6 +55,12 @@ def get_safe_locking_event_indexer():
 
 
 class SafeLockingEventsIndexer(EventsContractIndexer):
+    event_models: Dict[str, Type[CommonEvent]] = {
+        "Locked": LockEvent,
+        "Unlocked": UnlockEvent,
+        "Withdrawn": WithdrawnEvent,
+    }
+
     def __init__(self, contract_address: ChecksumAddress, *args, **kwargs):
         self.contract_address = contract_address
 
@@ -56,45 +79,78 @@ class SafeLockingEventsIndexer(EventsContractIndexer):
         ]
 
     def process_decoded_events(self, decoded_events: List[EventData]):
-        for event in decoded_events:
-            block_timestamp = datetime.datetime.fromtimestamp(
-                self.ethereum_client.get_block(event["blockNumber"])["timestamp"],
-                datetime.timezone.utc,
-            )
-            ethereum_tx, created = EthereumTx().create_from_decoded_event(
-                event, block_timestamp
+        """
+        Store the `decoded_events` batch using one `bulk_create` per table (including `LockingEvent` with all
+        the events if enabled) and update the balances of the affected holders and the leaderboard positions, all of them
+        inside the same database transaction. Blocks are requested to the node before opening it, so it is not
+        kept open during network requests. Cached API responses are invalidated when it is committed
+
+        :param decoded_events:
+        :return:
+        :raises BlockNotFoundException: If the node does not return a block of the events
+        """
+        # Blocks stored with a different hash than the events are refetched, as a reorg could be
+        # detected by the indexer before the reorg service
+        block_service = get_block_service()
+        blocks, node_block_numbers = block_service.fetch_blocks(
+            [event["blockNumber"] for event in decoded_events],
+            block_hashes={
+                event["blockNumber"]: event["blockHash"] for event in decoded_events
+            },
+        )
+        if missing_block_numbers := sorted(
+            {event["blockNumber"] for event in decoded_events} - blocks.keys()
+        ):
+            raise BlockNotFoundException(
+                f"Blocks {missing_block_numbers} were not returned by the node, events cannot be stored"
             )
-            lock_event_instances = []
-            unlock_event_instances = []
-            withdrawn_event_instances = []
-            if event["event"] == "Locked":
-                lock_event_instances.append(
-                    LockEvent.create_instance_from_decoded_event(
-                        event, ethereum_tx, block_timestamp
-                    )
-                )
-            elif event["event"] == "Unlocked":
-                unlock_event_instances.append(
-                    UnlockEvent.create_instance_from_decoded_event(
-                        event, ethereum_tx, block_timestamp
-                    )
-                )
-            elif event["event"] == "Withdrawn":
-                withdrawn_event_instances.append(
-                    WithdrawnEvent.create_instance_from_decoded_event(
-                        event, ethereum_tx, block_timestamp
-                    )
-                )
-            else:
+
+        ethereum_txs: Dict[bytes, EthereumTx] = {}
+        event_instances: Dict[Type[CommonEvent], List[CommonEvent]] = {
+            event_model: [] for event_model in self.event_models.values()
+        }
+        locking_events: List[LockingEvent] = []
+        holders: Set[ChecksumAddress] = set()
+        for event in decoded_events:
+            event_model = self.event_models.get(event["event"])
+            if not event_model:
                 logger.error(
                     "%s: Unrecognized event type: %s",
                     self.__class__.__name__,
                     event["event"],
                 )
-            LockEvent.objects.bulk_create(lock_event_instances, ignore_conflicts=True)
-            UnlockEvent.objects.bulk_create(
-                unlock_event_instances, ignore_conflicts=True
-            )
-            WithdrawnEvent.objects.bulk_create(
-                withdrawn_event_instances, ignore_conflicts=True
+                continue
+
+            block = blocks[event["blockNumber"]]
+            block_timestamp = block.timestamp
+            tx_hash = bytes(event["transactionHash"])
+            if not (ethereum_tx := ethereum_txs.get(tx_hash)):
+                ethereum_tx = EthereumTx.create_instance_from_decoded_event(
+                    event, block_timestamp, block=block
+                )
+                ethereum_txs[tx_hash] = ethereum_tx
+            event_instance = event_model.create_instance_from_decoded_event(
+                event, ethereum_tx, block_timestamp
             )
+            event_instances[event_model].append(event_instance)
+            holders.add(event_instance.holder)
+            if settings.LOCKING_EVENTS_UNIFIED_TABLE_ENABLED:
+                locking_events.append(
+                    LockingEvent.create_instance_from_event(
+                        event_instance, event["blockNumber"]
+                    )
+                )
+
+        with transaction.atomic():
+            block_service.store_blocks(blocks, node_block_numbers)
+            EthereumTx.objects.bulk_create(ethereum_txs.values(), ignore_conflicts=True)
+            for event_model, instances in event_instances.items():
+                event_model.objects.bulk_create(instances, ignore_conflicts=True)
+            LockingEvent.objects.bulk_create(locking_events, ignore_conflicts=True)
+            # Balances are recalculated from the stored events, so events already indexed are not counted twice
+            if holders:
+                # Holders moved in the leaderboard by the balances updated must be invalidated too
+                moved_holders = HolderBalance.objects.update_holders(holders)
+                moved_holders += HolderBalance.objects.update_positions(holders)
+                bump_cache_version_on_commit(LOCKING_EVENTS_CACHE_VERSION)
+                bump_holders_cache_versions_on_commit(holders.union(moved_holders))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ...models import LockingEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy to the unified LockingEvent table the events indexed while it was not enabled. "
+        "Run it when enabling LOCKING_EVENTS_UNIFIED_TABLE_ENABLED"
+    )
+
+    def handle(self, *args, **options):
+        inserted = LockingEvent.objects.insert_missing_events()
+        self.stdout.write(self.style.SUCCESS(f"Inserted {inserted} events"))
@@ -1,6 +1,9 @@
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from ...indexers.element_already_processed_checker import (
+    ElementAlreadyProcessedChecker,
+)
 from ...indexers.safe_locking_events_indexer import SafeLockingEventsIndexer
 
 
@@ -14,6 +17,12 @@ class Command(BaseCommand):
             help="Number of blocks to query each time",
             default=None,
         )
+        parser.add_argument(
+            "--concurrent-requests",
+            type=int,
+            help="Number of block ranges to query the node for at the same time",
+            default=None,
+        )
         parser.add_argument(
             "--from-block-number",
             type=int,
@@ -23,8 +32,21 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         block_process_limit = options["block_process_limit"]
+        concurrent_requests = options["concurrent_requests"]
         from_block_number = options["from_block_number"]
 
+        # Use a new cache, as events already processed by the running indexer must be processed again
+        indexer_kwargs = {
+            "element_already_processed_checker": ElementAlreadyProcessedChecker()
+        }
+        if concurrent_requests:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Setting concurrent-requests to {concurrent_requests}"
+                )
+            )
+            indexer_kwargs["concurrent_requests"] = concurrent_requests
+
         if block_process_limit:
             self.stdout.write(
                 self.style.SUCCESS(
@@ -35,13 +57,15 @@ class Command(BaseCommand):
                 contract_address=settings.SAFE_LOCKING_CONTRACT_ADDRESS,
                 block_process_limit=block_process_limit,
                 enable_auto_block_process_limit=False,
+                **indexer_kwargs,
             )
         else:
             self.stdout.write(
                 self.style.SUCCESS("Setting auto adjust block-process-limit")
             )
             events_indexer = SafeLockingEventsIndexer(
-                contract_address=settings.SAFE_LOCKING_CONTRACT_ADDRESS
+                contract_address=settings.SAFE_LOCKING_CONTRACT_ADDRESS,
+                **indexer_kwargs,
             )
 
         self.stdout.write(
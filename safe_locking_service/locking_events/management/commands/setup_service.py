@@ -80,6 +80,11 @@ TASKS = [
         description="Check Reorgs (every minute)",
         cron=CronDefinition(),  # cron every minute * * * * *
     ),
+    CeleryTaskConfiguration(
+        name="safe_locking_service.locking_events.tasks.update_leaderboard_positions_task",
+        description="Rank all the holders of the leaderboard (every day)",
+        cron=CronDefinition(minute="30", hour="4"),
+    ),
 ]
 
 
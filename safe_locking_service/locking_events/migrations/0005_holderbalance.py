@@ -0,0 +1,59 @@
+# Generated by Django 5.0.12 on 2026-10-17 22:45
+
+from django.db import migrations, models
+
+import gnosis.eth.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("locking_events", "0004_alter_lockevent_holder_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HolderBalance",
+            fields=[
+                (
+                    "holder",
+                    gnosis.eth.django.models.EthereumAddressBinaryField(
+                        primary_key=True, serialize=False
+                    ),
+                ),
+                ("locked_amount", gnosis.eth.django.models.Uint256Field()),
+                ("unlocked_amount", gnosis.eth.django.models.Uint256Field()),
+                ("withdrawn_amount", gnosis.eth.django.models.Uint256Field()),
+                ("last_event_timestamp", models.DateTimeField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["-locked_amount", "holder"],
+                        name="Holder_balance_leaderboard_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+            INSERT INTO "locking_events_holderbalance" ("holder", "locked_amount", "unlocked_amount",
+                                                        "withdrawn_amount", "last_event_timestamp")
+            SELECT "holder", SUM("locked_amount") - SUM("unlocked_amount"), SUM("unlocked_amount"),
+                   SUM("withdrawn_amount"), MAX("timestamp")
+            FROM (
+                (SELECT "holder", "amount" AS "locked_amount", 0 AS "unlocked_amount",
+                        0 AS "withdrawn_amount", "timestamp"
+                FROM "locking_events_lockevent"
+                ) UNION ALL (
+                SELECT "holder", 0, "amount", 0, "timestamp"
+                FROM "locking_events_unlockevent"
+                ) UNION ALL (
+                SELECT "holder", 0, 0, "amount", "timestamp"
+                FROM "locking_events_withdrawnevent")
+            ) AS "HOLDER_EVENTS"
+            GROUP BY "holder";
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
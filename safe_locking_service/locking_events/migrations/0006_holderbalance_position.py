@@ -0,0 +1,30 @@
+# Generated by Django 5.0.12 on 2026-10-17 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("locking_events", "0005_holderbalance"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="holderbalance",
+            name="position",
+            field=models.PositiveIntegerField(db_index=True, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+            UPDATE "locking_events_holderbalance"
+            SET "position" = "RANKED"."position"
+            FROM (
+                SELECT "holder", ROW_NUMBER() OVER (ORDER BY "locked_amount" DESC, "holder") AS "position"
+                FROM "locking_events_holderbalance"
+            ) AS "RANKED"
+            WHERE "locking_events_holderbalance"."holder" = "RANKED"."holder";
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
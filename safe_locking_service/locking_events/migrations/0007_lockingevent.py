@@ -0,0 +1,59 @@
+# Generated by Django 5.0.12 on 2026-10-17 22:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import gnosis.eth.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("locking_events", "0006_holderbalance_position"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LockingEvent",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "event_type",
+                    models.PositiveSmallIntegerField(
+                        choices=[(0, "LOCKED"), (1, "UNLOCKED"), (2, "WITHDRAWN")]
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                ("block_number", gnosis.eth.django.models.Uint32Field()),
+                ("log_index", gnosis.eth.django.models.Uint32Field()),
+                ("holder", gnosis.eth.django.models.EthereumAddressBinaryField()),
+                ("amount", gnosis.eth.django.models.Uint96Field()),
+                ("unlock_index", gnosis.eth.django.models.Uint32Field(null=True)),
+                (
+                    "ethereum_tx",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="locking_events.ethereumtx",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["holder", "-timestamp"],
+                        name="locking_eve_holder_26c7a7_idx",
+                    ),
+                    models.Index(
+                        fields=["block_number"], name="locking_eve_block_n_147f01_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="lockingevent",
+            constraint=models.UniqueConstraint(
+                fields=("ethereum_tx", "log_index"),
+                name="unique_locking_event_ethereum_tx_log_index",
+            ),
+        ),
+    ]
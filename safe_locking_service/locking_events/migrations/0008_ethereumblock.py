@@ -0,0 +1,42 @@
+# Generated by Django 5.0.12 on 2026-10-17 22:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import gnosis.eth.django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("locking_events", "0007_lockingevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EthereumBlock",
+            fields=[
+                (
+                    "number",
+                    gnosis.eth.django.models.Uint32Field(
+                        primary_key=True, serialize=False
+                    ),
+                ),
+                ("block_hash", gnosis.eth.django.models.Keccak256Field(unique=True)),
+                ("parent_hash", gnosis.eth.django.models.Keccak256Field()),
+                ("timestamp", models.DateTimeField()),
+                ("confirmed", models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="ethereumtx",
+            name="block",
+            field=models.ForeignKey(
+                default=None,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="txs",
+                to="locking_events.ethereumblock",
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.12 on 2026-10-18 00:28
+
+from django.db import migrations
+
+import safe_locking_service.utils.ethereum
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("locking_events", "0008_ethereumblock"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="holderbalance",
+            name="holder",
+            field=safe_locking_service.utils.ethereum.CachedEthereumAddressBinaryField(
+                primary_key=True, serialize=False
+            ),
+        ),
+        migrations.AlterField(
+            model_name="lockevent",
+            name="holder",
+            field=safe_locking_service.utils.ethereum.CachedEthereumAddressBinaryField(),
+        ),
+        migrations.AlterField(
+            model_name="lockingevent",
+            name="holder",
+            field=safe_locking_service.utils.ethereum.CachedEthereumAddressBinaryField(),
+        ),
+        migrations.AlterField(
+            model_name="unlockevent",
+            name="holder",
+            field=safe_locking_service.utils.ethereum.CachedEthereumAddressBinaryField(),
+        ),
+        migrations.AlterField(
+            model_name="withdrawnevent",
+            name="holder",
+            field=safe_locking_service.utils.ethereum.CachedEthereumAddressBinaryField(),
+        ),
+    ]
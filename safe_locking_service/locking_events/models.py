@@ -1,24 +1,36 @@
+import datetime
 from decimal import Decimal
-from typing import Dict, List, Optional, TypedDict
+from enum import Enum
+from typing import Collection, Dict, List, Optional, Type, TypedDict
 
+from django.conf import settings
 from django.db import connection, models
 from django.db.backends.utils import CursorWrapper
 from django.db.models import Index, Q
 
 from eth_typing import ChecksumAddress
 from hexbytes import HexBytes
-from web3.types import EventData
+from web3.types import BlockData, EventData
 
 from gnosis.eth.django.models import (
     EthereumAddressBinaryField,
     Keccak256Field,
     Uint32Field,
     Uint96Field,
+    Uint256Field,
 )
+from gnosis.eth.utils import fast_to_checksum_address
 
+from safe_locking_service.utils.ethereum import CachedEthereumAddressBinaryField
 from safe_locking_service.utils.timestamp_helper import get_formated_timestamp
 
 
+class EventType(Enum):
+    LOCKED = 0
+    UNLOCKED = 1
+    WITHDRAWN = 2
+
+
 class LeaderBoardRow(TypedDict):
     position: int
     holder: ChecksumAddress
@@ -38,6 +50,33 @@ def fetch_all_from_cursor(cursor: CursorWrapper) -> List[LeaderBoardRow]:
     return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
 
+class EthereumBlock(models.Model):
+    """
+    Headers of the blocks with indexed transactions, so the timestamps and parent hashes
+    do not need to be requested again to the node
+    """
+
+    number = Uint32Field(primary_key=True)
+    block_hash = Keccak256Field(unique=True)
+    parent_hash = Keccak256Field()
+    timestamp = models.DateTimeField()
+    confirmed = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Block number={self.number} hash={self.block_hash}"
+
+    @classmethod
+    def create_instance_from_block(cls, block: BlockData) -> "EthereumBlock":
+        return cls(
+            number=block["number"],
+            block_hash=block["hash"],
+            parent_hash=block["parentHash"],
+            timestamp=datetime.datetime.fromtimestamp(
+                block["timestamp"], datetime.timezone.utc
+            ),
+        )
+
+
 class EthereumTxQuerySet(models.QuerySet):
     def not_confirmed(self):
         """
@@ -61,6 +100,14 @@ class EthereumTx(models.Model):
     block_number = Uint32Field()
     block_timestamp = models.DateTimeField()
     confirmed = models.BooleanField(default=False)
+    # Transactions indexed before blocks were stored do not have a block
+    block = models.ForeignKey(
+        EthereumBlock,
+        on_delete=models.CASCADE,
+        null=True,
+        default=None,
+        related_name="txs",
+    )
 
     class Meta:
         indexes = [
@@ -75,13 +122,19 @@ class EthereumTx(models.Model):
     def __str__(self):
         return f"Transaction hash {self.tx_hash}"
 
-    @staticmethod
-    def create_from_decoded_event(decoded_event: EventData, block_timestamp):
-        return EthereumTx.objects.get_or_create(
+    @classmethod
+    def create_instance_from_decoded_event(
+        cls,
+        decoded_event: EventData,
+        block_timestamp,
+        block: Optional[EthereumBlock] = None,
+    ):
+        return cls(
             tx_hash=decoded_event["transactionHash"],
             block_hash=decoded_event["blockHash"],
             block_number=decoded_event["blockNumber"],
             block_timestamp=block_timestamp,
+            block=block,
         )
 
 
@@ -95,7 +148,7 @@ class CommonEvent(models.Model):
     timestamp = models.DateTimeField()
     ethereum_tx = models.ForeignKey(EthereumTx, on_delete=models.CASCADE)
     log_index = Uint32Field()
-    holder = EthereumAddressBinaryField()
+    holder = CachedEthereumAddressBinaryField()
     amount = Uint96Field()
 
     def get_serialized_timestamp(self) -> str:
@@ -207,6 +260,107 @@ class WithdrawnEvent(CommonEvent):
         )
 
 
+class LockingEventQuerySet(models.QuerySet):
+    def insert_missing_events(self) -> int:
+        """
+        Copy to the `LockingEvent` table the events stored while it was not enabled
+
+        :return: Number of events inserted
+        """
+        query = f"""
+                INSERT INTO "locking_events_lockingevent" ("event_type", "timestamp", "ethereum_tx_id",
+                                                           "block_number", "log_index", "holder", "amount",
+                                                           "unlock_index")
+                SELECT "EVENTS"."event_type", "EVENTS"."timestamp", "EVENTS"."ethereum_tx_id",
+                       "locking_events_ethereumtx"."block_number", "EVENTS"."log_index", "EVENTS"."holder",
+                       "EVENTS"."amount", "EVENTS"."unlock_index"
+                FROM (
+                    SELECT {EventType.LOCKED.value} AS "event_type", "timestamp", "ethereum_tx_id", "log_index",
+                           "holder", "amount", NULL::numeric AS "unlock_index"
+                    FROM "locking_events_lockevent"
+                    UNION ALL
+                    SELECT {EventType.UNLOCKED.value}, "timestamp", "ethereum_tx_id", "log_index", "holder",
+                           "amount", "unlock_index"
+                    FROM "locking_events_unlockevent"
+                    UNION ALL
+                    SELECT {EventType.WITHDRAWN.value}, "timestamp", "ethereum_tx_id", "log_index", "holder",
+                           "amount", "unlock_index"
+                    FROM "locking_events_withdrawnevent"
+                ) AS "EVENTS"
+                INNER JOIN "locking_events_ethereumtx"
+                ON "EVENTS"."ethereum_tx_id" = "locking_events_ethereumtx"."tx_hash"
+                ORDER BY "EVENTS"."timestamp", "EVENTS"."ethereum_tx_id", "EVENTS"."log_index"
+                ON CONFLICT ("ethereum_tx_id", "log_index") DO NOTHING
+                """
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            return cursor.rowcount
+
+
+class LockingEvent(models.Model):
+    """
+    Denormalized copy of the `LockEvent`, `UnlockEvent` and `WithdrawnEvent` tables, so queries for all the events
+    of a holder or a block range only need to read one table. If `LOCKING_EVENTS_UNIFIED_TABLE_ENABLED`, it is
+    written by the indexer in the same transaction than the event tables and removed with them when an
+    `EthereumTx` is deleted. Events indexed before enabling it are copied using the `backfill_locking_events`
+    command
+    """
+
+    event_types: Dict[Type[CommonEvent], EventType] = {
+        LockEvent: EventType.LOCKED,
+        UnlockEvent: EventType.UNLOCKED,
+        WithdrawnEvent: EventType.WITHDRAWN,
+    }
+
+    objects = LockingEventQuerySet.as_manager()
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.PositiveSmallIntegerField(
+        choices=[(event_type.value, event_type.name) for event_type in EventType]
+    )
+    timestamp = models.DateTimeField()
+    ethereum_tx = models.ForeignKey(EthereumTx, on_delete=models.CASCADE)
+    block_number = Uint32Field()
+    log_index = Uint32Field()
+    holder = CachedEthereumAddressBinaryField()
+    amount = Uint96Field()
+    unlock_index = Uint32Field(null=True)  # Only for `UnlockEvent` and `WithdrawnEvent`
+
+    class Meta:
+        indexes = [
+            Index(fields=["holder", "-timestamp"]),
+            Index(fields=["block_number"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ethereum_tx", "log_index"],
+                name="unique_locking_event_ethereum_tx_log_index",
+            )
+        ]
+
+    def __str__(self):
+        return f"LockingEvent: type={EventType(self.event_type).name} timestamp={self.timestamp} tx-hash={self.ethereum_tx_id} log_index={self.log_index} holder={self.holder} amount={self.amount}"
+
+    @classmethod
+    def create_instance_from_event(
+        cls, event: CommonEvent, block_number: int
+    ) -> "LockingEvent":
+        """
+        :param event: `LockEvent`, `UnlockEvent` or `WithdrawnEvent`
+        :param block_number:
+        :return: `LockingEvent` not stored in database with the data of `event`
+        """
+        return cls(
+            event_type=cls.event_types[type(event)].value,
+            timestamp=event.timestamp,
+            ethereum_tx_id=event.ethereum_tx_id,
+            block_number=block_number,
+            log_index=event.log_index,
+            holder=event.holder,
+            amount=event.amount,
+            unlock_index=getattr(event, "unlock_index", None),
+        )
+
+
 class StatusEventsIndexer(models.Model):
     contract = EthereumAddressBinaryField(primary_key=True, unique=True)
     deployed_block = models.PositiveIntegerField()
@@ -216,46 +370,247 @@ class StatusEventsIndexer(models.Model):
         return f"EventIndexer: address={self.contract} deployed_block={self.deployed_block} last_indexed_block={self.last_indexed_block} "
 
 
-def get_leader_board_query() -> str:
-    """
-    Get raw leaderboard SQL query
+# Key of the advisory lock serializing the updates of the holder balances and positions
+HOLDER_POSITIONS_LOCK_ID = 1_739_002_001
 
-    :return:
+
+class HolderBalanceQuerySet(models.QuerySet):
+    def lock_positions(self) -> None:
+        """
+        Wait until no other transaction is updating the balances or positions. Positions are updated reading
+        the current ones, so concurrent updates from the indexer, the reorg recovery or a reindex would leave
+        duplicated or missing positions. Lock is released when the current database transaction ends
+
+        :return:
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s)", [HOLDER_POSITIONS_LOCK_ID]
+            )
+
+    @staticmethod
+    def _get_events_sql() -> str:
+        """
+        :return: SQL relation with the `event_type`, `holder`, `amount` and `timestamp` of all the events. The
+            `LockingEvent` table is used if enabled, otherwise the event tables are combined
+        """
+        if settings.LOCKING_EVENTS_UNIFIED_TABLE_ENABLED:
+            return '"locking_events_lockingevent"'
+        return f"""
+               (SELECT {EventType.LOCKED.value} AS "event_type", "holder", "amount", "timestamp"
+                FROM "locking_events_lockevent"
+                UNION ALL
+                SELECT {EventType.UNLOCKED.value}, "holder", "amount", "timestamp"
+                FROM "locking_events_unlockevent"
+                UNION ALL
+                SELECT {EventType.WITHDRAWN.value}, "holder", "amount", "timestamp"
+                FROM "locking_events_withdrawnevent")
+               """
+
+    def update_holders(
+        self, holders: Collection[ChecksumAddress]
+    ) -> List[ChecksumAddress]:
+        """
+        Recalculate the balances of the provided `holders` from their events. Balances are upserted, so the
+        `position` of the holders is kept until `update_positions` is called. Balances of holders without
+        events are removed, and positions after them are shifted, so the positions of the rest of the holders
+        are still valid. It must be called in the same database transaction that inserts or deletes events, as
+        the lock on the positions is held until the transaction ends
+
+        :param holders:
+        :return: Holders with the position shifted by the removed holders
+        """
+        if not holders:
+            return []
+
+        self.lock_positions()
+        holder_addresses = [HexBytes(holder) for holder in set(holders)]
+        events_sql = self._get_events_sql()
+        delete_query = f"""
+                       DELETE FROM "locking_events_holderbalance"
+                       WHERE "holder" = ANY(%s)
+                       AND NOT EXISTS (
+                           SELECT 1 FROM {events_sql} AS "EVENTS"
+                           WHERE "EVENTS"."holder" = "locking_events_holderbalance"."holder"
+                       )
+                       RETURNING "position"
+                       """
+        shift_query = """
+                      UPDATE "locking_events_holderbalance"
+                      SET "position" = "position" - (
+                          SELECT COUNT(*) FROM UNNEST(%s::integer[]) AS "DELETED"("position")
+                          WHERE "DELETED"."position" < "locking_events_holderbalance"."position"
+                      )
+                      WHERE "position" > %s
+                      RETURNING "holder"
+                      """
+        upsert_query = f"""
+                       INSERT INTO "locking_events_holderbalance" ("holder", "locked_amount", "unlocked_amount",
+                                                                   "withdrawn_amount", "last_event_timestamp")
+                       SELECT "holder",
+                              SUM(CASE "event_type" WHEN {EventType.LOCKED.value} THEN "amount"
+                                                    WHEN {EventType.UNLOCKED.value} THEN -"amount"
+                                                    ELSE 0 END),
+                              SUM(CASE WHEN "event_type" = {EventType.UNLOCKED.value} THEN "amount" ELSE 0 END),
+                              SUM(CASE WHEN "event_type" = {EventType.WITHDRAWN.value} THEN "amount" ELSE 0 END),
+                              MAX("timestamp")
+                       FROM {events_sql} AS "EVENTS"
+                       WHERE "holder" = ANY(%s)
+                       GROUP BY "holder"
+                       ON CONFLICT ("holder") DO UPDATE
+                       SET "locked_amount" = EXCLUDED."locked_amount",
+                           "unlocked_amount" = EXCLUDED."unlocked_amount",
+                           "withdrawn_amount" = EXCLUDED."withdrawn_amount",
+                           "last_event_timestamp" = EXCLUDED."last_event_timestamp"
+                       """
+        shifted_holders: List[ChecksumAddress] = []
+        with connection.cursor() as cursor:
+            cursor.execute(delete_query, [holder_addresses])
+            if deleted_positions := [
+                position for (position,) in cursor.fetchall() if position is not None
+            ]:
+                cursor.execute(shift_query, [deleted_positions, min(deleted_positions)])
+                shifted_holders = [
+                    fast_to_checksum_address(bytes(row[0])) for row in cursor.fetchall()
+                ]
+            cursor.execute(upsert_query, [holder_addresses])
+        return shifted_holders
+
+    def update_positions(
+        self, holders: Optional[Collection[ChecksumAddress]] = None
+    ) -> List[ChecksumAddress]:
+        """
+        Refresh the leaderboard `position` of the holders, sorted by `locked_amount` and `holder`.
+        Only rows with a changed position are written.
+
+        If `holders` with the balances updated are provided, only the window of positions they can
+        affect is ranked again: it starts at the first position of the holders or of the next not updated
+        holders, and it ends at the last position of the holders or of the previous not updated holders
+        (or at the end of the leaderboard for new holders, as they move all the holders after them).
+        Neighbours are found seeking the leaderboard index, so the cost depends on the size of the window
+        instead of the number of holders. Positions of the rest of the holders must be valid
+
+        :param holders: Holders with the balance updated. If not provided, all the holders are ranked again,
+            fixing any wrong position
+        :return: Holders with the position updated
+        """
+        if holders is not None and not holders:
+            return []
+
+        self.lock_positions()
+        if holders is None:
+            return self._update_positions_window(
+                'SELECT 1 AS "min_position", NULL::integer AS "max_position"', {}
+            )
+
+        bounds_query = """
+                       WITH "UPDATED" AS (
+                           SELECT "holder", "locked_amount", "position"
+                           FROM "locking_events_holderbalance"
+                           WHERE "holder" = ANY(%(holders)s)
+                       ), "NEIGHBOURS" AS (
+                           SELECT "UPDATED"."position",
+                                  COALESCE(
+                                      (SELECT "position" FROM "locking_events_holderbalance" AS "ROW"
+                                       WHERE "ROW"."locked_amount" = "UPDATED"."locked_amount"
+                                       AND "ROW"."holder" > "UPDATED"."holder"
+                                       AND "ROW"."holder" <> ALL(%(holders)s)
+                                       ORDER BY "ROW"."locked_amount" DESC, "ROW"."holder" LIMIT 1),
+                                      (SELECT "position" FROM "locking_events_holderbalance" AS "ROW"
+                                       WHERE "ROW"."locked_amount" < "UPDATED"."locked_amount"
+                                       AND "ROW"."holder" <> ALL(%(holders)s)
+                                       ORDER BY "ROW"."locked_amount" DESC, "ROW"."holder" LIMIT 1)
+                                  ) AS "next_position",
+                                  COALESCE(
+                                      (SELECT "position" FROM "locking_events_holderbalance" AS "ROW"
+                                       WHERE "ROW"."locked_amount" = "UPDATED"."locked_amount"
+                                       AND "ROW"."holder" < "UPDATED"."holder"
+                                       AND "ROW"."holder" <> ALL(%(holders)s)
+                                       ORDER BY "ROW"."locked_amount", "ROW"."holder" DESC LIMIT 1),
+                                      (SELECT "position" FROM "locking_events_holderbalance" AS "ROW"
+                                       WHERE "ROW"."locked_amount" > "UPDATED"."locked_amount"
+                                       AND "ROW"."holder" <> ALL(%(holders)s)
+                                       ORDER BY "ROW"."locked_amount", "ROW"."holder" DESC LIMIT 1)
+                                  ) AS "previous_position"
+                           FROM "UPDATED"
+                       )
+                       SELECT MIN(
+                                  COALESCE(
+                                      LEAST("position", "next_position"),
+                                      -- Last holder, after all the not updated holders
+                                      (SELECT COALESCE(MAX("position"), 0) + 1 FROM "locking_events_holderbalance"
+                                       WHERE "holder" <> ALL(%(holders)s))
+                                  )
+                              ) AS "min_position",
+                              CASE WHEN BOOL_OR("position" IS NULL) THEN NULL
+                                   ELSE MAX(GREATEST("position", "previous_position")) END AS "max_position"
+                       FROM "NEIGHBOURS"
+                       """
+        return self._update_positions_window(
+            bounds_query, {"holders": [HexBytes(holder) for holder in set(holders)]}
+        )
+
+    def _update_positions_window(
+        self, bounds_query: str, params: Dict
+    ) -> List[ChecksumAddress]:
+        """
+        :param bounds_query: Query returning one row with the `min_position` and `max_position` (`NULL` for
+            the end of the leaderboard) of the window to rank again. If `holders` param is provided, they
+            are always ranked
+        :param params:
+        :return: Holders with the position updated
+        """
+        query = f"""
+                WITH "BOUNDS" AS ({bounds_query}),
+                "RANKED" AS (
+                    SELECT "holder",
+                           "BOUNDS"."min_position" - 1
+                           + ROW_NUMBER() OVER (ORDER BY "locked_amount" DESC, "holder") AS "position"
+                    FROM "locking_events_holderbalance", "BOUNDS"
+                    WHERE ("position" >= "BOUNDS"."min_position"
+                           AND ("position" <= "BOUNDS"."max_position" OR "BOUNDS"."max_position" IS NULL))
+                    {'OR "holder" = ANY(%(holders)s)' if "holders" in params else 'OR "position" IS NULL'}
+                )
+                UPDATE "locking_events_holderbalance"
+                SET "position" = "RANKED"."position"
+                FROM "RANKED"
+                WHERE "locking_events_holderbalance"."holder" = "RANKED"."holder"
+                AND "locking_events_holderbalance"."position" IS DISTINCT FROM "RANKED"."position"
+                RETURNING "locking_events_holderbalance"."holder"
+                """
+        with connection.cursor() as cursor:
+            cursor.execute(query, params or None)
+            return [
+                fast_to_checksum_address(bytes(row[0])) for row in cursor.fetchall()
+            ]
+
+
+class HolderBalance(models.Model):
+    """
+    Aggregated amounts of the events of every holder. Kept updated by the indexer and the reorg
+    service, so the leaderboard does not need to aggregate all the events on every request
     """
-    union_lock_unlock_withdraw_events = """
-                    (SELECT "locking_events_lockevent"."holder" AS "holder",
-                           "locking_events_lockevent"."amount" AS "amount",
-                            0 AS "event_type"
-                    FROM "locking_events_lockevent"
-                    ) UNION ALL (
-                    SELECT "locking_events_unlockevent"."holder" AS "holder",
-                           "locking_events_unlockevent"."amount" AS "amount",
-                            1 AS "event_type"
-                    FROM "locking_events_unlockevent")
-                    UNION ALL
-                    (SELECT "locking_events_withdrawnevent"."holder" AS "holder",
-                            "locking_events_withdrawnevent"."amount" AS "amount",
-                            2 AS "event_type"
-                    FROM "locking_events_withdrawnevent")
-                    """
-
-    total_lock_unlock_withdraw_amount = f"""
-                    SELECT "holder", SUM(COALESCE(CASE WHEN "event_type" = 0 THEN "amount" ELSE NULL END,
-                            CASE WHEN "event_type" = 1 THEN -amount ELSE NULL END)) AS "lockedAmount",
-                            SUM(CASE WHEN "event_type" = 1 THEN "amount" ELSE 0 END) AS "unlockedAmount",
-                            SUM(CASE WHEN "event_type" = 2 THEN "amount" ELSE 0 END) AS "withdrawnAmount"
-                    FROM (
-                        {union_lock_unlock_withdraw_events}
-                    ) AS "UNION_TABLE"
-                    GROUP BY "holder" ORDER BY "lockedAmount" DESC
-                    """
-
-    leader_board_query = f"""
-                    SELECT ROW_NUMBER() OVER () AS "position",
-                    *
-                    FROM ({total_lock_unlock_withdraw_amount}) AS RESULT_TABLE
-            """
-    return leader_board_query
+
+    objects = HolderBalanceQuerySet.as_manager()
+    holder = CachedEthereumAddressBinaryField(primary_key=True)
+    locked_amount = Uint256Field()
+    unlocked_amount = Uint256Field()
+    withdrawn_amount = Uint256Field()
+    last_event_timestamp = models.DateTimeField()
+    # Leaderboard position, refreshed using `update_positions`
+    position = models.PositiveIntegerField(null=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Index to calculate the leaderboard positions
+            Index(
+                name="Holder_balance_leaderboard_idx",
+                fields=["-locked_amount", "holder"],
+            ),
+        ]
+
+    def __str__(self):
+        return f"HolderBalance: holder={self.holder} locked_amount={self.locked_amount} unlocked_amount={self.unlocked_amount} withdrawn_amount={self.withdrawn_amount}"
 
 
 def get_leader_board(limit: int, offset: int) -> List[Dict]:
@@ -264,9 +619,16 @@ def get_leader_board(limit: int, offset: int) -> List[Dict]:
 
     :return:
     """
-    query = f"{get_leader_board_query()} LIMIT {limit} OFFSET {offset}"
+    query = """
+            SELECT "position", "holder", "locked_amount" AS "lockedAmount", "unlocked_amount" AS "unlockedAmount",
+                   "withdrawn_amount" AS "withdrawnAmount"
+            FROM "locking_events_holderbalance"
+            WHERE "position" > %s
+            ORDER BY "position"
+            LIMIT %s
+            """
     with connection.cursor() as cursor:
-        cursor.execute(query)
+        cursor.execute(query, [offset, limit])
         return fetch_all_from_cursor(cursor)
 
 
@@ -276,7 +638,12 @@ def get_leader_board_holder_position(holder: ChecksumAddress) -> Optional[Dict]:
 
     :return:
     """
-    query = f"SELECT * from ({get_leader_board_query()}) AS TEMP WHERE holder=%s"
+    query = """
+            SELECT "position", "holder", "locked_amount" AS "lockedAmount", "unlocked_amount" AS "unlockedAmount",
+                   "withdrawn_amount" AS "withdrawnAmount"
+            FROM "locking_events_holderbalance"
+            WHERE "holder" = %s AND "position" IS NOT NULL
+            """
     with connection.cursor() as cursor:
         holder_address = HexBytes(holder)
         cursor.execute(query, [holder_address])
@@ -290,5 +657,4 @@ def get_leader_board_count() -> int:
 
     :return:
     """
-    # LeaderBoard length should be equals than the number of holders of LockEvents
-    return LockEvent.objects.values("holder").distinct().count()
+    return HolderBalance.objects.count()
@@ -1,8 +1,18 @@
-from typing import Optional
+import base64
+import datetime
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Union
 
+from django.db.models import Q, QuerySet
 from django.http import HttpRequest
 
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Unique ordering for the events, `(holder, -timestamp)` index is used to resolve it
+EVENTS_ORDERING = ("-timestamp", "-ethereum_tx_id", "-log_index")
 
 
 class SmallPagination(LimitOffsetPagination):
@@ -23,3 +33,139 @@ class CustomListPagination(LimitOffsetPagination):
 
     def set_count(self, value):
         self.count = value
+
+
+class EventCursor(NamedTuple):
+    timestamp: datetime.datetime
+    ethereum_tx_id: str
+    log_index: int
+
+    def encode(self) -> str:
+        """
+        :return: Opaque representation of the cursor to be used as a query parameter
+        """
+        value = f"{self.timestamp.isoformat()}|{self.ethereum_tx_id}|{self.log_index}"
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    @classmethod
+    def decode(cls, encoded: str) -> "EventCursor":
+        """
+        :param encoded:
+        :return: Cursor decoded
+        :raises ValueError: If `encoded` is not a valid cursor
+        """
+        try:
+            timestamp, ethereum_tx_id, log_index = (
+                base64.urlsafe_b64decode(encoded.encode()).decode().split("|")
+            )
+            return cls(
+                datetime.datetime.fromisoformat(timestamp),
+                ethereum_tx_id,
+                int(log_index),
+            )
+        except (TypeError, UnicodeDecodeError, ValueError) as exc:
+            raise ValueError(f"Invalid cursor {encoded}") from exc
+
+    def get_filter(self) -> Q:
+        """
+        :return: Filter for the events sorted after the cursor using `EVENTS_ORDERING`. Redundant
+            `timestamp` condition allows the database to seek the `(holder, -timestamp)` index
+        """
+        return Q(timestamp__lte=self.timestamp) & (
+            Q(timestamp__lt=self.timestamp)
+            | Q(timestamp=self.timestamp, ethereum_tx_id__lt=self.ethereum_tx_id)
+            | Q(
+                timestamp=self.timestamp,
+                ethereum_tx_id=self.ethereum_tx_id,
+                log_index__lt=self.log_index,
+            )
+        )
+
+
+class EventsPagination(SmallPagination):
+    """
+    Limit/offset pagination for events. Keyset pagination is used instead if the `cursor` query parameter
+    is provided (empty for the first page): pages are retrieved seeking the index after the last event
+    returned, so every page has the same cost, and `count` is not calculated
+    """
+
+    cursor_query_param = "cursor"
+
+    def __init__(self):
+        super().__init__()
+        self.cursor_mode = False
+        self.next_cursor: Optional[EventCursor] = None
+
+    def is_cursor_mode(self, request: HttpRequest) -> bool:
+        return self.cursor_query_param in request.query_params
+
+    def get_cursor(self, request: HttpRequest) -> Optional[EventCursor]:
+        """
+        :param request:
+        :return: Cursor provided in the request, `None` for the first page
+        :raises NotFound: If cursor is not valid
+        """
+        if encoded := request.query_params.get(self.cursor_query_param):
+            try:
+                return EventCursor.decode(encoded)
+            except ValueError:
+                raise NotFound("Invalid cursor")
+        return None
+
+    def paginate_queryset(
+        self, queryset: Union[QuerySet, Sequence], request, view=None
+    ) -> List:
+        """
+        Sequences that are not a `QuerySet` must support `filter` and be already sorted using `EVENTS_ORDERING`
+
+        :param queryset:
+        :param request:
+        :param view:
+        :return:
+        """
+        if not self.is_cursor_mode(request):
+            return super().paginate_queryset(queryset, request, view=view)
+
+        self.cursor_mode = True
+        self.request = request
+        self.limit = self.get_limit(request)
+        if cursor := self.get_cursor(request):
+            queryset = queryset.filter(cursor.get_filter())
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.order_by(*EVENTS_ORDERING)
+
+        # Request one more element to know if there is a next page
+        results = list(queryset[: self.limit + 1])
+        if len(results) > self.limit:
+            results = results[: self.limit]
+            last = results[-1]
+            self.next_cursor = EventCursor(
+                last.timestamp, last.ethereum_tx_id, last.log_index
+            )
+        return results
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.next_cursor:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.cursor_query_param, self.next_cursor.encode()
+        )
+
+    def get_paginated_response(self, data) -> Response:
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", None),
+                    ("results", data),
+                ]
+            )
+        )
@@ -1,17 +1,16 @@
-from typing import Dict, List, Union
+from decimal import Decimal
+from typing import Any, Dict, List, Union
 
 from rest_framework import serializers
 
 from gnosis.eth.django.serializers import EthereumAddressField, Uint32Field, Uint96Field
-from gnosis.eth.utils import fast_to_checksum_address
 
 from safe_locking_service.locking_events.models import (
     CommonEvent,
-    LockEvent,
-    UnlockEvent,
-    WithdrawnEvent,
+    EventType,
+    LockingEvent,
 )
-from safe_locking_service.locking_events.services.locking_service import EventType
+from safe_locking_service.utils.ethereum import to_checksum_address
 
 
 class AboutSerializer(serializers.Serializer):
@@ -26,7 +25,7 @@ class AboutSerializer(serializers.Serializer):
 class EventTypeSerializer(serializers.Serializer):
     event_type = serializers.SerializerMethodField()
 
-    def get_event_type(self, obj: CommonEvent) -> str:
+    def get_event_type(self, obj: LockingEvent) -> str:
         return EventType(obj.event_type).name
 
 
@@ -72,8 +71,50 @@ class AllEventsDocSerializer(serializers.Serializer):
     withdrawn_event = UnlockOrWithdrawnEventWithTypeSerializer()
 
 
+# Plain functions used by the views instead of the serializers above (kept for documentation), as
+# instantiating a serializer per row is slow. Keys are already camelCase, output is the same
+
+EVENT_TYPE_NAMES: Dict[int, str] = {
+    event_type.value: event_type.name for event_type in EventType
+}
+
+
+def serialize_uint(value: Union[int, Decimal]) -> str:
+    """
+    :param value:
+    :return: Same representation as `Uint96Field` and `Uint32Field` serializer fields
+    """
+    return str(int(value))
+
+
+def serialize_event(event: Union[CommonEvent, LockingEvent]) -> Dict[str, Any]:
+    """
+    :param event:
+    :return: Event serialized like `LockEventSerializer`
+    """
+    return {
+        "executionDate": event.timestamp,
+        "transactionHash": event.ethereum_tx_id,
+        "holder": event.holder,
+        "amount": serialize_uint(event.amount),
+        "logIndex": serialize_uint(event.log_index),
+    }
+
+
+def serialize_unlock_or_withdrawn_event(
+    event: Union[CommonEvent, LockingEvent]
+) -> Dict[str, Any]:
+    """
+    :param event:
+    :return: Event serialized like `UnlockOrWithdrawnEventSerializer`
+    """
+    serialized = serialize_event(event)
+    serialized["unlockIndex"] = serialize_uint(event.unlock_index)
+    return serialized
+
+
 def serialize_all_events(
-    queryset: List[Union[LockEvent, UnlockEvent, WithdrawnEvent]]
+    queryset: List[Union[CommonEvent, LockingEvent]]
 ) -> List[Dict]:
     """
     Return a list of serialized events from provided queryset list
@@ -85,17 +126,17 @@ def serialize_all_events(
     for model in queryset:
         model_type = model.event_type
         if model_type == EventType.LOCKED.value:
-            serializer = LockEventWithTypeSerializer
+            serialized = serialize_event(model)
         elif (
             model_type == EventType.UNLOCKED.value
             or model_type == EventType.WITHDRAWN.value
         ):
-            serializer = UnlockOrWithdrawnEventWithTypeSerializer
+            serialized = serialize_unlock_or_withdrawn_event(model)
         else:
             raise ValueError(f"Type={model_type} not expected, cannot serialize")
 
-        serialized = serializer(model)
-        results.append(serialized.data)
+        serialized["eventType"] = EVENT_TYPE_NAMES[model_type]
+        results.append(serialized)
     return results
 
 
@@ -107,4 +148,18 @@ class LeaderBoardSerializer(serializers.Serializer):
     withdrawnAmount = Uint96Field()
 
     def get_holder(self, obj: Dict):
-        return fast_to_checksum_address(bytes(obj["holder"]))
+        return to_checksum_address(obj["holder"])
+
+
+def serialize_leader_board_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    :param row: Leaderboard row from the database
+    :return: Row serialized like `LeaderBoardSerializer`
+    """
+    return {
+        "holder": to_checksum_address(row["holder"]),
+        "position": int(row["position"]),
+        "lockedAmount": serialize_uint(row["lockedAmount"]),
+        "unlockedAmount": serialize_uint(row["unlockedAmount"]),
+        "withdrawnAmount": serialize_uint(row["withdrawnAmount"]),
+    }
@@ -0,0 +1,194 @@
+import logging
+from functools import cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from hexbytes import HexBytes
+
+from gnosis.eth import EthereumClient
+from gnosis.eth.ethereum_client import get_auto_ethereum_client
+
+from safe_locking_service.locking_events.indexers.element_already_processed_checker import (
+    FixedSizeDict,
+)
+from safe_locking_service.locking_events.models import EthereumBlock
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def get_block_service() -> "BlockService":
+    """
+    :return: Singleton instance of BlockService, so the blocks cache is shared in the process
+    """
+    return BlockService(ethereum_client=get_auto_ethereum_client())
+
+
+class BlockService:
+    """
+    Resolves block headers using a process local LRU cache, the `EthereumBlock` table and the node, in that order
+    """
+
+    def __init__(
+        self,
+        ethereum_client: EthereumClient,
+        cache_size: int = settings.INDEXER_BLOCKS_CACHE_SIZE,
+    ):
+        """
+        :param ethereum_client:
+        :param cache_size: Number of blocks kept in memory
+        """
+        self.ethereum_client = ethereum_client
+        self._blocks_cache: Dict[int, EthereumBlock] = FixedSizeDict(maxlen=cache_size)
+
+    def clear(self) -> None:
+        self._blocks_cache.clear()
+
+    def _cache_blocks(self, blocks: Iterable[EthereumBlock]) -> None:
+        """
+        Store `blocks` in the cache when the current database transaction is committed, so blocks
+        from a transaction rolled back are never cached
+
+        :param blocks:
+        :return:
+        """
+
+        def cache_blocks():
+            for block in blocks:
+                self._blocks_cache[block.number] = block
+
+        transaction.on_commit(cache_blocks)
+
+    def get_stored_blocks(
+        self, block_numbers: Sequence[int]
+    ) -> Dict[int, EthereumBlock]:
+        """
+        :param block_numbers:
+        :return: Dictionary with `block_number` as the key and the `EthereumBlock` for the blocks stored
+            in the cache or the database. Node is not called
+        """
+        blocks: Dict[int, EthereumBlock] = {}
+        not_cached_block_numbers: List[int] = []
+        for block_number in set(block_numbers):
+            if self._blocks_cache.touch(block_number):
+                blocks[block_number] = self._blocks_cache[block_number]
+            else:
+                not_cached_block_numbers.append(block_number)
+
+        if not_cached_block_numbers:
+            stored_blocks = list(
+                EthereumBlock.objects.filter(number__in=not_cached_block_numbers)
+            )
+            for block in stored_blocks:
+                blocks[block.number] = block
+            self._cache_blocks(stored_blocks)
+        return blocks
+
+    def fetch_blocks(
+        self,
+        block_numbers: Sequence[int],
+        block_hashes: Optional[Dict[int, bytes]] = None,
+    ) -> Tuple[Dict[int, EthereumBlock], Set[int]]:
+        """
+        Get the blocks from the cache or the database, the ones missing are requested to the node using one
+        batched request. Nothing is written to the database, so it can be called before opening the
+        transaction storing the blocks with `store_blocks`, and the transaction is not kept open during the
+        requests to the node
+
+        :param block_numbers: Block numbers, duplicates are only requested once
+        :param block_hashes: Expected hash for every block number. Blocks stored with a different hash (from
+            a reorg not processed yet) are requested again to the node
+        :return: Dictionary with `block_number` as the key and the `EthereumBlock`, and the numbers of the
+            blocks requested to the node. Blocks not returned by the node are not in the dictionary
+        """
+        block_hashes = block_hashes or {}
+        blocks = self.get_stored_blocks(block_numbers)
+        missing_block_numbers = {
+            block_number
+            for block_number in set(block_numbers)
+            if block_number not in blocks
+            or (
+                block_number in block_hashes
+                and HexBytes(blocks[block_number].block_hash)
+                != HexBytes(block_hashes[block_number])
+            )
+        }
+        if missing_block_numbers:
+            for block_number in missing_block_numbers:
+                blocks.pop(block_number, None)
+            for block in self.ethereum_client.get_blocks(
+                sorted(missing_block_numbers), full_transactions=False
+            ):
+                if block:
+                    blocks[block["number"]] = EthereumBlock.create_instance_from_block(
+                        block
+                    )
+        return blocks, missing_block_numbers
+
+    def store_blocks(
+        self, blocks: Dict[int, EthereumBlock], node_block_numbers: Set[int]
+    ) -> None:
+        """
+        Store the blocks returned by `fetch_blocks`. It must be called in the database transaction referencing
+        them. Only the blocks from the node are upserted, so hashes fixed by the reorg service are not
+        overwritten with cached ones. The rest are inserted if missing, so blocks removed from the database
+        by a reorg recovery running on another process are restored before being referenced
+
+        :param blocks:
+        :param node_block_numbers: Numbers of the blocks requested to the node
+        :return:
+        """
+        stored_blocks: List[EthereumBlock] = []
+        node_blocks: List[EthereumBlock] = []
+        for block_number, block in blocks.items():
+            if block_number in node_block_numbers:
+                node_blocks.append(block)
+            else:
+                stored_blocks.append(block)
+        if stored_blocks:
+            EthereumBlock.objects.bulk_create(stored_blocks, ignore_conflicts=True)
+        if node_blocks:
+            self._cache_blocks(node_blocks)
+            EthereumBlock.objects.bulk_create(
+                node_blocks,
+                update_conflicts=True,
+                unique_fields=["number"],
+                update_fields=["block_hash", "parent_hash", "timestamp"],
+            )
+
+    def get_blocks(
+        self,
+        block_numbers: Sequence[int],
+        block_hashes: Optional[Dict[int, bytes]] = None,
+    ) -> Dict[int, EthereumBlock]:
+        """
+        Fetch the blocks using `fetch_blocks` and store them using `store_blocks`
+
+        :param block_numbers: Block numbers, duplicates are only requested once
+        :param block_hashes: Expected hash for every block number
+        :return: Dictionary with `block_number` as the key and the `EthereumBlock`
+        """
+        blocks, node_block_numbers = self.fetch_blocks(block_numbers, block_hashes)
+        self.store_blocks(blocks, node_block_numbers)
+        return blocks
+
+    def remove_blocks(self, from_block_number: int) -> int:
+        """
+        Remove blocks greater or equal than `from_block_number` from the cache and the database. Transactions
+        (and events) on those blocks are removed too
+
+        :param from_block_number:
+        :return: Number of blocks removed from database
+        """
+        for block_number in [
+            block_number
+            for block_number in self._blocks_cache
+            if block_number >= from_block_number
+        ]:
+            del self._blocks_cache[block_number]
+        _, deleted_by_model = EthereumBlock.objects.filter(
+            number__gte=from_block_number
+        ).delete()
+        return deleted_by_model.get(EthereumBlock._meta.label, 0)
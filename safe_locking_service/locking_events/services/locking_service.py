@@ -1,50 +1,100 @@
-from enum import Enum
+import datetime
+import heapq
+import itertools
+from typing import Iterator, List, Sequence, Tuple, Union
 
-from django.db.models import IntegerField, Value
+from django.conf import settings
+from django.db.models import IntegerField, QuerySet, Value
 
 from eth_typing import ChecksumAddress
 
-from safe_locking_service.locking_events.models import (
+from safe_locking_service.locking_events.models import (  # noqa: F401
+    CommonEvent,
+    EventType,
     LockEvent,
+    LockingEvent,
     UnlockEvent,
     WithdrawnEvent,
 )
+from safe_locking_service.locking_events.pagination import EVENTS_ORDERING
 
 
-class EventType(Enum):
-    LOCKED = 0
-    UNLOCKED = 1
-    WITHDRAWN = 2
+class HolderEvents:
+    """
+    Events of a holder stored on different tables, sorted using `EVENTS_ORDERING`. It can be paginated as
+    a `QuerySet`: every slice reads only the first events of every table using the `(holder, -timestamp)`
+    indexes and merges them, instead of sorting a `UNION` of all the events of the holder. `__len__` is not
+    defined, so building a list does not count the events first
+    """
+
+    def __init__(self, querysets: Sequence[QuerySet]):
+        self.querysets = [queryset.order_by(*EVENTS_ORDERING) for queryset in querysets]
+
+    @staticmethod
+    def get_sort_key(event: CommonEvent) -> Tuple[datetime.datetime, str, int]:
+        return event.timestamp, event.ethereum_tx_id, event.log_index
+
+    def filter(self, *args, **kwargs) -> "HolderEvents":
+        """
+        :return: `HolderEvents` with the same filter applied to every table
+        """
+        return HolderEvents(
+            [queryset.filter(*args, **kwargs) for queryset in self.querysets]
+        )
+
+    def count(self) -> int:
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __iter__(self) -> Iterator[CommonEvent]:
+        return heapq.merge(*self.querysets, key=self.get_sort_key, reverse=True)
+
+    def __getitem__(
+        self, item: Union[int, slice]
+    ) -> Union[CommonEvent, List[CommonEvent]]:
+        if isinstance(item, int):
+            try:
+                return self[item : item + 1][0]
+            except IndexError:
+                raise IndexError("Event index out of range")
+        if item.step or (item.start or 0) < 0 or (item.stop or 0) < 0:
+            raise TypeError("Negative indexing or step is not supported")
+        start = item.start or 0
+        if item.stop is None:
+            return list(itertools.islice(self, start, None))
+        merged_events = heapq.merge(
+            *[queryset[: item.stop] for queryset in self.querysets],
+            key=self.get_sort_key,
+            reverse=True,
+        )
+        return list(itertools.islice(merged_events, start, item.stop))
 
 
 class LockingService:
     def __init__(self, holder: ChecksumAddress):
         self.holder = holder
 
-    def get_all_events_by_holder(self):
+    def get_all_events_by_holder(self) -> Union[QuerySet[LockingEvent], HolderEvents]:
         """
-        Get the all locking contract events by holder
+        Get the all locking contract events by holder, using the `LockingEvent` table with all the event types
+        if enabled, or merging the events of every event table otherwise
 
-        :param holder:
         :return:
         """
-        # Set field unlock_index to Null to be able to apply SQL union
-        # Add event_type to correctly serialize later
-        lock_events = LockEvent.objects.filter(holder=self.holder).annotate(
-            unlock_index=Value(None, output_field=IntegerField()),
-            event_type=Value(EventType.LOCKED.value, output_field=IntegerField()),
-        )
-
-        unlock_events = UnlockEvent.objects.filter(holder=self.holder).annotate(
-            event_type=Value(EventType.UNLOCKED.value, output_field=IntegerField())
-        )
-
-        withdrawn_events = WithdrawnEvent.objects.filter(holder=self.holder).annotate(
-            event_type=Value(EventType.WITHDRAWN.value, output_field=IntegerField())
-        )
+        if settings.LOCKING_EVENTS_UNIFIED_TABLE_ENABLED:
+            return LockingEvent.objects.filter(holder=self.holder).order_by(
+                *EVENTS_ORDERING
+            )
 
-        return (
-            lock_events.union(unlock_events, all=True)
-            .union(withdrawn_events, all=True)
-            .order_by("-timestamp")
+        # Add event_type to correctly serialize later
+        return HolderEvents(
+            [
+                event_model.objects.filter(holder=self.holder).annotate(
+                    event_type=Value(event_type.value, output_field=IntegerField())
+                )
+                for event_model, event_type in (
+                    (LockEvent, EventType.LOCKED),
+                    (UnlockEvent, EventType.UNLOCKED),
+                    (WithdrawnEvent, EventType.WITHDRAWN),
+                )
+            ]
         )
@@ -1,10 +1,10 @@
 import logging
 from functools import cache
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from django.conf import settings
-from django.core.paginator import Paginator
 from django.db import transaction
+from django.db.models import Q
 
 from hexbytes import HexBytes
 
@@ -14,7 +14,23 @@ from gnosis.eth.ethereum_client import get_auto_ethereum_client
 from safe_locking_service.locking_events.indexers.safe_locking_events_indexer import (
     get_safe_locking_event_indexer,
 )
-from safe_locking_service.locking_events.models import EthereumTx
+from safe_locking_service.locking_events.models import (
+    EthereumBlock,
+    EthereumTx,
+    HolderBalance,
+    LockEvent,
+    LockingEvent,
+    UnlockEvent,
+    WithdrawnEvent,
+)
+from safe_locking_service.locking_events.services.block_service import (
+    get_block_service,
+)
+from safe_locking_service.utils.cache import (
+    LOCKING_EVENTS_CACHE_VERSION,
+    bump_cache_version_on_commit,
+    bump_holders_cache_versions_on_commit,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -39,73 +55,177 @@ class ReorgService:
         self.ethereum_client = ethereum_client
         self.eth_reorg_blocks = eth_reorg_blocks
         self.eth_reorg_blocks_batch = eth_reorg_blocks_batch
+        self.block_service = get_block_service()
+
+    def _get_blocks_from_node(
+        self, block_numbers: Sequence[int]
+    ) -> Dict[int, HexBytes]:
+        """
+        :param block_numbers:
+        :return: Dictionary with `block_number` as the key and the blockchain hash, using one batched request
+        """
+        if not block_numbers:
+            return {}
+        return {
+            block["number"]: HexBytes(block["hash"])
+            for block in self.ethereum_client.get_blocks(
+                block_numbers, full_transactions=False
+            )
+            if block
+        }
+
+    def get_blockchain_block_hashes(
+        self, block_numbers: Sequence[int]
+    ) -> Dict[int, HexBytes]:
+        """
+        Get the blockchain hashes for `block_numbers`. If block `n + 1` is stored and its hash matches the
+        blockchain, its `parent_hash` is the blockchain hash of block `n`, so for every run of consecutive
+        stored blocks only the newest one is requested to the node. Blocks not resolved that way are
+        requested on a second call
+
+        :param block_numbers: Sorted distinct block numbers
+        :return: Dictionary with `block_number` as the key and the blockchain hash
+        """
+        stored_blocks = self.block_service.get_stored_blocks(block_numbers)
+        blockchain_block_hashes = self._get_blocks_from_node(
+            [
+                block_number
+                for block_number in block_numbers
+                if block_number + 1 not in stored_blocks
+            ]
+        )
+        for block_number in reversed(block_numbers):
+            if block_number in blockchain_block_hashes:
+                continue
+            child_block = stored_blocks.get(block_number + 1)
+            if child_block and blockchain_block_hashes.get(
+                block_number + 1
+            ) == HexBytes(child_block.block_hash):
+                blockchain_block_hashes[block_number] = HexBytes(
+                    child_block.parent_hash
+                )
+
+        blockchain_block_hashes.update(
+            self._get_blocks_from_node(
+                [
+                    block_number
+                    for block_number in block_numbers
+                    if block_number not in blockchain_block_hashes
+                ]
+            )
+        )
+        return blockchain_block_hashes
 
     def check_reorg(
-        self, database_blocks, blockchain_blocks, confirmation_block
+        self,
+        database_blocks: Sequence[Tuple[int, bytes]],
+        blockchain_block_hashes: Dict[int, bytes],
+        confirmation_block: int,
     ) -> Optional[int]:
         """
+        Compare database and blockchain block hashes. Transactions and blocks matching the blockchain and
+        older than `confirmation_block` are marked as confirmed using one `UPDATE` for every table
 
-        :param database_blocks:
-        :param blockchain_blocks:
+        :param database_blocks: Sorted distinct `(block_number, block_hash)` not confirmed on database
+        :param blockchain_block_hashes: Blockchain hash for every `block_number` in `database_blocks`
         :param confirmation_block:
         :return block number of reorg block if reorg is detected:
         """
-        blocks_to_confirm = []
+        blockchain_block_hashes = {
+            block_number: HexBytes(block_hash)
+            for block_number, block_hash in blockchain_block_hashes.items()
+        }
+        block_numbers_to_confirm = []
         reorg_block: Optional[int] = None
-        for database_block, blockchain_block in zip(database_blocks, blockchain_blocks):
-            if HexBytes(blockchain_block["hash"]) == HexBytes(
-                database_block.block_hash
-            ):
+        for block_number, block_hash in database_blocks:
+            blockchain_block_hash = blockchain_block_hashes.get(block_number)
+            if blockchain_block_hash == HexBytes(block_hash):
                 # Check all the blocks but only mark safe ones as confirmed
-                if database_block.block_number <= confirmation_block:
+                if block_number <= confirmation_block:
                     logger.debug(
                         "Block with number=%d and hash=%s is matching blockchain one, setting as confirmed",
-                        database_block.block_number,
-                        HexBytes(blockchain_block["hash"]).hex(),
+                        block_number,
+                        blockchain_block_hash.hex(),
                     )
-                    database_block.confirmed = True
-                    blocks_to_confirm.append(database_block)
+                    block_numbers_to_confirm.append(block_number)
             else:
                 logger.warning(
                     "Block with number=%d and hash=%s is not matching blockchain hash=%s, reorg found",
-                    database_block.block_number,
-                    HexBytes(database_block.block_hash).hex(),
-                    HexBytes(blockchain_block["hash"]).hex(),
+                    block_number,
+                    HexBytes(block_hash).hex(),
+                    blockchain_block_hash.hex() if blockchain_block_hash else None,
                 )
-                reorg_block = database_block.block_number
+                reorg_block = block_number
                 break
-        # Update confirmed blocks
-        EthereumTx.objects.bulk_update(blocks_to_confirm, ["confirmed"])
+
+        if reorg_block is not None:
+            # A block number can be stored with more than one hash, only blocks before the reorg are valid
+            block_numbers_to_confirm = [
+                block_number
+                for block_number in block_numbers_to_confirm
+                if block_number < reorg_block
+            ]
+        if block_numbers_to_confirm:
+            EthereumTx.objects.filter(
+                block_number__lte=confirmation_block,
+                block_number__in=block_numbers_to_confirm,
+            ).update(confirmed=True)
+            EthereumBlock.objects.filter(
+                number__in=block_numbers_to_confirm,
+                block_hash__in=[
+                    blockchain_block_hashes[block_number]
+                    for block_number in block_numbers_to_confirm
+                ],
+            ).update(confirmed=True)
         return reorg_block
 
-    def run_check_reorg(self):
+    def get_not_confirmed_blocks(
+        self, after: Optional[Tuple[int, bytes]] = None
+    ) -> List[Tuple[int, bytes]]:
+        """
+        :param after: Last `(block_number, block_hash)` returned by the previous call, `None` for the first one
+        :return: Next batch of sorted distinct `(block_number, block_hash)` not confirmed. The same block can be stored
+            for multiple transactions, but it is only returned once
+        """
+        queryset = EthereumTx.objects.not_confirmed()
+        if after:
+            block_number, block_hash = after
+            queryset = queryset.filter(
+                Q(block_number__gt=block_number)
+                | Q(block_number=block_number, block_hash__gt=block_hash)
+            )
+        return [
+            (block_number, HexBytes(block_hash))
+            for block_number, block_hash in queryset.values_list(
+                "block_number", "block_hash"
+            )
+            .order_by("block_number", "block_hash")
+            .distinct()[: self.eth_reorg_blocks_batch]
+        ]
+
+    def run_check_reorg(self) -> Optional[int]:
         """
         :return: Number of the oldest block with reorg detected. `None` if not reorg found
         """
-        unconfirmed_blocks = (
-            EthereumTx.objects.not_confirmed()
-            .only("block_number", "block_hash")
-            .order_by("block_number")
-        )
-        if not unconfirmed_blocks:
+        database_blocks = self.get_not_confirmed_blocks()
+        if not database_blocks:
             return None
         current_block_number = self.ethereum_client.current_block_number
         confirmation_block = current_block_number - self.eth_reorg_blocks
-        paginator = Paginator(unconfirmed_blocks, per_page=self.eth_reorg_blocks_batch)
-        for page_number in paginator.page_range:
-            current_page = paginator.get_page(page_number)
-            database_blocks = []
-            block_numbers = []
-            for block in current_page.object_list:
-                database_blocks.append(block)
-                block_numbers.append(block.block_number)
-            blockchain_blocks = self.ethereum_client.get_blocks(
-                block_numbers, full_transactions=False
+        while database_blocks:
+            block_numbers = sorted(
+                {block_number for block_number, _ in database_blocks}
             )
-            if reorg_block_number := self.check_reorg(
-                database_blocks, blockchain_blocks, confirmation_block
-            ):
+            if (
+                reorg_block_number := self.check_reorg(
+                    database_blocks,
+                    self.get_blockchain_block_hashes(block_numbers),
+                    confirmation_block,
+                )
+            ) is not None:
                 return reorg_block_number
+            database_blocks = self.get_not_confirmed_blocks(after=database_blocks[-1])
+        return None
 
     def reset_indexer(self, reorg_block_number: int):
         locking_indexer = get_safe_locking_event_indexer()
@@ -119,18 +239,40 @@ class ReorgService:
     @transaction.atomic
     def recover_from_reorg(self, reorg_block_number: int) -> int:
         """
-        Reset database fields to a block to start reindexing from that block
-        and remove blocks greater or equal than `reorg_block_number`.
+        Reset database fields to a block to start reindexing from that block,
+        remove blocks greater or equal than `reorg_block_number` and recalculate the balances
+        of the holders affected.
 
         :param reorg_block_number:
         :return: Return number of elements updated
         """
 
         self.reset_indexer(reorg_block_number)
+        # Holders with events on the reorg blocks must have their balances recalculated
+        holders = set()
+        if settings.LOCKING_EVENTS_UNIFIED_TABLE_ENABLED:
+            holders.update(
+                LockingEvent.objects.filter(
+                    block_number__gte=reorg_block_number
+                ).values_list("holder", flat=True)
+            )
+        else:
+            for event_model in (LockEvent, UnlockEvent, WithdrawnEvent):
+                holders.update(
+                    event_model.objects.filter(
+                        ethereum_tx__block_number__gte=reorg_block_number
+                    ).values_list("holder", flat=True)
+                )
         # Delete transactions from reorg
         number_deleted_blocks, _ = EthereumTx.objects.filter(
             block_number__gte=reorg_block_number
         ).delete()
+        self.block_service.remove_blocks(reorg_block_number)
+        # Holders moved in the leaderboard by the balances updated must be invalidated too
+        moved_holders = HolderBalance.objects.update_holders(holders)
+        moved_holders += HolderBalance.objects.update_positions(holders)
+        bump_cache_version_on_commit(LOCKING_EVENTS_CACHE_VERSION)
+        bump_holders_cache_versions_on_commit(holders.union(moved_holders))
         logger.warning(
             "Reorg of block-number=%d fixed, indexing was reset to block=%d, %d blocks were deleted",
             reorg_block_number,
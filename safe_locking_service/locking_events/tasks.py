@@ -1,11 +1,20 @@
 # Expected to add indexing tasks
 import contextlib
 
+from django.db import transaction
+
 from celery import app
 from celery.utils.log import get_task_logger
 from redis.exceptions import LockError
 
+from safe_locking_service.utils.cache import (
+    LOCKING_EVENTS_CACHE_VERSION,
+    bump_cache_version_on_commit,
+    bump_holders_cache_versions_on_commit,
+)
+
 from .indexers.safe_locking_events_indexer import get_safe_locking_event_indexer
+from .models import HolderBalance
 from .services.reorg_service import ReorgService, get_reorg_service
 from .utils import LOCK_TIMEOUT, SOFT_TIMEOUT, only_one_running_task
 
@@ -41,3 +50,28 @@ def check_reorgs_task(self):
                 # Stopping running tasks is not possible with gevent
                 reorg_service.recover_from_reorg(reorg_block_number)
                 return reorg_block_number
+
+
+@app.shared_task(
+    bind=True,
+    soft_time_limit=SOFT_TIMEOUT,
+    time_limit=LOCK_TIMEOUT,
+)
+def update_leaderboard_positions_task(self) -> int:
+    """
+    Rank all the holders again, fixing the positions left wrong by previous incremental updates
+
+    :return: Number of holders with the position fixed
+    """
+    with contextlib.suppress(LockError):
+        with only_one_running_task(self):
+            logger.info("Start ranking all the holders")
+            with transaction.atomic():
+                if moved_holders := HolderBalance.objects.update_positions():
+                    bump_cache_version_on_commit(LOCKING_EVENTS_CACHE_VERSION)
+                    bump_holders_cache_versions_on_commit(moved_holders)
+            if moved_holders:
+                logger.warning(
+                    "Fixed the leaderboard position of %d holders", len(moved_holders)
+                )
+            return len(moved_holders)
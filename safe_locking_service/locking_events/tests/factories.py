@@ -1,18 +1,33 @@
+from django.conf import settings
 from django.utils import timezone
 
 from eth_account import Account
-from factory import LazyFunction, Sequence, SubFactory, fuzzy
+from factory import LazyFunction, PostGeneration, Sequence, SubFactory, fuzzy
 from factory.django import DjangoModelFactory
 from web3 import Web3
 
 from safe_locking_service.locking_events.models import (
+    CommonEvent,
+    EthereumBlock,
     EthereumTx,
     LockEvent,
+    LockingEvent,
     UnlockEvent,
     WithdrawnEvent,
 )
 
 
+class EthereumBlockFactory(DjangoModelFactory):
+    class Meta:
+        model = EthereumBlock
+
+    number = Sequence(lambda n: n + 1)
+    block_hash = Sequence(lambda n: Web3.keccak(text=f"block-{n}").hex())
+    parent_hash = Sequence(lambda n: Web3.keccak(text=f"block-{n - 1}").hex())
+    timestamp = LazyFunction(timezone.now)
+    confirmed = False
+
+
 class EthereumTxFactory(DjangoModelFactory):
     class Meta:
         model = EthereumTx
@@ -24,20 +39,33 @@ class EthereumTxFactory(DjangoModelFactory):
     confirmed = False
 
 
+def create_locking_event(event: CommonEvent, create: bool, extracted, **kwargs):
+    """
+    Store the event also in the `LockingEvent` table if enabled, as the indexer does
+    """
+    if create and settings.LOCKING_EVENTS_UNIFIED_TABLE_ENABLED:
+        LockingEvent.create_instance_from_event(
+            event, event.ethereum_tx.block_number
+        ).save()
+
+
 class LockEventFactory(DjangoModelFactory):
     class Meta:
         model = LockEvent
+        skip_postgeneration_save = True
 
     timestamp = LazyFunction(timezone.now)
     ethereum_tx = SubFactory(EthereumTxFactory)
     log_index = Sequence(lambda n: n)
     amount = fuzzy.FuzzyInteger(0, 1000)
     holder = LazyFunction(lambda: Account.create().address)
+    locking_event = PostGeneration(create_locking_event)
 
 
 class UnlockEventFactory(DjangoModelFactory):
     class Meta:
         model = UnlockEvent
+        skip_postgeneration_save = True
 
     timestamp = LazyFunction(timezone.now)
     ethereum_tx = SubFactory(EthereumTxFactory)
@@ -45,11 +73,13 @@ class UnlockEventFactory(DjangoModelFactory):
     holder = LazyFunction(lambda: Account.create().address)
     amount = fuzzy.FuzzyInteger(0, 1000)
     unlock_index = Sequence(lambda n: n + 1)
+    locking_event = PostGeneration(create_locking_event)
 
 
 class WithdrawnEventFactory(DjangoModelFactory):
     class Meta:
         model = WithdrawnEvent
+        skip_postgeneration_save = True
 
     timestamp = LazyFunction(timezone.now)
     ethereum_tx = SubFactory(EthereumTxFactory)
@@ -57,3 +87,4 @@ class WithdrawnEventFactory(DjangoModelFactory):
     holder = LazyFunction(lambda: Account.create().address)
     amount = fuzzy.FuzzyInteger(0, 1000)
     unlock_index = Sequence(lambda n: n + 1)
+    locking_event = PostGeneration(create_locking_event)
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from gnosis.eth import EthereumClient
+
+from ..models import EthereumBlock
+from ..services.block_service import BlockService
+from .factories import EthereumBlockFactory
+
+
+class TestBlockService(TestCase):
+    def test_get_blocks_cached(self):
+        block_service = BlockService(mock.MagicMock(spec=EthereumClient))
+        cached_block, removed_block = EthereumBlockFactory.create_batch(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            block_service.get_blocks([cached_block.number, removed_block.number])
+
+        # Hash fixed by the reorg service must not be overwritten by the cached block
+        fixed_hash = Web3.keccak(text="fixed-block")
+        EthereumBlock.objects.filter(number=cached_block.number).update(
+            block_hash=fixed_hash
+        )
+        # Block removed by a reorg recovery on another process must be restored
+        EthereumBlock.objects.filter(number=removed_block.number).delete()
+
+        blocks = block_service.get_blocks([cached_block.number, removed_block.number])
+        block_service.ethereum_client.get_blocks.assert_not_called()
+        self.assertEqual(
+            HexBytes(blocks[cached_block.number].block_hash),
+            HexBytes(cached_block.block_hash),
+        )
+        self.assertEqual(
+            HexBytes(EthereumBlock.objects.get(number=cached_block.number).block_hash),
+            fixed_hash,
+        )
+        self.assertEqual(
+            HexBytes(EthereumBlock.objects.get(number=removed_block.number).block_hash),
+            HexBytes(removed_block.block_hash),
+        )
+
+    def test_fetch_blocks(self):
+        block_service = BlockService(mock.MagicMock(spec=EthereumClient))
+        stored_block = EthereumBlockFactory()
+        node_block = EthereumBlockFactory.build(number=stored_block.number + 1)
+        block_service.ethereum_client.get_blocks.return_value = [
+            {
+                "number": node_block.number,
+                "hash": node_block.block_hash,
+                "parentHash": node_block.parent_hash,
+                "timestamp": int(node_block.timestamp.timestamp()),
+            },
+            None,  # Block not returned by the node
+        ]
+        block_numbers = [stored_block.number, node_block.number, node_block.number + 1]
+        blocks, node_block_numbers = block_service.fetch_blocks(block_numbers)
+        block_service.ethereum_client.get_blocks.assert_called_once_with(
+            [node_block.number, node_block.number + 1], full_transactions=False
+        )
+        self.assertEqual(node_block_numbers, {node_block.number, node_block.number + 1})
+        self.assertEqual(list(blocks), [stored_block.number, node_block.number])
+        # Nothing is stored until `store_blocks` is called
+        self.assertFalse(
+            EthereumBlock.objects.filter(number=node_block.number).exists()
+        )
+        block_service.store_blocks(blocks, node_block_numbers)
+        self.assertEqual(
+            HexBytes(EthereumBlock.objects.get(number=node_block.number).block_hash),
+            HexBytes(node_block.block_hash),
+        )
@@ -5,9 +5,13 @@ from unittest.mock import PropertyMock
 from django.core.management import CommandError, call_command
 from django.test import TestCase
 
+from eth_account import Account
+
 from gnosis.eth.ethereum_client import EthereumClient
 
 from ..indexers.events_indexer import logger as events_logger
+from ..models import EventType, LockingEvent
+from .utils import add_sorted_events
 
 
 class TestCommands(TestCase):
@@ -63,10 +67,57 @@ class TestCommands(TestCase):
                 cm.output[1],
             )
             self.assertIn(
-                "Indexing from-block-number=150 to-block-number=200 pending-blocks=0",
+                "Indexing from-block-number=151 to-block-number=200 pending-blocks=0",
                 cm.output[2],
             )
             self.assertIn(
                 "Finalizing indexing cycle with pending-blocks=0",
                 cm.output[3],
             )
+
+        # Concurrent requests
+        buf = StringIO()
+        with self.assertLogs(logger=events_logger) as cm:
+            call_command(
+                command,
+                "--block-process-limit=51",
+                "--concurrent-requests=2",
+                "--from-block-number=100",
+                stdout=buf,
+            )
+            self.assertIn("Setting concurrent-requests to 2", buf.getvalue())
+            self.assertIn(
+                "Indexing from-block-number=100 to-block-number=150 pending-blocks=50",
+                cm.output[1],
+            )
+            self.assertIn(
+                "Indexing from-block-number=151 to-block-number=200 pending-blocks=0",
+                cm.output[2],
+            )
+            self.assertIn(
+                "Finalizing indexing cycle with pending-blocks=0",
+                cm.output[3],
+            )
+
+    def test_backfill_locking_events(self):
+        command = "backfill_locking_events"
+        add_sorted_events(Account.create().address, 1000, 500, 500)
+        self.assertEqual(LockingEvent.objects.count(), 0)
+
+        buf = StringIO()
+        call_command(command, stdout=buf)
+        self.assertIn("Inserted 3 events", buf.getvalue())
+        self.assertEqual(
+            sorted(LockingEvent.objects.values_list("event_type", flat=True)),
+            [
+                EventType.LOCKED.value,
+                EventType.UNLOCKED.value,
+                EventType.WITHDRAWN.value,
+            ],
+        )
+
+        # Events already copied are not duplicated
+        buf = StringIO()
+        call_command(command, stdout=buf)
+        self.assertIn("Inserted 0 events", buf.getvalue())
+        self.assertEqual(LockingEvent.objects.count(), 3)
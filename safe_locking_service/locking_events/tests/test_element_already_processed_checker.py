@@ -0,0 +1,206 @@
+from unittest import mock
+from unittest.mock import MagicMock
+
+from django.test import TestCase
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from ..indexers.element_already_processed_checker import (
+    ElementAlreadyProcessedChecker,
+    ProcessedElement,
+    RedisElementAlreadyProcessedChecker,
+    get_element_already_processed_checker,
+)
+from ..indexers.element_already_processed_checker import logger as checker_logger
+
+
+def get_processed_element(n: int, block_number: int = 0) -> ProcessedElement:
+    return ProcessedElement(
+        HexBytes(Web3.keccak(text=f"tx_hash-{n}")),
+        HexBytes(Web3.keccak(text=f"block_hash-{block_number}")),
+        n,
+        block_number,
+    )
+
+
+class TestElementAlreadyProcessedChecker(TestCase):
+    def test_get_element_already_processed_checker(self):
+        self.assertIs(
+            type(get_element_already_processed_checker("test")),
+            ElementAlreadyProcessedChecker,
+        )
+        with mock.patch(
+            "safe_locking_service.locking_events.indexers.element_already_processed_checker.get_redis"
+        ):
+            with self.settings(INDEXER_PROCESSED_ELEMENTS_CACHE_BACKEND="redis"):
+                element_already_processed_checker = (
+                    get_element_already_processed_checker("test")
+                )
+                self.assertIsInstance(
+                    element_already_processed_checker,
+                    RedisElementAlreadyProcessedChecker,
+                )
+                self.assertEqual(
+                    element_already_processed_checker.redis_key,
+                    "indexer:processed-elements:test",
+                )
+
+    def test_memory_batch(self):
+        element_already_processed_checker = ElementAlreadyProcessedChecker()
+        elements = [get_processed_element(n) for n in range(3)]
+        self.assertEqual(
+            element_already_processed_checker.are_processed(elements),
+            [False, False, False],
+        )
+        element_already_processed_checker.mark_as_processed_batch(elements[:2])
+        self.assertEqual(
+            element_already_processed_checker.are_processed(elements),
+            [True, True, False],
+        )
+        self.assertFalse(
+            element_already_processed_checker.mark_as_processed(*elements[0])
+        )
+        self.assertTrue(
+            element_already_processed_checker.mark_as_processed(*elements[2])
+        )
+        element_already_processed_checker.clear()
+        self.assertEqual(
+            element_already_processed_checker.are_processed(elements),
+            [False, False, False],
+        )
+
+    def test_get_key(self):
+        element = get_processed_element(1)
+        key = ElementAlreadyProcessedChecker.get_key(
+            element.tx_hash, element.block_hash, element.index
+        )
+        self.assertLess(key.bit_length(), 129)
+        self.assertEqual(
+            key.to_bytes(16, "big"),
+            element.tx_hash[:8] + element.block_hash[:4] + (1).to_bytes(4, "big"),
+        )
+        self.assertNotEqual(
+            key,
+            ElementAlreadyProcessedChecker.get_key(
+                element.tx_hash, element.block_hash, 2
+            ),
+        )
+        self.assertNotEqual(
+            key,
+            ElementAlreadyProcessedChecker.get_key(element.tx_hash, None, 1),
+        )
+
+    def test_mark_as_processed_debug_log(self):
+        element_already_processed_checker = ElementAlreadyProcessedChecker()
+        element = get_processed_element(1)
+        with mock.patch.object(
+            checker_logger, "isEnabledFor", return_value=False
+        ), mock.patch.object(HexBytes, "hex") as hex_mock:
+            element_already_processed_checker.mark_as_processed(*element)
+            element_already_processed_checker.mark_as_processed(*element)
+            # Hashes are not converted if debug logging is disabled
+            hex_mock.assert_not_called()
+
+        with self.assertLogs(checker_logger, level="DEBUG") as cm:
+            element_already_processed_checker.mark_as_processed(
+                element.tx_hash, None, 2
+            )
+        self.assertIn(
+            f"tx-hash={element.tx_hash.hex()} on block=None with index=2", cm.output[0]
+        )
+
+    def test_memory_lru(self):
+        element_already_processed_checker = ElementAlreadyProcessedChecker(maxlen=2)
+        elements = [get_processed_element(n) for n in range(3)]
+        element_already_processed_checker.mark_as_processed_batch(elements[:2])
+        # Accessing the first element makes the second one the least recently used
+        self.assertTrue(
+            element_already_processed_checker.is_processed(*elements[0][:3])
+        )
+        element_already_processed_checker.mark_as_processed(*elements[2])
+        self.assertEqual(
+            element_already_processed_checker.are_processed(elements),
+            [True, False, True],
+        )
+
+    def test_memory_stats(self):
+        element_already_processed_checker = ElementAlreadyProcessedChecker(maxlen=10)
+        self.assertEqual(
+            element_already_processed_checker.get_stats(),
+            {
+                "size": 0,
+                "max_size": 10,
+                "memory_bytes": mock.ANY,
+                "hits": 0,
+                "misses": 0,
+                "hit_rate": 0.0,
+            },
+        )
+        elements = [get_processed_element(n) for n in range(4)]
+        element_already_processed_checker.mark_as_processed_batch(elements[:3])
+        element_already_processed_checker.are_processed(elements)
+        stats = element_already_processed_checker.get_stats()
+        self.assertEqual(stats["size"], 3)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.75)
+        self.assertGreater(stats["memory_bytes"], 0)
+
+    @mock.patch(
+        "safe_locking_service.locking_events.indexers.element_already_processed_checker.get_redis"
+    )
+    def test_redis_batch(self, get_redis_mock: MagicMock):
+        redis_mock = get_redis_mock.return_value
+        element_already_processed_checker = RedisElementAlreadyProcessedChecker(
+            "test", max_block_age=100
+        )
+        redis_key = element_already_processed_checker.redis_key
+        elements = [get_processed_element(n, block_number=n * 100) for n in range(3)]
+        keys = [
+            element_already_processed_checker.get_key(
+                element.tx_hash, element.block_hash, element.index
+            ).to_bytes(16, "big")
+            for element in elements
+        ]
+
+        self.assertEqual(element_already_processed_checker.are_processed([]), [])
+        redis_mock.zmscore.assert_not_called()
+
+        # All the elements must be checked in one request
+        redis_mock.zmscore.return_value = [1.0, None, 200.0]
+        self.assertEqual(
+            element_already_processed_checker.are_processed(elements),
+            [True, False, True],
+        )
+        redis_mock.zmscore.assert_called_once_with(redis_key, keys)
+        pipeline_mock = redis_mock.pipeline.return_value
+        pipeline_mock.execute.return_value = [2, 256]
+        stats = element_already_processed_checker.get_stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["memory_bytes"], 256)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        pipeline_mock.reset_mock()
+
+        # All the elements must be marked and expired in one request
+        element_already_processed_checker.mark_as_processed_batch(elements)
+        pipeline_mock.zadd.assert_called_once_with(
+            redis_key, {keys[0]: 0, keys[1]: 100, keys[2]: 200}
+        )
+        pipeline_mock.zremrangebyscore.assert_called_once_with(
+            redis_key, "-inf", "(100"
+        )
+        pipeline_mock.execute.assert_called_once_with()
+
+        redis_mock.zadd.return_value = 1
+        self.assertTrue(
+            element_already_processed_checker.mark_as_processed(*elements[0])
+        )
+        redis_mock.zadd.return_value = 0
+        self.assertFalse(
+            element_already_processed_checker.mark_as_processed(*elements[0])
+        )
+
+        element_already_processed_checker.clear()
+        redis_mock.delete.assert_called_once_with(redis_key)
@@ -1,23 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.db import connection
 from django.db.models import Sum
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
+from eth_account import Account
 from hexbytes import HexBytes
+from web3.contract.contract import ContractEvent
+from web3.datastructures import AttributeDict
 
+from gnosis.eth import EthereumClient
 from gnosis.eth.tests.ethereum_test_case import EthereumTestCaseMixin
 
 from ..contracts.locking_contract import deploy_locking_contract
+from ..indexers.events_indexer import (
+    FindRelevantEventsException,
+    TooManyResultsException,
+    is_too_many_results_error,
+)
 from ..indexers.events_indexer import logger as events_logger
 from ..indexers.safe_locking_events_indexer import (
+    BlockNotFoundException,
     SafeLockingEventsIndexer,
     get_safe_locking_event_indexer,
 )
 from ..models import (
     EthereumTx,
+    EventType,
+    HolderBalance,
     LockEvent,
+    LockingEvent,
     StatusEventsIndexer,
     UnlockEvent,
     WithdrawnEvent,
 )
+from ..services.block_service import get_block_service
+from .factories import EthereumBlockFactory
 from .mocks.mocks_locking_events_indexer import (
     invalid_lock_event_mock,
     invalid_topic_event_mock,
@@ -28,6 +48,7 @@ from .mocks.mocks_locking_events_indexer import (
     valid_withdrawn_event_mock,
 )
 from .utils import (
+    add_sorted_events,
     erc20_approve,
     increment_chain_time,
     locking_contract_lock,
@@ -169,6 +190,188 @@ class TestLockingEventsIndexer(EthereumTestCaseMixin, TestCase):
             50,
         )
 
+    def test_get_blocks(self):
+        account = self.ethereum_test_account
+        lock_amount = 100
+        erc20_approve(
+            self.ethereum_client.w3,
+            account,
+            self.erc20_contract,
+            self.locking_contract.address,
+            lock_amount,
+        )
+        lock_txs = [
+            locking_contract_lock(
+                self.ethereum_client.w3, account, self.locking_contract, 10
+            )
+            for _ in range(3)
+        ]
+        block_numbers = [lock_tx["blockNumber"] for lock_tx in lock_txs]
+        locking_events_indexer = SafeLockingEventsIndexer(self.locking_contract_address)
+        block_service = get_block_service()
+        block_service.clear()
+        self.assertEqual(block_service.get_blocks([]), {})
+        with mock.patch.object(
+            EthereumClient, "get_blocks", wraps=self.ethereum_client.get_blocks
+        ) as get_blocks_mock:
+            blocks = block_service.get_blocks(block_numbers + block_numbers)
+            # Duplicated blocks must be requested only once, in one batch
+            get_blocks_mock.assert_called_once_with(
+                sorted(set(block_numbers)), full_transactions=False
+            )
+        self.assertEqual(len(blocks), len(set(block_numbers)))
+        for block_number in block_numbers:
+            self.assertEqual(
+                blocks[block_number].timestamp.timestamp(),
+                self.ethereum_client.get_block(block_number)["timestamp"],
+            )
+
+        # Blocks were stored, so they must not be requested again to the node
+        with mock.patch.object(
+            EthereumClient, "get_block"
+        ) as get_block_mock, mock.patch.object(
+            EthereumClient, "get_blocks"
+        ) as get_blocks_mock:
+            locking_events_indexer.index_until_last_chain_block()
+            get_block_mock.assert_not_called()
+            get_blocks_mock.assert_not_called()
+        self.assertEqual(LockEvent.objects.count(), 3)
+        for lock_event in LockEvent.objects.select_related("ethereum_tx__block"):
+            self.assertEqual(
+                lock_event.timestamp, lock_event.ethereum_tx.block_timestamp
+            )
+            self.assertEqual(
+                lock_event.ethereum_tx.block.block_hash,
+                lock_event.ethereum_tx.block_hash,
+            )
+
+    @override_settings(LOCKING_EVENTS_UNIFIED_TABLE_ENABLED=True)
+    def test_process_decoded_events(self):
+        locking_events_indexer = SafeLockingEventsIndexer(self.locking_contract_address)
+        decoded_events = locking_events_indexer.decode_events(
+            [
+                valid_lock_event_mock,
+                valid_unlock_event_mock,
+                valid_withdrawn_event_mock,
+            ]
+        )
+        # Add an event on the same transaction to check transactions are not duplicated
+        decoded_events.append(
+            locking_events_indexer.decode_event(
+                AttributeDict({**valid_lock_event_mock, "logIndex": 3})
+            )
+        )
+        self.assertEqual(len(decoded_events), 4)
+        block_timestamp = timezone.now()
+        for block_number, block_hash in {
+            event["blockNumber"]: event["blockHash"] for event in decoded_events
+        }.items():
+            EthereumBlockFactory(
+                number=block_number, block_hash=block_hash, timestamp=block_timestamp
+            )
+        # Stored blocks matching the events hashes must not be requested to the node
+        with mock.patch.object(EthereumClient, "get_blocks") as get_blocks_mock:
+            locking_events_indexer.process_decoded_events(decoded_events)
+            get_blocks_mock.assert_not_called()
+            self.assertEqual(EthereumTx.objects.count(), 3)
+            self.assertEqual(LockEvent.objects.count(), 2)
+            self.assertEqual(UnlockEvent.objects.count(), 1)
+            self.assertEqual(WithdrawnEvent.objects.count(), 1)
+            self.assertEqual(LockingEvent.objects.count(), 4)
+
+            # Processing the same batch again must not fail or duplicate rows
+            locking_events_indexer.process_decoded_events(decoded_events)
+            self.assertEqual(EthereumTx.objects.count(), 3)
+            self.assertEqual(LockEvent.objects.count(), 2)
+            self.assertEqual(UnlockEvent.objects.count(), 1)
+            self.assertEqual(WithdrawnEvent.objects.count(), 1)
+            self.assertEqual(LockingEvent.objects.count(), 4)
+
+        # Balances must be updated only once for every event
+        self.assertEqual(HolderBalance.objects.count(), 2)
+        lock_holder_balance = HolderBalance.objects.get(
+            holder="0x22D491bde2303f2F43325b2108d26F1EaBA1E32A"
+        )
+        self.assertEqual(lock_holder_balance.locked_amount, 200)
+        self.assertEqual(lock_holder_balance.unlocked_amount, 0)
+        self.assertEqual(lock_holder_balance.withdrawn_amount, 0)
+        self.assertEqual(lock_holder_balance.last_event_timestamp, block_timestamp)
+        unlock_locking_event = LockingEvent.objects.get(
+            event_type=EventType.UNLOCKED.value
+        )
+        self.assertEqual(unlock_locking_event.block_number, 1533)
+        self.assertEqual(unlock_locking_event.unlock_index, 9)
+        self.assertIsNone(
+            LockingEvent.objects.filter(event_type=EventType.LOCKED.value)[
+                0
+            ].unlock_index
+        )
+        unlock_holder_balance = HolderBalance.objects.get(
+            holder="0x22d491Bde2303f2f43325b2108D26f1eAbA1e32b"
+        )
+        self.assertEqual(unlock_holder_balance.unlocked_amount, 10)
+        self.assertEqual(unlock_holder_balance.withdrawn_amount, 10)
+
+    def test_process_decoded_events_block_not_found(self):
+        locking_events_indexer = SafeLockingEventsIndexer(self.locking_contract_address)
+        decoded_events = locking_events_indexer.decode_events([valid_lock_event_mock])
+        atomic_blocks = len(connection.atomic_blocks)
+
+        def get_blocks(*args, **kwargs):
+            # Database transaction is not kept open during the requests to the node
+            self.assertEqual(len(connection.atomic_blocks), atomic_blocks)
+            return [None]
+
+        # Lagging or pruned node
+        with mock.patch.object(
+            EthereumClient, "get_blocks", side_effect=get_blocks
+        ) as get_blocks_mock:
+            with self.assertRaisesMessage(
+                BlockNotFoundException,
+                f"Blocks [{valid_lock_event_mock['blockNumber']}] were not returned by the node",
+            ):
+                locking_events_indexer.process_decoded_events(decoded_events)
+            get_blocks_mock.assert_called_once()
+        self.assertEqual(EthereumTx.objects.count(), 0)
+        self.assertEqual(LockEvent.objects.count(), 0)
+
+    def test_process_decoded_events_holders_cache_invalidation(self):
+        top_holder = Account.create().address
+        bottom_holder = Account.create().address
+        add_sorted_events(top_holder, 10**6, 0, 0)
+        add_sorted_events(bottom_holder, 1, 0, 0)
+        locking_events_indexer = SafeLockingEventsIndexer(self.locking_contract_address)
+        decoded_events = locking_events_indexer.decode_events(
+            [
+                valid_lock_event_mock,
+                valid_unlock_event_mock,
+                valid_withdrawn_event_mock,
+            ]
+        )
+        for decoded_event in decoded_events:
+            EthereumBlockFactory(
+                number=decoded_event["blockNumber"],
+                block_hash=decoded_event["blockHash"],
+            )
+
+        with mock.patch(
+            "safe_locking_service.locking_events.indexers.safe_locking_events_indexer."
+            "bump_holders_cache_versions_on_commit"
+        ) as bump_holders_cache_versions_mock:
+            locking_events_indexer.process_decoded_events(decoded_events)
+        # Unified table is not enabled, balances are calculated from every event table
+        self.assertEqual(LockingEvent.objects.count(), 0)
+        # Holder passed by the new lock is invalidated, holder keeping its position is not
+        bump_holders_cache_versions_mock.assert_called_once_with(
+            {
+                "0x22D491bde2303f2F43325b2108d26F1EaBA1E32A",
+                "0x22d491Bde2303f2f43325b2108D26f1eAbA1e32b",
+                bottom_holder,
+            }
+        )
+        self.assertEqual(HolderBalance.objects.get(holder=top_holder).position, 1)
+        self.assertEqual(HolderBalance.objects.get(holder=bottom_holder).position, 3)
+
     def test_event_decoding(self):
         locking_events_indexer = SafeLockingEventsIndexer(self.locking_contract_address)
 
@@ -219,6 +422,43 @@ class TestLockingEventsIndexer(EthereumTestCaseMixin, TestCase):
         )
         self.assertIsNone(invalid_data_withdrawn_event)
 
+    def test_event_decoders(self):
+        locking_events_indexer = SafeLockingEventsIndexer(self.locking_contract_address)
+        self.assertEqual(len(locking_events_indexer.event_decoders), 3)
+
+        # Event decoders must return the same data as web3
+        for log_receipt, contract_event in zip(
+            (
+                valid_lock_event_mock,
+                valid_unlock_event_mock,
+                valid_withdrawn_event_mock,
+            ),
+            locking_events_indexer.contract_events,
+        ):
+            with mock.patch.object(
+                ContractEvent, "process_log", autospec=True
+            ) as process_log_mock:
+                decoded_event = locking_events_indexer.decode_event(log_receipt)
+                process_log_mock.assert_not_called()
+            self.assertEqual(decoded_event, contract_event.process_log(log_receipt))
+
+        # Not valid shapes fallback to web3
+        not_clean_address_event_mock = AttributeDict(
+            {
+                **valid_lock_event_mock,
+                "topics": [
+                    valid_lock_event_mock["topics"][0],
+                    HexBytes("0x01" + valid_lock_event_mock["topics"][1].hex()[4:]),
+                ],
+            }
+        )
+        for log_receipt in (invalid_lock_event_mock, not_clean_address_event_mock):
+            with mock.patch.object(
+                ContractEvent, "process_log", autospec=True, return_value=None
+            ) as process_log_mock:
+                locking_events_indexer.decode_event(log_receipt)
+                process_log_mock.assert_called_once()
+
     def test_element_already_processed_checker(self):
         locking_events_indexer = SafeLockingEventsIndexer(self.locking_contract_address)
 
@@ -247,7 +487,9 @@ class TestLockingEventsIndexer(EthereumTestCaseMixin, TestCase):
             locking_events_indexer.element_already_processed_checker._processed_element_cache
         )
         processed_keys_lock_event = [
-            event["transactionHash"] + event["blockHash"] + HexBytes(event["logIndex"])
+            locking_events_indexer.element_already_processed_checker.get_key(
+                event["transactionHash"], event["blockHash"], event["logIndex"]
+            )
             for event in lock_tx["logs"]
             if event["topics"][0].hex()
             in locking_events_indexer.events_to_listen.keys()
@@ -272,7 +514,9 @@ class TestLockingEventsIndexer(EthereumTestCaseMixin, TestCase):
             locking_events_indexer.element_already_processed_checker._processed_element_cache
         )
         processed_keys_unlock_event = [
-            event["transactionHash"] + event["blockHash"] + HexBytes(event["logIndex"])
+            locking_events_indexer.element_already_processed_checker.get_key(
+                event["transactionHash"], event["blockHash"], event["logIndex"]
+            )
             for event in unlock_tx["logs"]
             if event["topics"][0].hex()
             in locking_events_indexer.events_to_listen.keys()
@@ -342,3 +586,264 @@ class TestLockingEventsIndexer(EthereumTestCaseMixin, TestCase):
                 cm.output[1],
             )
             self.assertEqual(EthereumTx.objects.count(), 3)
+
+    def test_index_until_last_chain_block_one_block_limit(self):
+        account = self.ethereum_test_account
+        erc20_approve(
+            self.ethereum_client.w3,
+            account,
+            self.erc20_contract,
+            self.locking_contract.address,
+            200,
+        )
+        locking_events_indexer = SafeLockingEventsIndexer(
+            self.locking_contract_address,
+            enable_auto_block_process_limit=False,
+            concurrent_requests=1,
+        )
+        locking_events_indexer.index_until_last_chain_block()
+        for _ in range(2):
+            locking_contract_lock(
+                self.ethereum_client.w3, account, self.locking_contract, 100
+            )
+
+        # Limit shrunk to one block by the adaptive limit must not stop the indexer
+        locking_events_indexer.block_process_limit = 1
+        last_indexed_block = StatusEventsIndexer.objects.get().last_indexed_block
+        current_block_number = self.ethereum_client.current_block_number
+        with self.assertLogs(logger=events_logger) as cm:
+            locking_events_indexer.index_until_last_chain_block()
+        self.assertIn(
+            f"Indexing from-block-number={last_indexed_block} to-block-number={last_indexed_block}",
+            cm.output[1],
+        )
+        self.assertIn(
+            f"Indexing from-block-number={last_indexed_block + 1} to-block-number={last_indexed_block + 1}",
+            cm.output[2],
+        )
+        self.assertEqual(
+            StatusEventsIndexer.objects.get().last_indexed_block,
+            current_block_number - locking_events_indexer.blocks_behind,
+        )
+        self.assertEqual(LockEvent.objects.filter(holder=account.address).count(), 2)
+
+    def test_index_until_last_chain_block_concurrent_requests(self):
+        account = self.ethereum_test_account
+        lock_amount = 100
+        erc20_approve(
+            self.ethereum_client.w3,
+            account,
+            self.erc20_contract,
+            self.locking_contract.address,
+            lock_amount,
+        )
+        for _ in range(0, 5):
+            locking_contract_lock(
+                self.ethereum_client.w3, account, self.locking_contract, 10
+            )
+        locking_events_indexer = SafeLockingEventsIndexer(
+            self.locking_contract_address,
+            block_process_limit=3,
+            enable_auto_block_process_limit=False,
+            concurrent_requests=4,
+        )
+        current_block_number = self.ethereum_client.current_block_number
+        block_ranges = locking_events_indexer.get_block_ranges(0, current_block_number)
+        self.assertEqual(block_ranges[:2], [(0, 2), (3, 5)])
+        self.assertLessEqual(len(block_ranges), 4)
+
+        # If one of the ranges fails, only the previous ones must be stored
+        find_relevant_log_events = locking_events_indexer.find_relevant_log_events
+
+        def find_relevant_log_events_failing(from_block_number, to_block_number):
+            if from_block_number >= 3:
+                raise FindRelevantEventsException
+            return find_relevant_log_events(from_block_number, to_block_number)
+
+        with mock.patch.object(
+            locking_events_indexer,
+            "find_relevant_log_events",
+            side_effect=find_relevant_log_events_failing,
+        ):
+            locking_events_indexer.index_until_last_chain_block(from_block_number=0)
+        self.assertEqual(
+            StatusEventsIndexer.objects.get(
+                contract=self.locking_contract_address
+            ).last_indexed_block,
+            2,
+        )
+        self.assertEqual(locking_events_indexer.block_process_limit, 1)
+
+        locking_events_indexer.block_process_limit = 3
+        locking_events_indexer.index_until_last_chain_block()
+        self.assertEqual(LockEvent.objects.filter(holder=account.address).count(), 5)
+        self.assertEqual(
+            StatusEventsIndexer.objects.get(
+                contract=self.locking_contract_address
+            ).last_indexed_block,
+            current_block_number,
+        )
+
+    def test_auto_adjust_block_limit(self):
+        locking_events_indexer = SafeLockingEventsIndexer(
+            self.locking_contract_address,
+            block_process_limit=100,
+            block_process_limit_max=1_000,
+            block_process_target_seconds=5.0,
+            max_results_per_request=1_000,
+        )
+        # Measures of ranges different than the block process limit are ignored
+        locking_events_indexer.auto_adjust_block_limit(0, 10, 0.1, 0)
+        self.assertEqual(locking_events_indexer.block_process_limit, 100)
+        # Fast requests with few results double the limit
+        locking_events_indexer.auto_adjust_block_limit(0, 99, 0.1, 0)
+        self.assertEqual(locking_events_indexer.block_process_limit, 200)
+        # Requests close to the target don't change the limit
+        locking_events_indexer.auto_adjust_block_limit(0, 199, 4.5, 100)
+        self.assertEqual(locking_events_indexer.block_process_limit, 200)
+        # Too many results reduce the limit, even for fast requests
+        locking_events_indexer.auto_adjust_block_limit(0, 199, 0.1, 1_500)
+        self.assertEqual(locking_events_indexer.block_process_limit, 133)
+        # Slow requests reduce the limit, at most to the half
+        locking_events_indexer.auto_adjust_block_limit(0, 132, 60.0, 0)
+        self.assertEqual(locking_events_indexer.block_process_limit, 66)
+        # Limit cannot be bigger than block_process_limit_max
+        locking_events_indexer.block_process_limit = 900
+        locking_events_indexer.auto_adjust_block_limit(0, 899, 0.1, 0)
+        self.assertEqual(locking_events_indexer.block_process_limit, 1_000)
+
+        locking_events_indexer.enable_auto_block_process_limit = False
+        locking_events_indexer.auto_adjust_block_limit(0, 999, 0.1, 0)
+        self.assertEqual(locking_events_indexer.block_process_limit, 1_000)
+
+        # Measures of concurrent ranges with the same limit only adjust it once
+        locking_events_indexer.enable_auto_block_process_limit = True
+        locking_events_indexer.block_process_limit = 100
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for from_block_number in range(0, 400, 100):
+                executor.submit(
+                    locking_events_indexer.auto_adjust_block_limit,
+                    from_block_number,
+                    from_block_number + 99,
+                    0.1,
+                    0,
+                )
+        self.assertEqual(locking_events_indexer.block_process_limit, 200)
+
+    def test_too_many_results_bisect_block_process_limit(self):
+        self.assertTrue(
+            is_too_many_results_error(
+                ValueError(
+                    {
+                        "code": -32005,
+                        "message": "query returned more than 10000 results",
+                    }
+                )
+            )
+        )
+        self.assertFalse(is_too_many_results_error(IOError("Connection refused")))
+
+        locking_events_indexer = SafeLockingEventsIndexer(
+            self.locking_contract_address,
+            block_process_limit=50,
+            enable_auto_block_process_limit=False,
+            block_range_split_max_depth=0,
+        )
+        with mock.patch.object(
+            locking_events_indexer.ethereum_client.slow_w3.eth,
+            "get_logs",
+            side_effect=ValueError(
+                {"code": -32005, "message": "query returned more than 10000 results"}
+            ),
+        ):
+            with self.assertRaises(TooManyResultsException):
+                locking_events_indexer.find_relevant_log_events(0, 49)
+            to_block_number = locking_events_indexer.get_to_block_number(
+                0, self.ethereum_client.current_block_number
+            )
+            locking_events_indexer.index_until_last_chain_block(from_block_number=0)
+        # Limit must be half of the failing block range
+        self.assertEqual(
+            locking_events_indexer.block_process_limit,
+            max((to_block_number + 1) // 2, 1),
+        )
+
+        with mock.patch.object(
+            locking_events_indexer.ethereum_client.slow_w3.eth,
+            "get_logs",
+            side_effect=IOError("Connection refused"),
+        ):
+            with self.assertRaises(FindRelevantEventsException):
+                locking_events_indexer.find_relevant_log_events(0, 24)
+            locking_events_indexer.index_until_last_chain_block(from_block_number=0)
+        self.assertEqual(locking_events_indexer.block_process_limit, 1)
+
+    def test_find_log_events_split_block_range(self):
+        locking_events_indexer = SafeLockingEventsIndexer(
+            self.locking_contract_address,
+            block_process_limit=100,
+            enable_auto_block_process_limit=False,
+            block_range_split_max_depth=3,
+        )
+        requested_block_ranges = []
+
+        def get_logs_mock(parameters):
+            from_block_number = parameters["fromBlock"]
+            to_block_number = parameters["toBlock"]
+            requested_block_ranges.append((from_block_number, to_block_number))
+            if to_block_number - from_block_number >= 25:
+                raise ValueError(
+                    {
+                        "code": -32005,
+                        "message": "query returned more than 10000 results",
+                    }
+                )
+            return [from_block_number]
+
+        with mock.patch.object(
+            locking_events_indexer.ethereum_client.slow_w3.eth,
+            "get_logs",
+            side_effect=get_logs_mock,
+        ):
+            # Range is split in 4 ranges of 25 blocks
+            self.assertEqual(
+                locking_events_indexer.find_relevant_log_events(0, 99),
+                [0, 25, 50, 75],
+            )
+            self.assertEqual(
+                requested_block_ranges,
+                [
+                    (0, 99),
+                    (0, 49),
+                    (0, 24),
+                    (25, 49),
+                    (50, 99),
+                    (50, 74),
+                    (75, 99),
+                ],
+            )
+            # Block process limit is reduced to the successful ranges size
+            self.assertEqual(locking_events_indexer.block_process_limit, 25)
+
+            # If max depth is reached exception is raised
+            locking_events_indexer.block_range_split_max_depth = 1
+            with self.assertRaises(TooManyResultsException):
+                locking_events_indexer.find_relevant_log_events(0, 99)
+
+        # Other errors are not solved splitting the range
+        locking_events_indexer.block_range_split_max_depth = 3
+        for exception in (
+            ConnectionError("Connection refused"),
+            TimeoutError("Read timed out"),
+            ValueError({"code": -32000, "message": "header not found"}),
+        ):
+            with self.subTest(exception=exception), mock.patch.object(
+                locking_events_indexer.ethereum_client.slow_w3.eth,
+                "get_logs",
+                side_effect=exception,
+            ) as get_logs_mock:
+                with self.assertRaises(FindRelevantEventsException) as cm:
+                    locking_events_indexer.find_relevant_log_events(0, 99)
+                self.assertNotIsInstance(cm.exception, TooManyResultsException)
+                get_logs_mock.assert_called_once()
+                self.assertEqual(locking_events_indexer.block_process_limit, 25)
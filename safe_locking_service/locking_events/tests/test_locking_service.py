@@ -1,7 +1,8 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from eth_account import Account
 
+from ..pagination import EventCursor
 from ..services.locking_service import EventType, LockingService
 from .utils import add_sorted_events
 
@@ -10,13 +11,83 @@ class TestLockingService(TestCase):
     def test_get_all_events_by_holder(self):
         address = Account.create().address
         locking_service = LockingService(address)
-        self.assertEqual(len(locking_service.get_all_events_by_holder()), 0)
+        self.assertEqual(locking_service.get_all_events_by_holder().count(), 0)
         add_sorted_events(address, 1000, 1000, 1000)
         all_events = locking_service.get_all_events_by_holder()
-        self.assertEqual(len(all_events), 3)
+        self.assertEqual(all_events.count(), 3)
         self.assertEqual(all_events[0].event_type, EventType.WITHDRAWN.value)
         self.assertEqual(all_events[1].event_type, EventType.UNLOCKED.value)
         self.assertEqual(all_events[2].event_type, EventType.LOCKED.value)
         for event in all_events:
             self.assertEqual(event.holder, address)
             self.assertEqual(event.amount, 1000)
+
+    def test_get_all_events_by_holder_pagination(self):
+        address = Account.create().address
+        locking_service = LockingService(address)
+        for _ in range(3):
+            add_sorted_events(address, 1000, 500, 500)
+        add_sorted_events(Account.create().address, 1000, 500, 500)
+        # Every operation must use one query per event table
+        with self.assertNumQueries(3):
+            self.assertEqual(locking_service.get_all_events_by_holder().count(), 9)
+        with self.assertNumQueries(3):
+            events = list(locking_service.get_all_events_by_holder())
+        self.assertEqual(
+            [event.timestamp for event in events],
+            sorted([event.timestamp for event in events], reverse=True),
+        )
+        # Every page must be the same as slicing all the events sorted
+        for offset in range(0, 10, 2):
+            with self.assertNumQueries(3):
+                self.assertEqual(
+                    locking_service.get_all_events_by_holder()[offset : offset + 2],
+                    events[offset : offset + 2],
+                )
+
+        # Events after the cursor
+        cursor = EventCursor(
+            events[3].timestamp, events[3].ethereum_tx_id, events[3].log_index
+        )
+        self.assertEqual(
+            list(
+                locking_service.get_all_events_by_holder().filter(cursor.get_filter())
+            ),
+            events[4:],
+        )
+
+    @override_settings(LOCKING_EVENTS_UNIFIED_TABLE_ENABLED=True)
+    def test_get_all_events_by_holder_pagination_unified_table(self):
+        address = Account.create().address
+        locking_service = LockingService(address)
+        for _ in range(3):
+            add_sorted_events(address, 1000, 500, 500)
+        add_sorted_events(Account.create().address, 1000, 500, 500)
+        # Every operation must use only one query on the `LockingEvent` table
+        with self.assertNumQueries(1):
+            self.assertEqual(locking_service.get_all_events_by_holder().count(), 9)
+        with self.assertNumQueries(1):
+            events = list(locking_service.get_all_events_by_holder())
+        self.assertEqual(
+            [event.timestamp for event in events],
+            sorted([event.timestamp for event in events], reverse=True),
+        )
+        for offset in range(0, 10, 2):
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    list(
+                        locking_service.get_all_events_by_holder()[offset : offset + 2]
+                    ),
+                    events[offset : offset + 2],
+                )
+
+        # Events after the cursor
+        cursor = EventCursor(
+            events[3].timestamp, events[3].ethereum_tx_id, events[3].log_index
+        )
+        self.assertEqual(
+            list(
+                locking_service.get_all_events_by_holder().filter(cursor.get_filter())
+            ),
+            events[4:],
+        )
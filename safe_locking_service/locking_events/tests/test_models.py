@@ -1,11 +1,13 @@
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import TestCase
 
 from eth_account import Account
 from hexbytes import HexBytes
 
 from safe_locking_service.locking_events.models import (
+    HOLDER_POSITIONS_LOCK_ID,
     EthereumTx,
+    HolderBalance,
     LockEvent,
     UnlockEvent,
     WithdrawnEvent,
@@ -111,6 +113,120 @@ class TestLockingModel(TestCase):
         self.assertEqual(leader_board["unlockedAmount"], 1000)
         self.assertEqual(leader_board["withdrawnAmount"], 1000)
 
+    def test_holder_balance_update_positions_incremental(self):
+        addresses = [Account.create().address for _ in range(8)]
+        for i, address in enumerate(addresses):
+            LockEventFactory(holder=address, amount=(i + 1) * 100)
+            HolderBalance.objects.update_holders([address])
+            HolderBalance.objects.update_positions([address])
+        # Positions are the same as ranking all the holders
+        self.assertEqual(HolderBalance.objects.update_positions(), [])
+        self.assertEqual(HolderBalance.objects.get(holder=addresses[7]).position, 1)
+        self.assertEqual(HolderBalance.objects.get(holder=addresses[0]).position, 8)
+
+        # Holder moving from position 7 to 3, only the holders in between are moved
+        LockEventFactory(holder=addresses[1], amount=450)
+        self.assertEqual(HolderBalance.objects.update_holders([addresses[1]]), [])
+        self.assertCountEqual(
+            HolderBalance.objects.update_positions([addresses[1]]),
+            [addresses[1], addresses[5], addresses[4], addresses[3], addresses[2]],
+        )
+        self.assertEqual(HolderBalance.objects.update_positions(), [])
+        self.assertEqual(HolderBalance.objects.get(holder=addresses[1]).position, 3)
+
+        # Holder with the balance updated but not the position
+        LockEventFactory(holder=addresses[7], amount=1)
+        HolderBalance.objects.update_holders([addresses[7]])
+        self.assertEqual(HolderBalance.objects.update_positions([addresses[7]]), [])
+
+        # New holder at the end of the leaderboard
+        new_address = Account.create().address
+        LockEventFactory(holder=new_address, amount=1)
+        HolderBalance.objects.update_holders([new_address])
+        self.assertEqual(
+            HolderBalance.objects.update_positions([new_address]), [new_address]
+        )
+        self.assertEqual(HolderBalance.objects.get(holder=new_address).position, 9)
+
+        # Holder without events is removed and the holders after it are shifted
+        for lock_event in LockEvent.objects.filter(holder=addresses[6]):
+            lock_event.ethereum_tx.delete()
+        self.assertCountEqual(
+            HolderBalance.objects.update_holders([addresses[6]]),
+            set(addresses + [new_address]) - {addresses[7], addresses[6]},
+        )
+        self.assertEqual(HolderBalance.objects.update_positions([addresses[6]]), [])
+        self.assertEqual(HolderBalance.objects.update_positions(), [])
+        self.assertEqual(HolderBalance.objects.count(), 8)
+
+    def test_holder_balance_update_positions(self):
+        self.assertEqual(HolderBalance.objects.update_positions(), [])
+        addresses = [Account.create().address for _ in range(3)]
+        for address, lock_amount in zip(addresses, (1000, 3000, 2000)):
+            LockEventFactory(holder=address, amount=lock_amount)
+        HolderBalance.objects.update_holders(addresses)
+        self.assertEqual(HolderBalance.objects.filter(position=None).count(), 3)
+        self.assertCountEqual(HolderBalance.objects.update_positions(), addresses)
+        self.assertEqual(
+            list(
+                HolderBalance.objects.order_by("position").values_list(
+                    "holder", "position"
+                )
+            ),
+            [(addresses[1], 1), (addresses[2], 2), (addresses[0], 3)],
+        )
+        # Nothing changed, no rows are updated
+        self.assertEqual(HolderBalance.objects.update_positions(), [])
+
+        # Only the holders with a different position are updated
+        UnlockEventFactory(holder=addresses[1], amount=2500)
+        HolderBalance.objects.update_holders([addresses[1]])
+        self.assertCountEqual(HolderBalance.objects.update_positions(), addresses)
+        LockEventFactory(holder=addresses[2], amount=100)
+        HolderBalance.objects.update_holders([addresses[2]])
+        self.assertEqual(HolderBalance.objects.update_positions(), [])
+
+        leader_board = get_leader_board(limit=2, offset=1)
+        self.assertEqual(len(leader_board), 2)
+        self.assertEqual(leader_board[0]["position"], 2)
+        self.assertEqual(
+            HexBytes(leader_board[0]["holder"].hex()), HexBytes(addresses[0])
+        )
+        self.assertEqual(leader_board[1]["position"], 3)
+        self.assertEqual(
+            HexBytes(leader_board[1]["holder"].hex()), HexBytes(addresses[1])
+        )
+        self.assertEqual(get_leader_board_holder_position(addresses[2])["position"], 1)
+
+    def test_holder_balance_update_positions_repair(self):
+        addresses = [Account.create().address for _ in range(3)]
+        for address, lock_amount in zip(addresses, (1000, 3000, 2000)):
+            LockEventFactory(holder=address, amount=lock_amount)
+        HolderBalance.objects.update_holders(addresses)
+        HolderBalance.objects.update_positions(addresses)
+
+        # Positions left duplicated by concurrent updates are fixed ranking all the holders
+        HolderBalance.objects.filter(holder=addresses[0]).update(position=2)
+        self.assertEqual(HolderBalance.objects.update_positions([addresses[1]]), [])
+        self.assertEqual(HolderBalance.objects.update_positions(), [addresses[0]])
+        self.assertEqual(HolderBalance.objects.get(holder=addresses[0]).position, 3)
+
+    def test_holder_balance_lock_positions(self):
+        def get_positions_locks() -> int:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM pg_locks WHERE locktype = 'advisory' AND objid = %s",
+                    [HOLDER_POSITIONS_LOCK_ID],
+                )
+                return cursor.fetchone()[0]
+
+        self.assertEqual(get_positions_locks(), 0)
+        HolderBalance.objects.update_positions([])
+        self.assertEqual(get_positions_locks(), 0)
+        # Lock is held until the transaction ends
+        HolderBalance.objects.update_positions()
+        self.assertEqual(get_positions_locks(), 1)
+
     def test_get_leader_board_count(self):
         self.assertEqual(get_leader_board_count(), 0)
         address = Account.create().address
@@ -3,12 +3,16 @@ from unittest.mock import MagicMock, PropertyMock
 
 from django.test import TestCase
 
+from eth_account import Account
+from hexbytes import HexBytes
+from web3 import Web3
+
 from gnosis.eth import EthereumClient
 
 from ..indexers.safe_locking_events_indexer import get_safe_locking_event_indexer
-from ..models import EthereumTx, LockEvent
-from ..services.reorg_service import get_reorg_service
-from .factories import EthereumTxFactory, LockEventFactory
+from ..models import EthereumBlock, EthereumTx, HolderBalance, LockEvent
+from ..services.reorg_service import ReorgService, get_reorg_service
+from .factories import EthereumBlockFactory, EthereumTxFactory, LockEventFactory
 from .mocks.mock_blocks import block_child, block_parent
 
 
@@ -40,12 +44,131 @@ class TestReorgService(TestCase):
         ethereum_block.refresh_from_db()
         self.assertTrue(ethereum_block.confirmed)
 
+    @mock.patch.object(EthereumClient, "get_blocks")
+    @mock.patch.object(
+        EthereumClient, "current_block_number", new_callable=PropertyMock
+    )
+    def test_check_reorgs_distinct_blocks(
+        self, current_block_number_mock: PropertyMock, get_blocks_mock: MagicMock
+    ):
+        reorg_service = ReorgService(
+            get_reorg_service().ethereum_client,
+            eth_reorg_blocks=10,
+            eth_reorg_blocks_batch=2,
+        )
+        current_block_number_mock.return_value = 100
+        self.assertIsNone(reorg_service.run_check_reorg())
+        get_blocks_mock.assert_not_called()
+
+        # Several transactions on the same block
+        block_hashes = {}
+        for block_number in (10, 20, 30, 95):
+            block_hashes[block_number] = EthereumTxFactory(
+                block_number=block_number
+            ).block_hash
+            EthereumTxFactory(
+                block_number=block_number, block_hash=block_hashes[block_number]
+            )
+
+        def get_blocks(block_numbers, full_transactions=False):
+            return [
+                {"number": block_number, "hash": HexBytes(block_hashes[block_number])}
+                for block_number in block_numbers
+            ]
+
+        get_blocks_mock.side_effect = get_blocks
+        # 3 batches, stored blocks for every batch and one update of transactions and blocks
+        # for every batch with blocks to confirm
+        with self.assertNumQueries(9):
+            self.assertIsNone(reorg_service.run_check_reorg())
+        # Every block must be requested only once
+        self.assertEqual(
+            [call.args[0] for call in get_blocks_mock.call_args_list],
+            [[10, 20], [30, 95]],
+        )
+        self.assertEqual(EthereumTx.objects.filter(confirmed=True).count(), 6)
+        self.assertEqual(
+            list(
+                EthereumTx.objects.not_confirmed().values_list(
+                    "block_number", flat=True
+                )
+            ),
+            [95, 95],
+        )
+
+        # Blocks before the reorg are confirmed
+        current_block_number_mock.return_value = 200
+        block_hashes[95] = Web3.keccak(text="reorg")
+        EthereumTxFactory(block_number=96, block_hash=Web3.keccak(text="block-96"))
+        block_hashes[96] = Web3.keccak(text="block-96")
+        self.assertEqual(reorg_service.run_check_reorg(), 95)
+        self.assertEqual(EthereumTx.objects.not_confirmed().count(), 3)
+
+    @mock.patch.object(EthereumClient, "get_blocks")
+    @mock.patch.object(
+        EthereumClient, "current_block_number", new_callable=PropertyMock
+    )
+    def test_check_reorgs_stored_blocks(
+        self, current_block_number_mock: PropertyMock, get_blocks_mock: MagicMock
+    ):
+        reorg_service = ReorgService(
+            get_reorg_service().ethereum_client, eth_reorg_blocks=10
+        )
+        current_block_number_mock.return_value = 100
+        # Blocks 50 to 53 are linked by their parent hashes, 70 is not linked to any other block
+        ethereum_blocks = {}
+        for block_number in (50, 51, 52, 53, 70):
+            ethereum_blocks[block_number] = EthereumBlockFactory(
+                number=block_number,
+                parent_hash=(
+                    ethereum_blocks[block_number - 1].block_hash
+                    if block_number - 1 in ethereum_blocks
+                    else Web3.keccak(text=f"parent-{block_number}")
+                ),
+            )
+            EthereumTxFactory(
+                block_number=block_number,
+                block_hash=ethereum_blocks[block_number].block_hash,
+                block=ethereum_blocks[block_number],
+            )
+
+        def get_blocks(block_numbers, full_transactions=False):
+            return [
+                {
+                    "number": block_number,
+                    "hash": HexBytes(ethereum_blocks[block_number].block_hash),
+                }
+                for block_number in block_numbers
+            ]
+
+        get_blocks_mock.side_effect = get_blocks
+        self.assertIsNone(reorg_service.run_check_reorg())
+        # Only the newest block of every run of linked blocks is requested
+        get_blocks_mock.assert_called_once_with([53, 70], full_transactions=False)
+        self.assertEqual(EthereumTx.objects.not_confirmed().count(), 0)
+        self.assertEqual(EthereumBlock.objects.filter(confirmed=False).count(), 0)
+
+        # Reorg on the newest block, parent hashes cannot be trusted anymore
+        get_blocks_mock.reset_mock()
+        EthereumTx.objects.update(confirmed=False)
+        ethereum_blocks[53] = EthereumBlockFactory.build(number=53)
+        self.assertEqual(reorg_service.run_check_reorg(), 53)
+        self.assertEqual(
+            [call.args[0] for call in get_blocks_mock.call_args_list],
+            [[53, 70], [50, 51, 52]],
+        )
+        # Block 70 is newer than the reorg, it is not checked
+        self.assertEqual(EthereumTx.objects.not_confirmed().count(), 2)
+
     def test_recover_from_reorg(self):
         reorg_service = get_reorg_service()
         events_indexer = get_safe_locking_event_indexer()
         reorg_block = 2000  # Test a reorg in block 2000
         ethereum_txs = [
-            EthereumTxFactory(block_number=reorg_block + i)
+            EthereumTxFactory(
+                block_number=reorg_block + i,
+                block=EthereumBlockFactory(number=reorg_block + i),
+            )
             for i in range(-1000, 1001, 500)
         ]
         self.assertEqual(
@@ -55,10 +178,15 @@ class TestReorgService(TestCase):
         self.assertEqual(
             events_indexer.get_from_block_number(events_indexer.contract_address), 3000
         )
+        holder = Account.create().address
         for ethereum_tx in ethereum_txs:
-            LockEventFactory(ethereum_tx=ethereum_tx)
+            LockEventFactory(ethereum_tx=ethereum_tx, holder=holder, amount=10)
         self.assertEqual(LockEvent.objects.count(), len(ethereum_txs))
-        LockEventFactory(ethereum_tx=EthereumTxFactory(block_number=reorg_block))
+        reorg_holder = LockEventFactory(
+            ethereum_tx=EthereumTxFactory(block_number=reorg_block)
+        ).holder
+        HolderBalance.objects.update_holders([holder, reorg_holder])
+        self.assertEqual(HolderBalance.objects.get(holder=holder).locked_amount, 50)
 
         lock_events_from_reorg = LockEvent.objects.filter(
             ethereum_tx__block_number__gte=reorg_block
@@ -81,6 +209,17 @@ class TestReorgService(TestCase):
             block_number__gte=reorg_block
         ).count()
         self.assertEqual(transactions_from_reorg, 0)
+        self.assertEqual(
+            list(
+                EthereumBlock.objects.values_list("number", flat=True).order_by(
+                    "number"
+                )
+            ),
+            [1000, 1500],
+        )
+        # Balances must not include the events from reorg blocks
+        self.assertEqual(HolderBalance.objects.get(holder=holder).locked_amount, 20)
+        self.assertFalse(HolderBalance.objects.filter(holder=reorg_holder).exists())
         self.assertEqual(
             events_indexer.get_from_block_number(events_indexer.contract_address), 2000
         )
@@ -0,0 +1,72 @@
+from django.test import TestCase
+
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+from eth_account import Account
+
+from safe_locking_service.locking_events.models import get_leader_board
+from safe_locking_service.locking_events.serializers import (
+    LeaderBoardSerializer,
+    LockEventSerializer,
+    LockEventWithTypeSerializer,
+    UnlockOrWithdrawnEventSerializer,
+    UnlockOrWithdrawnEventWithTypeSerializer,
+    serialize_all_events,
+    serialize_event,
+    serialize_leader_board_row,
+    serialize_unlock_or_withdrawn_event,
+)
+from safe_locking_service.locking_events.services.locking_service import (
+    LockingService,
+)
+from safe_locking_service.locking_events.tests.factories import (
+    LockEventFactory,
+    UnlockEventFactory,
+)
+from safe_locking_service.utils.renderers import OrjsonRenderer
+
+from .utils import add_sorted_events
+
+
+class TestSerializers(TestCase):
+    def assertSameOutput(self, serializer_data, serialized):
+        self.assertEqual(
+            OrjsonRenderer().render(serialized),
+            CamelCaseJSONRenderer().render(serializer_data),
+        )
+
+    def test_serialize_events(self):
+        lock_event = LockEventFactory(amount=10**28)
+        unlock_event = UnlockEventFactory()
+        self.assertSameOutput(
+            LockEventSerializer(lock_event).data, serialize_event(lock_event)
+        )
+        self.assertSameOutput(
+            UnlockOrWithdrawnEventSerializer(unlock_event).data,
+            serialize_unlock_or_withdrawn_event(unlock_event),
+        )
+
+    def test_serialize_all_events(self):
+        address = Account.create().address
+        add_sorted_events(address, 1000, 500, 500)
+        events = list(LockingService(address).get_all_events_by_holder())[::-1]
+        self.assertSameOutput(
+            [
+                LockEventWithTypeSerializer(events[0]).data,
+                UnlockOrWithdrawnEventWithTypeSerializer(events[1]).data,
+                UnlockOrWithdrawnEventWithTypeSerializer(events[2]).data,
+            ],
+            serialize_all_events(events),
+        )
+        self.assertEqual(
+            [event["eventType"] for event in serialize_all_events(events)],
+            ["LOCKED", "UNLOCKED", "WITHDRAWN"],
+        )
+
+    def test_serialize_leader_board_row(self):
+        add_sorted_events(Account.create().address, 1000, 500, 500)
+        add_sorted_events(Account.create().address, 2000, 0, 0)
+        leader_board = get_leader_board(limit=10, offset=0)
+        self.assertSameOutput(
+            LeaderBoardSerializer(leader_board, many=True).data,
+            [serialize_leader_board_row(row) for row in leader_board],
+        )
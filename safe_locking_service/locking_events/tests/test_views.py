@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 
 from eth_account import Account
 from rest_framework import status
@@ -238,6 +239,68 @@ class TestViews(TestCase):
         self.assertEqual(results[0]["transactionHash"], new_lock_event.ethereum_tx_id)
         self.assertEqual(results[1]["transactionHash"], lock_expected.ethereum_tx_id)
 
+    def test_lock_events_view_cursor_pagination(self):
+        address = Account.create().address
+        url = reverse("v1:locking_events:lock-events", args=(address,))
+        response = self.client.get(url + "?cursor=", format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"next": None, "previous": None, "results": []})
+
+        timestamp = timezone.now()
+        # Events on the same timestamp must be sorted by transaction hash and log index
+        lock_events = [
+            LockEventFactory(holder=address, timestamp=timestamp) for _ in range(5)
+        ]
+        expected_tx_hashes = [
+            lock_event.ethereum_tx_id
+            for lock_event in sorted(
+                lock_events,
+                key=lambda lock_event: (
+                    lock_event.ethereum_tx_id,
+                    lock_event.log_index,
+                ),
+                reverse=True,
+            )
+        ]
+
+        tx_hashes = []
+        next_url = url + "?cursor=&limit=2"
+        while next_url:
+            response = self.client.get(next_url, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            tx_hashes.extend(
+                result["transactionHash"] for result in response.json()["results"]
+            )
+            next_url = response.data["next"]
+        self.assertEqual(tx_hashes, expected_tx_hashes)
+
+        response = self.client.get(url + "?cursor=not-valid", format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_all_events_view_cursor_pagination(self):
+        address = Account.create().address
+        add_sorted_events(address, 1000, 500, 500)
+        add_sorted_events(address, 1000, 500, 500)
+        url = reverse("v1:locking_events:all-events", args=(address,))
+        response = self.client.get(url, format="json")
+        expected_results = response.json()["results"]
+        self.assertEqual(len(expected_results), 6)
+
+        results = []
+        next_url = url + "?cursor=&limit=4"
+        while next_url:
+            response = self.client.get(next_url, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            results.extend(response.json()["results"])
+            next_url = response.data["next"]
+        self.assertEqual(
+            [result["transactionHash"] for result in results],
+            [result["transactionHash"] for result in expected_results],
+        )
+
     def test_unlock_events_view(self):
         not_checksumed_address = "0x15fc97934bd2d140cd1ccbf7B164dec7ff64e667"
         response = self.client.get(
@@ -8,6 +8,7 @@ from web3 import Web3
 from web3.contract import Contract
 from web3.types import RPCEndpoint
 
+from ..models import HolderBalance
 from .factories import LockEventFactory, UnlockEventFactory, WithdrawnEventFactory
 
 
@@ -103,6 +104,8 @@ def add_sorted_events(
     WithdrawnEventFactory(
         holder=address, amount=withdrawn_amount, timestamp=timezone.now()
     )
+    HolderBalance.objects.update_holders([address])
+    HolderBalance.objects.update_positions([address])
 
 
 def increment_chain_time(w3: Web3, increased_time: int) -> None:
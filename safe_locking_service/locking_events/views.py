@@ -1,3 +1,5 @@
+from typing import List
+
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 
@@ -18,6 +20,7 @@ from safe_locking_service.locking_events.models import (
 )
 from safe_locking_service.locking_events.pagination import (
     CustomListPagination,
+    EventsPagination,
     SmallPagination,
 )
 from safe_locking_service.locking_events.serializers import (
@@ -27,8 +30,32 @@ from safe_locking_service.locking_events.serializers import (
     LockEventSerializer,
     UnlockOrWithdrawnEventSerializer,
     serialize_all_events,
+    serialize_event,
+    serialize_leader_board_row,
+    serialize_unlock_or_withdrawn_event,
 )
 from safe_locking_service.locking_events.services.locking_service import LockingService
+from safe_locking_service.utils.cache import (
+    HOLDERS_CACHE_VERSION,
+    LOCKING_EVENTS_CACHE_VERSION,
+    cache_response,
+    get_holder_cache_version_name,
+)
+from safe_locking_service.utils.renderers import OrjsonRenderer
+
+
+def get_locking_events_version_names(**kwargs) -> List[str]:
+    return [LOCKING_EVENTS_CACHE_VERSION]
+
+
+def get_holder_version_names(address: str, **kwargs) -> List[str]:
+    """
+    Responses for a holder are only invalidated when the holder is affected by the indexed events
+
+    :param address:
+    :return:
+    """
+    return [HOLDERS_CACHE_VERSION, get_holder_cache_version_name(address)]
 
 
 class AboutView(GenericAPIView):
@@ -58,9 +85,12 @@ class AboutView(GenericAPIView):
 class AllEventsView(ListAPIView):
     """
     Returns a paginated list of last events executed by the provided address.
+    Send an empty `cursor` query parameter to use cursor pagination instead: every page has the same
+    cost and `count` is not returned, follow the `next` link to get the next page.
     """
 
-    pagination_class = SmallPagination
+    pagination_class = EventsPagination
+    renderer_classes = (OrjsonRenderer,)
     serializer_class = AllEventsDocSerializer  # Just for documentation
 
     def get_queryset(self, address):
@@ -75,6 +105,7 @@ class AllEventsView(ListAPIView):
         response = self.get_paginated_response(serialized_data)
         return response
 
+    @cache_response(get_holder_version_names)
     def get(self, request, address, format=None):
         if not fast_is_checksum_address(address):
             return Response(
@@ -95,7 +126,8 @@ class LeaderBoardView(ListAPIView):
     """
 
     pagination_class = SmallPagination  # Just for documentation
-    serializer_class = LeaderBoardSerializer
+    renderer_classes = (OrjsonRenderer,)
+    serializer_class = LeaderBoardSerializer  # Just for documentation
 
     def get_queryset(self, limit, offset):
         return get_leader_board(limit=limit, offset=offset)
@@ -104,10 +136,11 @@ class LeaderBoardView(ListAPIView):
         paginator = CustomListPagination(self.request)
         queryset = self.get_queryset(paginator.limit, paginator.offset)
         paginator.set_count(get_leader_board_count())
-        serializer = LeaderBoardSerializer(queryset, many=True)
-
-        return paginator.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(
+            [serialize_leader_board_row(row) for row in queryset]
+        )
 
+    @cache_response(get_locking_events_version_names)
     def get(self, request, format=None):
         return super().get(request)
 
@@ -117,11 +150,13 @@ class LeaderBoardPositionView(RetrieveAPIView):
     Returns the leaderboard data for a provided address.
     """
 
-    serializer_class = LeaderBoardSerializer
+    renderer_classes = (OrjsonRenderer,)
+    serializer_class = LeaderBoardSerializer  # Just for documentation
 
     def get_queryset(self, address):
         return get_leader_board_holder_position(address)
 
+    @cache_response(get_holder_version_names)
     def get(self, request, address, format=None):
         if not fast_is_checksum_address(address):
             return Response(
@@ -138,22 +173,33 @@ class LeaderBoardPositionView(RetrieveAPIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        serializer = LeaderBoardSerializer(queryset)
-        return Response(status=status.HTTP_200_OK, data=serializer.data)
+        return Response(
+            status=status.HTTP_200_OK, data=serialize_leader_board_row(queryset)
+        )
 
 
 class LockEventsView(ListAPIView):
     """
     Returns a paginated list of last lock events executed by the provided address.
+    Send an empty `cursor` query parameter to use cursor pagination instead: every page has the same
+    cost and `count` is not returned, follow the `next` link to get the next page.
     """
 
-    pagination_class = SmallPagination
-    serializer_class = LockEventSerializer
+    pagination_class = EventsPagination
+    renderer_classes = (OrjsonRenderer,)
+    serializer_class = LockEventSerializer  # Just for documentation
 
     def get_queryset(self):
         holder = self.kwargs["address"]
         return LockEvent.objects.filter(holder=holder).order_by("-timestamp")
 
+    def list(self, request, *args, **kwargs):
+        page_queryset = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(
+            [serialize_event(event) for event in page_queryset]
+        )
+
+    @cache_response(get_holder_version_names)
     def get(self, request, address, format=None):
         address = self.kwargs["address"]
         if not fast_is_checksum_address(address):
@@ -172,15 +218,25 @@ class LockEventsView(ListAPIView):
 class UnlockEventsView(ListAPIView):
     """
     Returns a paginated list of last unlock events executed by the provided address.
+    Send an empty `cursor` query parameter to use cursor pagination instead: every page has the same
+    cost and `count` is not returned, follow the `next` link to get the next page.
     """
 
-    pagination_class = SmallPagination
-    serializer_class = UnlockOrWithdrawnEventSerializer
+    pagination_class = EventsPagination
+    renderer_classes = (OrjsonRenderer,)
+    serializer_class = UnlockOrWithdrawnEventSerializer  # Just for documentation
 
     def get_queryset(self):
         holder = self.kwargs["address"]
         return UnlockEvent.objects.filter(holder=holder).order_by("-timestamp")
 
+    def list(self, request, *args, **kwargs):
+        page_queryset = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(
+            [serialize_unlock_or_withdrawn_event(event) for event in page_queryset]
+        )
+
+    @cache_response(get_holder_version_names)
     def get(self, request, address, format=None):
         address = self.kwargs["address"]
         if not fast_is_checksum_address(address):
@@ -199,15 +255,25 @@ class UnlockEventsView(ListAPIView):
 class WithdrawEventsView(ListAPIView):
     """
     Returns a paginated list of last withdrawn events executed by the provided address.
+    Send an empty `cursor` query parameter to use cursor pagination instead: every page has the same
+    cost and `count` is not returned, follow the `next` link to get the next page.
     """
 
-    pagination_class = SmallPagination
-    serializer_class = UnlockOrWithdrawnEventSerializer
+    pagination_class = EventsPagination
+    renderer_classes = (OrjsonRenderer,)
+    serializer_class = UnlockOrWithdrawnEventSerializer  # Just for documentation
 
     def get_queryset(self):
         holder = self.kwargs["address"]
         return WithdrawnEvent.objects.filter(holder=holder).order_by("-timestamp")
 
+    def list(self, request, *args, **kwargs):
+        page_queryset = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(
+            [serialize_unlock_or_withdrawn_event(event) for event in page_queryset]
+        )
+
+    @cache_response(get_holder_version_names)
     def get(self, request, address, format=None):
         address = self.kwargs["address"]
         if not fast_is_checksum_address(address):
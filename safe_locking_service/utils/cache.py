@@ -0,0 +1,193 @@
+import hashlib
+import time
+from functools import wraps
+from typing import Any, Callable, Collection, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+# Data of the locking contract events, including balances and leaderboard
+LOCKING_EVENTS_CACHE_VERSION = "locking-events"
+# Generation of the data of every holder, bumped when too many holders change at once
+HOLDERS_CACHE_VERSION = "holders"
+# Campaigns, periods and metadata of all the campaigns
+CAMPAIGNS_CACHE_VERSION = "campaigns"
+
+
+def get_holder_cache_version_name(holder: str) -> str:
+    """
+    :param holder:
+    :return: Name of the version for the events, balance and leaderboard position of a holder
+    """
+    return f"holder:{holder}"
+
+
+def get_campaign_cache_version_name(campaign_uuid: Any) -> str:
+    """
+    :param campaign_uuid:
+    :return: Name of the version for the activities and leaderboard of a campaign
+    """
+    return f"campaign:{campaign_uuid}"
+
+
+def _get_cache_version_key(name: str) -> str:
+    return f"cache-version:{name}"
+
+
+def _get_cache_version_timeout() -> int:
+    """
+    Versions are requested for every url, including the ones for holders or campaigns that do not exist,
+    so they must expire. They are kept at least as long as the responses cached for them, and an expired
+    version is replaced by a time based one, so responses cached for the previous version are never served
+
+    :return: Seconds to keep a version in the cache
+    """
+    return settings.API_RESPONSE_CACHE_TIMEOUT
+
+
+def _get_initial_cache_version() -> int:
+    """
+    :return: Time based version, so versions are never reused if the version key is evicted from the cache
+    """
+    return time.time_ns() // 1_000
+
+
+def get_cache_version(name: str) -> int:
+    """
+    :param name:
+    :return: Current version of the data `name`. `0` if the cache is not available
+    """
+    key = _get_cache_version_key(name)
+    if (version := cache.get(key)) is None:
+        cache.add(key, _get_initial_cache_version(), _get_cache_version_timeout())
+        version = cache.get(key)
+    return version or 0
+
+
+def bump_cache_version(name: str) -> None:
+    """
+    Invalidate all the responses cached for the data `name`. It must be called after the data changes are
+    committed, otherwise a response with the previous data could be cached with the new version
+
+    :param name:
+    :return:
+    """
+    key = _get_cache_version_key(name)
+    try:
+        cache.incr(key)
+        cache.touch(key, _get_cache_version_timeout())
+    except ValueError:  # Version key does not exist
+        cache.add(key, _get_initial_cache_version(), _get_cache_version_timeout())
+
+
+def bump_cache_version_on_commit(name: str) -> None:
+    """
+    Bump the version of the data `name` when the current database transaction is committed
+
+    :param name:
+    :return:
+    """
+    transaction.on_commit(lambda: bump_cache_version(name))
+
+
+def bump_holders_cache_versions(holders: Collection[str]) -> None:
+    """
+    Invalidate the responses cached for `holders`, so responses for the rest of the holders are still
+    served from the cache. New versions are set using only one request to the cache. If there are more
+    than `API_RESPONSE_CACHE_MAX_HOLDERS` holders, the generation of all the holders is bumped instead
+
+    :param holders:
+    :return:
+    """
+    if len(holders) > settings.API_RESPONSE_CACHE_MAX_HOLDERS:
+        bump_cache_version(HOLDERS_CACHE_VERSION)
+    elif holders:
+        # Time based versions are always different from the previous one, no need to read them
+        version = _get_initial_cache_version()
+        cache.set_many(
+            {
+                _get_cache_version_key(get_holder_cache_version_name(holder)): version
+                for holder in holders
+            },
+            timeout=_get_cache_version_timeout(),
+        )
+
+
+def bump_holders_cache_versions_on_commit(holders: Collection[str]) -> None:
+    """
+    Bump the versions of `holders` when the current database transaction is committed
+
+    :param holders:
+    :return:
+    """
+    holders = set(holders)
+    transaction.on_commit(lambda: bump_holders_cache_versions(holders))
+
+
+def cache_response(
+    get_version_names: Callable[..., Sequence[str]],
+    timeout: Optional[int] = settings.API_RESPONSE_CACHE_TIMEOUT,
+):
+    """
+    Cache the successful responses of a DRF view method, keyed by the request url and the current versions
+    of the data used by the view. Cached responses are invalidated exactly when the data changes using
+    `bump_cache_version`, so they can be kept for long periods.
+
+    An `ETag` is derived from the same key, so requests with a matching `If-None-Match` get a
+    `304 Not Modified` before querying the database or rendering the body. `ETag` is not set if the cache
+    is not available, as versions would not change with the data. Nothing is cached if
+    `API_RESPONSE_CACHE_ENABLED` is disabled, as when the cache is not shared with the workers bumping the versions
+
+    :param get_version_names: Function receiving the view `kwargs` and returning the names of the data versions
+        the response depends on
+    :param timeout: Seconds to keep a response cached. Responses for old versions are never requested again,
+        so they are only removed when expired
+    :return:
+    """
+
+    def decorator(view_method: Callable[..., Response]):
+        @wraps(view_method)
+        def wrapper(view, request: Request, *args, **kwargs) -> Response:
+            if not settings.API_RESPONSE_CACHE_ENABLED:
+                return view_method(view, request, *args, **kwargs)
+
+            versions = [
+                get_cache_version(name) for name in get_version_names(**view.kwargs)
+            ]
+            url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+            # Data cached depends on the renderer, as keys can be renamed when rendering
+            renderer_name = request.accepted_renderer.__class__.__name__
+            key = (
+                f"response:{view.__class__.__name__}:{renderer_name}:"
+                f"{':'.join(map(str, versions))}:{url_hash}"
+            )
+            etag: Optional[str] = None
+            if all(versions):
+                etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+                if not_modified := get_conditional_response(request, etag=etag):
+                    not_modified["ETag"] = etag
+                    return not_modified
+
+            if (cached_data := cache.get(key)) is not None:
+                response = Response(cached_data, status=status.HTTP_200_OK)
+            else:
+                response = view_method(view, request, *args, **kwargs)
+                if (
+                    isinstance(response, Response)
+                    and response.status_code == status.HTTP_200_OK
+                ):
+                    cache.set(key, response.data, timeout=timeout)
+
+            if etag and response.status_code == status.HTTP_200_OK:
+                response["ETag"] = etag
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Optional, Union
+
+from django.conf import settings
+
+from eth_typing import ChecksumAddress
+
+from gnosis.eth.django.models import EthereumAddressBinaryField
+from gnosis.eth.utils import fast_to_checksum_address
+
+
+@lru_cache(maxsize=settings.CHECKSUM_ADDRESS_CACHE_SIZE)
+def _to_checksum_address(address: bytes) -> ChecksumAddress:
+    return fast_to_checksum_address(address)
+
+
+def to_checksum_address(address: Union[bytes, memoryview]) -> ChecksumAddress:
+    """
+    Checksum an address stored as binary, using a process local LRU cache. Leaderboards and events return
+    the same holders on every request, so most of them are not hashed again
+
+    :param address: 20 bytes address, like the values of `EthereumAddressBinaryField` in raw queries
+    :return: Checksummed address
+    """
+    return _to_checksum_address(bytes(address))
+
+
+def clear_checksum_address_cache() -> None:
+    _to_checksum_address.cache_clear()
+
+
+class CachedEthereumAddressBinaryField(EthereumAddressBinaryField):
+    """
+    `EthereumAddressBinaryField` checksumming the addresses loaded from the database using
+    `to_checksum_address`, for the addresses repeated on many rows like the holders
+    """
+
+    def from_db_value(
+        self, value: Optional[memoryview], expression, connection
+    ) -> Optional[ChecksumAddress]:
+        if value:
+            return to_checksum_address(value)
@@ -0,0 +1,43 @@
+from typing import Any, Dict, Optional
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class OrjsonRenderer(JSONRenderer):
+    """
+    `JSONRenderer` using `orjson`, for views returning data with the keys already in camelCase, so
+    `CamelCaseJSONRenderer` does not need to walk the data to rename them. Output is the same as the
+    one from `JSONRenderer`, falling back to it for data not supported by `orjson`
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._encoder = self.encoder_class()
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        if data is None:
+            return b""
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            # Datetimes are passed to the encoder, as `orjson` formats them differently
+            ret = orjson.dumps(
+                data,
+                default=self._encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:  # Like integers bigger than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as `JSONRenderer` for the separators valid in JSON but not in javascript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
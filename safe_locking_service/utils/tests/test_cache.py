@@ -0,0 +1,184 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from eth_account import Account
+from rest_framework import status
+
+from ...campaigns.tests.factories import ActivityFactory, CampaignFactory
+from ...locking_events.tests.utils import add_sorted_events
+from ..cache import (
+    CAMPAIGNS_CACHE_VERSION,
+    HOLDERS_CACHE_VERSION,
+    LOCKING_EVENTS_CACHE_VERSION,
+    bump_cache_version,
+    bump_holders_cache_versions,
+    get_cache_version,
+    get_holder_cache_version_name,
+)
+
+LOC_MEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOC_MEM_CACHES)
+class TestCache(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_version(self):
+        version = get_cache_version(LOCKING_EVENTS_CACHE_VERSION)
+        self.assertGreater(version, 0)
+        self.assertEqual(get_cache_version(LOCKING_EVENTS_CACHE_VERSION), version)
+        bump_cache_version(LOCKING_EVENTS_CACHE_VERSION)
+        self.assertEqual(get_cache_version(LOCKING_EVENTS_CACHE_VERSION), version + 1)
+
+        # Evicted versions are never reused
+        cache.clear()
+        bump_cache_version(LOCKING_EVENTS_CACHE_VERSION)
+        self.assertGreater(get_cache_version(LOCKING_EVENTS_CACHE_VERSION), version + 1)
+
+    def test_cache_version_expiration(self):
+        holder_1, holder_2 = (Account.create().address for _ in range(2))
+        with self.settings(API_RESPONSE_CACHE_TIMEOUT=60):
+            now = time.time()
+            version = get_cache_version(LOCKING_EVENTS_CACHE_VERSION)
+            get_cache_version(get_holder_cache_version_name(holder_1))
+            bump_holders_cache_versions([holder_2])
+            # Bumping a version refreshes its expiration
+            with mock.patch("time.time", return_value=now + 30):
+                bump_cache_version(LOCKING_EVENTS_CACHE_VERSION)
+
+        # Versions are not kept forever, as they are created for any requested url
+        with mock.patch("time.time", return_value=now + 61):
+            for holder in (holder_1, holder_2):
+                self.assertIsNone(cache.get(f"cache-version:holder:{holder}"))
+            self.assertEqual(cache.get("cache-version:locking-events"), version + 1)
+        with mock.patch("time.time", return_value=now + 91):
+            self.assertIsNone(cache.get("cache-version:locking-events"))
+
+    def test_cache_response(self):
+        add_sorted_events(Account.create().address, 10, 0, 0)
+        url = reverse("v1:locking_events:leaderboard")
+        response = self.client.get(url, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["count"], 1)
+
+        # Cached response is returned until data changes
+        add_sorted_events(Account.create().address, 20, 0, 0)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, format="json")
+        self.assertEqual(response.json()["count"], 1)
+
+        bump_cache_version(LOCKING_EVENTS_CACHE_VERSION)
+        response = self.client.get(url, format="json")
+        self.assertEqual(response.json()["count"], 2)
+
+        # Query parameters are part of the key
+        response = self.client.get(url, {"limit": 1}, format="json")
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_cache_response_disabled(self):
+        add_sorted_events(Account.create().address, 10, 0, 0)
+        url = reverse("v1:locking_events:leaderboard")
+        with self.settings(API_RESPONSE_CACHE_ENABLED=False):
+            self.assertEqual(self.client.get(url, format="json").json()["count"], 1)
+
+            # Cache is not shared with the workers, so responses are not cached
+            add_sorted_events(Account.create().address, 20, 0, 0)
+            self.assertEqual(self.client.get(url, format="json").json()["count"], 2)
+
+    def test_cache_response_etag(self):
+        add_sorted_events(Account.create().address, 10, 0, 0)
+        url = reverse("v1:locking_events:leaderboard")
+        response = self.client.get(url, format="json")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        bump_cache_version(LOCKING_EVENTS_CACHE_VERSION)
+        response = self.client.get(url, format="json", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Query parameters are part of the ETag
+        response = self.client.get(
+            url, {"limit": 1}, format="json", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_bump_holders_cache_versions(self):
+        holder_1, holder_2 = (Account.create().address for _ in range(2))
+        holders_version = get_cache_version(HOLDERS_CACHE_VERSION)
+        holder_1_version, holder_2_version = (
+            get_cache_version(get_holder_cache_version_name(holder))
+            for holder in (holder_1, holder_2)
+        )
+        bump_holders_cache_versions([holder_1])
+        self.assertNotEqual(
+            get_cache_version(get_holder_cache_version_name(holder_1)),
+            holder_1_version,
+        )
+        self.assertEqual(
+            get_cache_version(get_holder_cache_version_name(holder_2)),
+            holder_2_version,
+        )
+        self.assertEqual(get_cache_version(HOLDERS_CACHE_VERSION), holders_version)
+
+        # Too many holders, all of them are invalidated bumping the generation
+        holder_1_version = get_cache_version(get_holder_cache_version_name(holder_1))
+        with self.settings(API_RESPONSE_CACHE_MAX_HOLDERS=1):
+            bump_holders_cache_versions([holder_1, holder_2])
+        self.assertEqual(
+            get_cache_version(get_holder_cache_version_name(holder_1)),
+            holder_1_version,
+        )
+        self.assertEqual(get_cache_version(HOLDERS_CACHE_VERSION), holders_version + 1)
+
+    def test_cache_response_holders(self):
+        holder_1, holder_2 = (Account.create().address for _ in range(2))
+        add_sorted_events(holder_1, 10, 0, 0)
+        add_sorted_events(holder_2, 20, 0, 0)
+        urls = [
+            reverse("v1:locking_events:all-events", args=(holder,))
+            for holder in (holder_1, holder_2)
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url, format="json").json()["count"], 3)
+
+        # Only the responses of the holders touched are invalidated
+        add_sorted_events(holder_1, 10, 0, 0)
+        bump_holders_cache_versions([holder_1])
+        self.assertEqual(self.client.get(urls[0], format="json").json()["count"], 6)
+        with self.assertNumQueries(0):
+            response = self.client.get(urls[1], format="json")
+        self.assertEqual(response.json()["count"], 3)
+
+    def test_cache_response_campaigns(self):
+        url = reverse("v1:locking_campaigns:list-campaigns")
+        self.assertEqual(self.client.get(url, format="json").json()["count"], 0)
+
+        # Saving a campaign invalidates the campaigns cache when committed
+        with self.captureOnCommitCallbacks(execute=True):
+            CampaignFactory()
+        self.assertEqual(self.client.get(url, format="json").json()["count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=False):
+            CampaignFactory()
+        self.assertEqual(self.client.get(url, format="json").json()["count"], 1)
+        bump_cache_version(CAMPAIGNS_CACHE_VERSION)
+        self.assertEqual(self.client.get(url, format="json").json()["count"], 2)
+
+        # Deleting an activity invalidates the campaigns cache when committed
+        activity = ActivityFactory()
+        version = get_cache_version(CAMPAIGNS_CACHE_VERSION)
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.delete()
+        self.assertEqual(get_cache_version(CAMPAIGNS_CACHE_VERSION), version + 1)
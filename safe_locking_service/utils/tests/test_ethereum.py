@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from eth_account import Account
+from hexbytes import HexBytes
+
+from .. import ethereum
+from ..ethereum import (
+    CachedEthereumAddressBinaryField,
+    clear_checksum_address_cache,
+    to_checksum_address,
+)
+
+
+class TestEthereum(SimpleTestCase):
+    def setUp(self):
+        clear_checksum_address_cache()
+
+    def test_to_checksum_address(self):
+        address = Account.create().address
+        address_bytes = HexBytes(address)
+        with mock.patch.object(
+            ethereum,
+            "fast_to_checksum_address",
+            wraps=ethereum.fast_to_checksum_address,
+        ) as fast_to_checksum_address_mock:
+            self.assertEqual(to_checksum_address(address_bytes), address)
+            self.assertEqual(to_checksum_address(memoryview(address_bytes)), address)
+            # Address is only checksummed once
+            fast_to_checksum_address_mock.assert_called_once_with(bytes(address_bytes))
+
+    def test_cached_ethereum_address_binary_field(self):
+        field = CachedEthereumAddressBinaryField()
+        address = Account.create().address
+        self.assertIsNone(field.from_db_value(None, None, None))
+        with mock.patch.object(
+            ethereum,
+            "fast_to_checksum_address",
+            wraps=ethereum.fast_to_checksum_address,
+        ) as fast_to_checksum_address_mock:
+            for _ in range(2):
+                self.assertEqual(
+                    field.from_db_value(memoryview(HexBytes(address)), None, None),
+                    address,
+                )
+            fast_to_checksum_address_mock.assert_called_once()
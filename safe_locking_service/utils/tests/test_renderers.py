@@ -0,0 +1,43 @@
+import datetime
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.test import SimpleTestCase
+
+from rest_framework.renderers import JSONRenderer
+
+from ..renderers import OrjsonRenderer
+
+
+class TestOrjsonRenderer(SimpleTestCase):
+    def test_render(self):
+        data = OrderedDict(
+            [
+                ("count", 1),
+                ("next", None),
+                (
+                    "results",
+                    [
+                        {
+                            "executionDate": datetime.datetime(
+                                2024, 1, 1, 10, 5, 1, 123456, datetime.timezone.utc
+                            ),
+                            "id": uuid4(),
+                            "amount": 2**70,  # Not supported by orjson
+                            "name": "Şafe\u2028\u2029",
+                        }
+                    ],
+                ),
+            ]
+        )
+        renderer = OrjsonRenderer()
+        self.assertEqual(renderer.render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            renderer.render(data["results"][0] | {"amount": 5}),
+            JSONRenderer().render(data["results"][0] | {"amount": 5}),
+        )
+        self.assertEqual(renderer.render(None), b"")
+        self.assertEqual(
+            renderer.render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )